@@ -6,40 +6,45 @@ Esta función se ejecuta en el runtime de Python de Vercel
 import json
 import os
 import sys
+import threading
 from http.server import BaseHTTPRequestHandler
 from pathlib import Path
 
-# Agregar el path del servicio Python
-# En Vercel, intentar múltiples paths posibles
+# El matching vive en services/python (matching_service + matching_core), el mismo
+# código que usan el CLI, el worker y el servidor; vercel.json lo incluye en el
+# bundle de esta función (functions."api/ai-match.py".includeFiles)
 current_dir = Path(__file__).parent
-matching_service_dir = current_dir / 'matching_service'
-project_root = current_dir.parent
-services_python = project_root / 'services' / 'python'
-
-# Intentar múltiples paths
-possible_paths = [
-    matching_service_dir,  # Primero intentar en api/matching_service
-    services_python,  # Luego en services/python
-    current_dir / 'services' / 'python',
-]
-
-for path in possible_paths:
-    if path.exists():
-        sys.path.insert(0, str(path))
-        print(f"✅ Agregado al path: {path}")
+services_python = current_dir.parent / 'services' / 'python'
+sys.path.insert(0, str(services_python))
 
+# Importar matching_service es barato (no crea clientes ni importa openai/supabase);
+# los diagnósticos de paths solo se imprimen si el import falla
 try:
-    from matching_service import calculate_and_save_match
-    print(f"✅ matching_service importado exitosamente")
+    from matching_service import calculate_and_save_match, calculate_and_save_matches, warm_up_clients
 except ImportError as e:
-    print(f"❌ Error importing matching_service: {e}")
-    print(f"   Python path: {sys.path}")
-    print(f"   Current dir: {current_dir}")
-    print(f"   Matching service dir: {matching_service_dir}")
-    print(f"   Services Python: {services_python}")
+    print(f"❌ Error importing matching_service: {e}", file=sys.stderr)
+    print(f"   Python path: {sys.path}", file=sys.stderr)
+    print(f"   Services Python: {services_python} (existe: {services_python.exists()})", file=sys.stderr)
     import traceback
     traceback.print_exc()
     calculate_and_save_match = None
+    calculate_and_save_matches = None
+    warm_up_clients = None
+
+
+def _warm_up_in_background():
+    """Abre las conexiones a OpenAI y Supabase mientras llega/se parsea el primer request"""
+    try:
+        warm_up_clients()
+    except Exception as e:
+        print(f"⚠️  No se pudieron precalentar las conexiones: {e}")
+
+
+# En cold start, la construcción de los clientes (import de openai/supabase) y los
+# handshakes TLS corren en background, fuera del camino del primer request; las
+# invocaciones siguientes reusan el pool
+if warm_up_clients is not None:
+    threading.Thread(target=_warm_up_in_background, daemon=True).start()
 
 
 class handler(BaseHTTPRequestHandler):
@@ -57,9 +62,15 @@ class handler(BaseHTTPRequestHandler):
             
             job_id = data.get('job_id')
             candidate_id = data.get('candidate_id')
+            # Modo batch: {job_id, candidate_ids: [...]}
+            candidate_ids = data.get('candidate_ids')
+            
+            if candidate_ids is not None and not isinstance(candidate_ids, list):
+                self._send_error(400, "candidate_ids debe ser una lista")
+                return
             
-            if not job_id or not candidate_id:
-                self._send_error(400, "job_id y candidate_id son requeridos")
+            if not job_id or not (candidate_id or candidate_ids):
+                self._send_error(400, "job_id y candidate_id (o candidate_ids) son requeridos")
                 return
             
             if calculate_and_save_match is None:
@@ -67,7 +78,10 @@ class handler(BaseHTTPRequestHandler):
                 return
             
             # Ejecutar el matching
-            result = calculate_and_save_match(job_id, candidate_id)
+            if candidate_ids:
+                result = calculate_and_save_matches(job_id, candidate_ids)
+            else:
+                result = calculate_and_save_match(job_id, candidate_id)
             
             # Retornar resultado
             self._send_response(200, result)
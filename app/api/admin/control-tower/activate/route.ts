@@ -1,7 +1,6 @@
 import { NextRequest, NextResponse } from "next/server";
 import { supabase } from "@/src/db/supabaseClient";
-import { calculateAIMatch } from "@/src/agents/aiMatchingAgent";
-import { createOrUpdateJobCandidateMatch } from "@/src/domain/jobCandidateMatches";
+import { calculateAIMatches } from "@/src/agents/aiMatchingAgent";
 import { exec } from "child_process";
 import { promisify } from "util";
 import { resolve } from "path";
@@ -68,6 +67,7 @@ export async function POST(request: NextRequest) {
 
     // Procesar en batches para no sobrecargar
     const batchSize = 5; // Procesar 5 jobs a la vez
+    const candidateBatchSize = 25; // Candidatos por llamada al servicio de matching
 
     for (let i = 0; i < activeJobs.length; i += batchSize) {
       const jobBatch = activeJobs.slice(i, i + batchSize);
@@ -94,35 +94,34 @@ export async function POST(request: NextRequest) {
               `   📊 Job ${job.id}: ${candidatesToMatch.length} candidatos sin match`
             );
 
-            // Procesar cada candidato sin match
-            for (const candidateId of candidatesToMatch) {
-              try {
-                // Calcular match usando AI (llama al script Python)
-                const matchResult = await calculateAIMatch(job.id, candidateId);
-
-                // El script Python ya guarda en la BD, pero lo hacemos aquí también por seguridad
-                await createOrUpdateJobCandidateMatch({
-                  job_id: job.id,
-                  candidate_id: candidateId,
-                  match_score: matchResult.score,
-                  match_detail: matchResult.detail,
-                  match_source: "openai-gpt4o",
-                  updated_at: new Date().toISOString(),
-                });
-
-                totalProcessed++;
-                console.log(
-                  `   ✅ Match creado: Job ${job.id} ↔ Candidate ${candidateId} (Score: ${matchResult.score})`
-                );
+            // Procesar los candidatos sin match en batches: el servicio Python
+            // obtiene el job una sola vez, paraleliza OpenAI y guarda con un único upsert
+            for (let j = 0; j < candidatesToMatch.length; j += candidateBatchSize) {
+              const candidateBatch = candidatesToMatch.slice(j, j + candidateBatchSize);
 
-                // Pequeño delay para no sobrecargar OpenAI API
-                await new Promise((resolve) => setTimeout(resolve, 200));
+              try {
+                const { results, errors } = await calculateAIMatches(job.id, candidateBatch);
+
+                totalProcessed += results.length;
+                totalErrors += errors.length;
+
+                for (const result of results) {
+                  console.log(
+                    `   ✅ Match creado: Job ${job.id} ↔ Candidate ${result.candidateId} (Score: ${result.score})`
+                  );
+                }
+                for (const error of errors) {
+                  console.error(
+                    `   ❌ Error matching job ${job.id} con candidate ${error.candidateId}:`,
+                    error.error
+                  );
+                }
               } catch (error: any) {
                 console.error(
-                  `   ❌ Error matching job ${job.id} con candidate ${candidateId}:`,
+                  `   ❌ Error matching job ${job.id} con ${candidateBatch.length} candidatos:`,
                   error.message
                 );
-                totalErrors++;
+                totalErrors += candidateBatch.length;
               }
             }
           } catch (error: any) {
@@ -4,6 +4,7 @@ import { matchJobWithAllCandidates } from "@/src/agents/matchJobCandidate";
 /**
  * POST /api/jobs/[id]/match
  * Triggers matching of a job with all existing candidates
+ * ?force=true re-evalúa también los matches que ya están al día
  */
 export async function POST(
   request: NextRequest,
@@ -11,11 +12,12 @@ export async function POST(
 ) {
   try {
     const { id: jobId } = await params;
+    const force = request.nextUrl.searchParams.get("force") === "true";
 
-    console.log(`🔄 Starting matching for job: ${jobId}`);
+    console.log(`🔄 Starting matching for job: ${jobId}${force ? " (force)" : ""}`);
 
     // Run matching asynchronously (don't wait for completion)
-    matchJobWithAllCandidates(jobId).catch((error) => {
+    matchJobWithAllCandidates(jobId, { force }).catch((error) => {
       console.error(`Error in background matching for job ${jobId}:`, error);
     });
 
@@ -0,0 +1,357 @@
+"""
+Cache de análisis de matching direccionado por contenido.
+
+La clave es un hash de (PROMPT_VERSION, modelo, job_context, candidate_context):
+si el job, el candidato y el prompt no cambiaron desde la última evaluación, el
+análisis guardado se reutiliza sin llamar a OpenAI. PROMPT_VERSION cubre todo lo
+que se envía además de los contextos (system prompt, instrucciones, plantillas
+de mensajes, temperatura, esquema de respuesta y pesos): un cambio de prompt no
+sirve análisis viejos a los pares que el planificador marcó como "prompt".
+
+Backends disponibles (variable de entorno MATCH_CACHE_BACKEND):
+- memory:   LRU en el proceso (default)
+- sqlite:   archivo local (MATCH_CACHE_PATH)
+- supabase: tabla match_analysis_cache (ver sql/create_match_analysis_cache_table.sql)
+- none:     sin cache
+
+Los valores se guardan como string JSON; la (de)serialización del MatchAnalysis
+la hace matching_service.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Protocol, Tuple
+
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60  # 7 días
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_SQLITE_PATH = Path(__file__).parent / ".match_cache.sqlite3"
+SUPABASE_CACHE_TABLE = "match_analysis_cache"
+
+# Prompt que produjo el análisis: un par solo o K candidatos en un mismo prompt.
+# Van en la clave para que un score multi-candidato no se sirva como de un par
+CACHE_MODE_SINGLE = "single"
+CACHE_MODE_MULTI = "multi"
+
+
+def make_cache_key(
+    prompt_version: str,
+    model: str,
+    job_context: str,
+    candidate_context: str,
+    mode: str = CACHE_MODE_SINGLE
+) -> str:
+    """
+    Calcula la clave del cache (sha256) a partir de los inputs del LLM.
+
+    Args:
+        prompt_version: Versión del prompt (matching_core.PROMPT_VERSION)
+        model: Nombre del modelo del backend
+        job_context: Contexto renderizado del job
+        candidate_context: Contexto renderizado del candidato
+        mode: CACHE_MODE_SINGLE o CACHE_MODE_MULTI
+
+    Returns:
+        Hash hexadecimal
+    """
+    digest = hashlib.sha256()
+    for part in (prompt_version, model, mode, job_context, candidate_context):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")  # Separador para que ("ab", "c") != ("a", "bc")
+    return digest.hexdigest()
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+class CacheBackend(Protocol):
+    """Interfaz común de los backends del cache"""
+
+    name: str
+
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    def set(self, key: str, value: str) -> None:
+        ...
+
+    def clear(self) -> None:
+        ...
+
+
+class MemoryCacheBackend:
+    """LRU en memoria con TTL y límite de entradas"""
+
+    name = "memory"
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            stored_at, value = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCacheBackend:
+    """Cache persistente en un archivo SQLite local (LRU por accessed_at)"""
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        self.path = str(path or DEFAULT_SQLITE_PATH)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS match_analysis_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    analysis TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_match_analysis_cache_accessed_at "
+                "ON match_analysis_cache(accessed_at)"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT analysis, created_at FROM match_analysis_cache WHERE cache_key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM match_analysis_cache WHERE cache_key = ?", (key,))
+                return None
+
+            self._conn.execute(
+                "UPDATE match_analysis_cache SET accessed_at = ? WHERE cache_key = ?",
+                (now, key)
+            )
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO match_analysis_cache (cache_key, analysis, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            # Expirar por TTL y recortar por tamaño (los menos usados recientemente)
+            self._conn.execute(
+                "DELETE FROM match_analysis_cache WHERE created_at < ?",
+                (now - self.ttl_seconds,)
+            )
+            self._conn.execute(
+                """DELETE FROM match_analysis_cache WHERE cache_key IN (
+                    SELECT cache_key FROM match_analysis_cache
+                    ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,)
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM match_analysis_cache")
+
+
+class SupabaseCacheBackend:
+    """
+    Cache compartido en la tabla match_analysis_cache de Supabase.
+
+    El TTL se valida al leer; el recorte por tamaño se hace cada `prune_every`
+    escrituras para no agregar un round trip a cada set.
+    """
+
+    name = "supabase"
+
+    def __init__(
+        self,
+        supabase_client: Any,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        prune_every: int = 100
+    ):
+        self.supabase = supabase_client
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        response = self.supabase.table(SUPABASE_CACHE_TABLE).select(
+            "analysis, created_at"
+        ).eq("cache_key", key).execute()
+
+        if not response.data:
+            return None
+
+        row = response.data[0]
+        created_at = datetime.fromisoformat(row["created_at"].replace("Z", "+00:00"))
+        if datetime.now(timezone.utc) - created_at > timedelta(seconds=self.ttl_seconds):
+            return None
+
+        return row["analysis"]
+
+    def set(self, key: str, value: str) -> None:
+        self.supabase.table(SUPABASE_CACHE_TABLE).upsert({
+            "cache_key": key,
+            "analysis": value,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }, on_conflict="cache_key").execute()
+
+        with self._lock:
+            self._writes += 1
+            should_prune = self._writes % self.prune_every == 0
+        if should_prune:
+            self.prune()
+
+    def prune(self) -> None:
+        """Elimina entradas expiradas y las más antiguas por encima de max_entries"""
+        expired_before = datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+        self.supabase.table(SUPABASE_CACHE_TABLE).delete().lt(
+            "created_at", expired_before.isoformat()
+        ).execute()
+
+        overflow = self.supabase.table(SUPABASE_CACHE_TABLE).select("cache_key").order(
+            "created_at", desc=True
+        ).range(self.max_entries, self.max_entries + 999).execute()
+
+        keys = [row["cache_key"] for row in (overflow.data or [])]
+        if keys:
+            self.supabase.table(SUPABASE_CACHE_TABLE).delete().in_("cache_key", keys).execute()
+
+    def clear(self) -> None:
+        self.supabase.table(SUPABASE_CACHE_TABLE).delete().neq("cache_key", "").execute()
+
+
+# ============================================================================
+# CACHE CON CONTADORES
+# ============================================================================
+
+class AnalysisCache:
+    """Envuelve un backend y lleva contadores de hits/misses"""
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            # Un cache caído no debe romper el matching: se trata como miss
+            print(f"   ⚠️  Error leyendo cache ({self.backend.name}): {e}")
+            value = None
+            with self._lock:
+                self.errors += 1
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        try:
+            self.backend.set(key, value)
+        except Exception as e:
+            print(f"   ⚠️  Error escribiendo cache ({self.backend.name}): {e}")
+            with self._lock:
+                self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Devuelve backend, hits, misses, errores y hit rate"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.backend.name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+def create_analysis_cache(supabase_client: Any = None) -> Optional[AnalysisCache]:
+    """
+    Crea el cache según las variables de entorno:
+    - MATCH_CACHE_BACKEND: memory (default) | sqlite | supabase | none
+    - MATCH_CACHE_TTL_SECONDS: TTL de cada entrada (default 7 días)
+    - MATCH_CACHE_MAX_ENTRIES: tamaño máximo (default 10000)
+    - MATCH_CACHE_PATH: archivo SQLite (solo backend sqlite)
+
+    Args:
+        supabase_client: Cliente de Supabase (requerido para el backend supabase)
+
+    Returns:
+        AnalysisCache o None si el cache está desactivado
+    """
+    backend_name = os.getenv("MATCH_CACHE_BACKEND", "memory").strip().lower()
+    ttl_seconds = float(os.getenv("MATCH_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+    max_entries = int(os.getenv("MATCH_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+
+    if backend_name in ("", "none", "off", "false"):
+        return None
+    if backend_name == "memory":
+        backend: CacheBackend = MemoryCacheBackend(ttl_seconds, max_entries)
+    elif backend_name == "sqlite":
+        backend = SQLiteCacheBackend(os.getenv("MATCH_CACHE_PATH"), ttl_seconds, max_entries)
+    elif backend_name == "supabase":
+        if supabase_client is None:
+            raise ValueError("❌ MATCH_CACHE_BACKEND=supabase requiere un cliente de Supabase")
+        backend = SupabaseCacheBackend(supabase_client, ttl_seconds, max_entries)
+    else:
+        raise ValueError(f"❌ MATCH_CACHE_BACKEND desconocido: {backend_name}")
+
+    return AnalysisCache(backend)
@@ -0,0 +1,345 @@
+"""
+Motor de matching asíncrono (asyncio).
+
+Misma lógica que matching_service (contextos, pre-filtro, cache, score y
+match_detail de matching_core), pero con AsyncOpenAI y el cliente asíncrono de Supabase: las
+lecturas de un par corren en paralelo y un solo proceso mantiene decenas de
+llamadas al modelo en vuelo, acotadas por un semáforo y por el scheduler de
+rate limits compartido (rate_limiter.py, matching_service.llm_scheduler).
+
+Uso:
+    python async_matching.py <job_id> <candidate_id> [<candidate_id> ...]
+
+    from async_matching import calculate_and_save_match_async, calculate_and_save_matches_async
+    result = await calculate_and_save_match_async(job_id, candidate_id)
+    batch = await calculate_and_save_matches_async(job_id, candidate_ids)
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+import weakref
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import matching_service as ms
+from data_loader import load_snapshot_async
+from http_clients import create_async_openai_client, create_async_supabase_client
+from llm_backends import LLMBackend, create_llm_backend, llm_backend_name, parsed_or_raise
+from llm_usage import extract_usage
+from match_writer import MATCH_WRITE_BATCH_SIZE, MatchWriteError, upsert_matches_async
+from matching_core import build_match_result, match_row
+from metrics import record_llm_usage, record_pair, span, usage_fields
+from rate_limiter import RateLimitScheduler, estimate_tokens
+
+try:
+    from supabase import AsyncClient
+except ImportError as e:
+    print(f"❌ Error: Faltan dependencias. Instala con: pip install openai supabase")
+    print(f"   Error específico: {e}")
+    sys.exit(1)
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+# Llamadas al modelo en vuelo a la vez
+ASYNC_MAX_CONCURRENCY = int(os.getenv("MATCHING_ASYNC_CONCURRENCY", "32"))
+
+# ============================================================================
+# MOTOR ASÍNCRONO
+# ============================================================================
+
+class AsyncMatchingEngine:
+    """Pipeline de matching asíncrono con fan-out acotado"""
+
+    def __init__(
+        self,
+        max_concurrency: int = ASYNC_MAX_CONCURRENCY,
+        scheduler: Optional[RateLimitScheduler] = None
+    ):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        # Por defecto el mismo scheduler que el camino síncrono: los límites son de la cuenta
+        self.scheduler = scheduler or ms.llm_scheduler
+        self._backend: Optional[LLMBackend] = None
+        self._supabase: Optional[AsyncClient] = None
+        self._analysis_cache: Any = None
+        # Un solo init aunque lo pidan varias corrutinas a la vez (asyncio.gather)
+        self._clients_lock = asyncio.Lock()
+
+    async def clients(self) -> Tuple[LLMBackend, AsyncClient]:
+        """
+        Crea en el primer uso el backend del modelo (MATCHING_LLM_BACKEND, ver
+        llm_backends.py) y el cliente asíncrono de Supabase (con pool de
+        conexiones, ver http_clients.py).
+
+        Las dependencias síncronas de matching_service (cache de análisis, resume
+        store) se inicializan en un hilo aparte, así su setup de red no bloquea
+        el event loop.
+        """
+        if self._backend is not None and self._supabase is not None:
+            return self._backend, self._supabase
+        async with self._clients_lock:
+            if self._backend is None:
+                await asyncio.to_thread(ms._ensure_clients_initialized)
+                self._analysis_cache = ms.analysis_cache
+                name = llm_backend_name()
+                async_openai = create_async_openai_client(ms.OPENAI_API_KEY) if name == "openai" else None
+                self._backend = create_llm_backend(name, async_openai_client=async_openai)
+            if self._supabase is None:
+                self._supabase = await create_async_supabase_client(ms.SUPABASE_URL, ms.SUPABASE_SERVICE_ROLE_KEY)
+        return self._backend, self._supabase
+
+    async def analyze_match(
+        self,
+        job_context: str,
+        candidate_context: str
+    ) -> Tuple[ms.MatchAnalysis, Optional[Dict[str, Any]]]:
+        """
+        Versión asíncrona de matching_service.analyze_match_with_usage (con
+        cache, semáforo y rate limit). Devuelve (análisis, usage).
+        """
+        backend, _ = await self.clients()
+        cache = self._analysis_cache
+        cache_key = None
+        if cache is not None:
+            cache_key = ms.make_cache_key(ms.PROMPT_VERSION, backend.model, job_context, candidate_context)
+            # Los backends sqlite/supabase son bloqueantes: no frenar el event loop
+            cached = await asyncio.to_thread(cache.get, cache_key)
+            if cached is not None:
+                return ms.MatchAnalysis.model_validate_json(cached), None
+
+        messages = ms.build_match_messages(job_context, candidate_context)
+
+        latency: Dict[str, float] = {}
+
+        async with self.semaphore:
+            with span("llm_call", model=backend.model, schema=ms.MatchAnalysis.__name__) as current:
+                async def _request():
+                    current.set(attempts=current.fields.get("attempts", 0) + 1)
+                    started = time.perf_counter()
+                    response = await backend.aparse(messages, ms.MatchAnalysis, ms.prompt_cache_key(job_context))
+                    latency["ms"] = (time.perf_counter() - started) * 1000
+                    return response
+
+                response = await self.scheduler.call_async(_request, estimate_tokens(messages))
+                usage = extract_usage(response.usage, latency["ms"])
+                current.set(**usage_fields(usage))
+
+        ms.usage_stats.record(usage)
+        record_llm_usage(backend.model, usage)
+        match_analysis: ms.MatchAnalysis = parsed_or_raise(response)
+
+        if cache is not None:
+            await asyncio.to_thread(cache.set, cache_key, match_analysis.model_dump_json())
+
+        return match_analysis, usage
+
+    async def _score_candidate(
+        self,
+        job: Dict[str, Any],
+        job_context: str,
+        candidate: Dict[str, Any],
+        experiences: List[Dict[str, Any]]
+    ) -> Tuple[ms.MatchAnalysis, str, Optional[Dict[str, Any]]]:
+        """Pre-filtro o LLM para un candidato; devuelve (análisis, match_source, usage)"""
+        prefiltered = ms.run_prefilter(job, candidate, experiences)
+        if prefiltered is not None:
+            return prefiltered, ms.RULE_BASED_MATCH_SOURCE, None
+
+        # El backend supabase del resume store es bloqueante
+        candidate_context = await asyncio.to_thread(ms.get_candidate_context, candidate, experiences)
+        match_analysis, usage = await self.analyze_match(job_context, candidate_context)
+        return match_analysis, self._backend.match_source, usage
+
+    async def _upsert_results(self, results: List[Dict[str, Any]]) -> None:
+        if not results:
+            return
+        _, supabase = await self.clients()
+        now = datetime.now().isoformat()
+        await upsert_matches_async(supabase, [match_row(result, now) for result in results])
+
+    async def _save_results(self, results: List[Dict[str, Any]]) -> Dict[str, str]:
+        """
+        Guarda los resultados en batches de MATCH_WRITE_BATCH_SIZE (como
+        MatchWriter en el flujo síncrono). Un batch que falla después de los
+        reintentos no corta el resto.
+
+        Returns:
+            {candidate_id: error} de los resultados que no quedaron guardados
+        """
+        failed: Dict[str, str] = {}
+        for index in range(0, len(results), MATCH_WRITE_BATCH_SIZE):
+            chunk = results[index:index + MATCH_WRITE_BATCH_SIZE]
+            try:
+                await self._upsert_results(chunk)
+            except MatchWriteError as e:
+                print(f"   ❌ Error guardando en base de datos: {e}")
+                failed.update((result["candidate_id"], str(e)) for result in chunk)
+        return failed
+
+    async def calculate_and_save_match(self, job_id: str, candidate_id: str) -> Dict[str, Any]:
+        """Versión asíncrona de matching_service.calculate_and_save_match"""
+        _, supabase = await self.clients()
+
+        # Job, candidato y experiencias en paralelo (columnas de data_loader.REQUIRED_FIELDS)
+        snapshot = await load_snapshot_async(supabase, [job_id], [candidate_id])
+
+        job = snapshot.jobs.get(job_id)
+        if job is None:
+            raise ValueError(f"❌ Job no encontrado: {job_id}")
+        candidate = snapshot.candidates.get(candidate_id)
+        if candidate is None:
+            raise ValueError(f"❌ Candidato no encontrado: {candidate_id}")
+        experiences = snapshot.experiences_for(candidate_id)
+
+        match_analysis, match_source, usage = await self._score_candidate(
+            job, ms.build_job_context(job), candidate, experiences
+        )
+        with span("score", job_id=job_id, candidate_id=candidate_id):
+            result = build_match_result(job, candidate, experiences, match_analysis, match_source, usage)
+        await self._upsert_results([result])
+        record_pair(match_source)
+        return result
+
+    async def calculate_and_save_matches(self, job_id: str, candidate_ids: List[str]) -> Dict[str, Any]:
+        """Versión asíncrona de matching_service.calculate_and_save_matches"""
+        _, supabase = await self.clients()
+        candidate_ids = list(dict.fromkeys(candidate_ids))
+
+        snapshot = await load_snapshot_async(supabase, [job_id], candidate_ids)
+
+        job = snapshot.jobs.get(job_id)
+        if job is None:
+            raise ValueError(f"❌ Job no encontrado: {job_id}")
+
+        job_context = ms.build_job_context(job)
+        candidates = snapshot.candidates
+        experiences_by_candidate = snapshot.experiences_by_candidate
+
+        errors: List[Dict[str, str]] = [
+            {"candidate_id": cid, "error": f"Candidato no encontrado: {cid}"}
+            for cid in candidate_ids if cid not in candidates
+        ]
+        pending = [cid for cid in candidate_ids if cid in candidates]
+
+        def _score(cid: str):
+            return self._score_candidate(job, job_context, candidates[cid], experiences_by_candidate.get(cid, []))
+
+        # El primer candidato va solo: deja el prefijo del job en el prompt
+        # cache de OpenAI antes del fan-out (ver matching_service.calculate_and_save_matches)
+        outcomes: List[Any] = []
+        if len(pending) > 1:
+            outcomes += await asyncio.gather(_score(pending[0]), return_exceptions=True)
+        outcomes += await asyncio.gather(
+            *(_score(cid) for cid in pending[len(outcomes):]),
+            return_exceptions=True
+        )
+
+        scored: List[Dict[str, Any]] = []
+        for candidate_id, outcome in zip(pending, outcomes):
+            if isinstance(outcome, BaseException):
+                errors.append({"candidate_id": candidate_id, "error": str(outcome)})
+                record_pair(None, "error")
+                continue
+            match_analysis, match_source, usage = outcome
+            with span("score", job_id=job_id, candidate_id=candidate_id):
+                scored.append(build_match_result(
+                    job,
+                    candidates[candidate_id],
+                    experiences_by_candidate.get(candidate_id, []),
+                    match_analysis,
+                    match_source,
+                    usage
+                ))
+
+        # Un par cuenta como success recién con su fila guardada (igual que
+        # los callbacks on_written del flujo síncrono)
+        failed = await self._save_results(scored)
+        results: List[Dict[str, Any]] = []
+        for result in scored:
+            if result["candidate_id"] in failed:
+                errors.append({"candidate_id": result["candidate_id"], "error": failed[result["candidate_id"]]})
+                record_pair(None, "error")
+                continue
+            results.append(result)
+            record_pair(result["match_source"])
+
+        return {
+            "status": "success" if not errors else "partial",
+            "job_id": job_id,
+            "processed": len(results),
+            "results": results,
+            "errors": errors
+        }
+
+    async def match_pairs(self, pairs: Iterable[Tuple[str, str]]) -> Dict[str, Any]:
+        """
+        Evalúa pares (job_id, candidate_id) de varios jobs: agrupa por job y
+        procesa todos los jobs en paralelo (el semáforo acota las llamadas al modelo).
+        """
+        grouped: Dict[str, List[str]] = {}
+        for job_id, candidate_id in pairs:
+            grouped.setdefault(job_id, []).append(candidate_id)
+
+        outcomes = await asyncio.gather(
+            *(self.calculate_and_save_matches(job_id, cids) for job_id, cids in grouped.items()),
+            return_exceptions=True
+        )
+
+        summary: Dict[str, Any] = {"status": "success", "processed": 0, "results": [], "errors": []}
+        for job_id, outcome in zip(grouped, outcomes):
+            if isinstance(outcome, BaseException):
+                summary["errors"].append({"job_id": job_id, "error": str(outcome)})
+                continue
+            summary["processed"] += outcome["processed"]
+            summary["results"].extend(outcome["results"])
+            summary["errors"].extend({"job_id": job_id, **error} for error in outcome["errors"])
+
+        if summary["errors"]:
+            summary["status"] = "partial"
+        return summary
+
+
+# Un motor por event loop: sus clientes asíncronos (pools de httpx) quedan atados
+# al loop donde se crearon, y cada asyncio.run arranca uno nuevo
+_default_engines: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncMatchingEngine]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_default_engine() -> AsyncMatchingEngine:
+    """Motor compartido del event loop activo (se crea en el primer uso dentro de ese loop)"""
+    loop = asyncio.get_running_loop()
+    engine = _default_engines.get(loop)
+    if engine is None:
+        engine = _default_engines[loop] = AsyncMatchingEngine()
+    return engine
+
+
+async def calculate_and_save_match_async(job_id: str, candidate_id: str) -> Dict[str, Any]:
+    """Calcula y guarda el match de un par (asíncrono)"""
+    return await get_default_engine().calculate_and_save_match(job_id, candidate_id)
+
+
+async def calculate_and_save_matches_async(job_id: str, candidate_ids: List[str]) -> Dict[str, Any]:
+    """Calcula y guarda el match de un job contra N candidatos (asíncrono)"""
+    return await get_default_engine().calculate_and_save_matches(job_id, candidate_ids)
+
+
+async def match_pairs_async(pairs: Iterable[Tuple[str, str]]) -> Dict[str, Any]:
+    """Calcula y guarda matches para pares (job_id, candidate_id) de varios jobs (asíncrono)"""
+    return await get_default_engine().match_pairs(pairs)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3:
+        # Clientes síncronos, cache y resume store antes de entrar al event loop
+        ms._ensure_clients_initialized()
+        result = asyncio.run(calculate_and_save_matches_async(sys.argv[1], sys.argv[2:]))
+        print(json.dumps(result, ensure_ascii=False))
+    else:
+        print("Uso: python async_matching.py <job_id> <candidate_id> [<candidate_id> ...]")
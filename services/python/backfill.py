@@ -0,0 +1,377 @@
+"""
+Backfill: re-scoring de la matriz completa jobs activos × candidatos.
+
+Pensado para después de un cambio de SYSTEM_PROMPT, modelo o pesos, cuando hay
+que re-evaluar cientos de miles de pares en una sola máquina:
+
+1. plan:       todos los jobs activos × la red de hyperconnector_candidates
+               (por defecto solo los pares desactualizados según match_planner;
+               con --all, todos)
+2. shards:     los pares se agrupan por job y se parten en shards de
+               BACKFILL_SHARD_SIZE candidatos
+3. procesos:   un pool de BACKFILL_PROCESSES procesos (spawn), cada uno con sus
+               propios clientes de OpenAI/Supabase y su presupuesto de
+               concurrencia; cada shard corre por calculate_and_save_matches
+               (carga en bloque, pre-filtro, llamadas concurrentes, upsert en
+               bloque). OPENAI_RPM_LIMIT / OPENAI_TPM_LIMIT se reparten entre
+               los procesos.
+4. checkpoint: cada par terminado se agrega a un JSONL local; al relanzar, los
+               pares ya guardados con el PROMPT_VERSION actual se omiten.
+
+Con --dry-run solo se planifica y se estima el costo con una muestra de pares
+(contextos reales, ~4 caracteres por token, prefijo del job cacheado).
+
+Uso:
+    python backfill.py [--all] [--dry-run] [--processes 4] [--concurrency 8]
+                       [--shard-size 200] [--checkpoint <path>] [--verbose]
+"""
+
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+BACKFILL_PROCESSES = int(os.getenv("BACKFILL_PROCESSES", "4"))
+BACKFILL_SHARD_SIZE = int(os.getenv("BACKFILL_SHARD_SIZE", "200"))
+
+# Pares muestreados para estimar el costo en --dry-run
+BACKFILL_SAMPLE_SIZE = int(os.getenv("BACKFILL_SAMPLE_SIZE", "50"))
+
+DEFAULT_CHECKPOINT_PATH = Path(os.getenv("BACKFILL_CHECKPOINT_PATH", ".backfill_checkpoint.jsonl"))
+
+# Prefijo mínimo que OpenAI cachea automáticamente (tokens)
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+Pair = Tuple[str, str]
+Shard = Tuple[str, List[str]]
+
+
+def _service():
+    """
+    Importa matching_service bajo demanda: en los procesos del pool el import
+    tiene que ocurrir después de _init_worker (que ajusta los límites de rate).
+    """
+    import matching_service
+    return matching_service
+
+
+# ============================================================================
+# PLAN Y SHARDS
+# ============================================================================
+
+def plan_pairs(include_fresh: bool = False) -> List[Pair]:
+    """
+    Pares jobs activos × candidatos de la red.
+
+    Args:
+        include_fresh: Incluir también los pares con un match al día
+
+    Returns:
+        Lista de (job_id, candidate_id) ordenada por job
+    """
+    ms = _service()
+    from match_planner import fetch_active_jobs, network_candidate_ids
+
+    if not include_fresh:
+        return [(pair.job_id, pair.candidate_id) for pair in ms.plan_stale_pairs(ms.supabase, ms.PROMPT_VERSION)]
+
+    candidate_ids = network_candidate_ids(ms.supabase)
+    return [(job["id"], candidate_id) for job in fetch_active_jobs(ms.supabase) for candidate_id in candidate_ids]
+
+
+def make_shards(pairs: List[Pair], shard_size: int = BACKFILL_SHARD_SIZE) -> List[Shard]:
+    """Agrupa los pares por job y parte cada job en shards de shard_size candidatos"""
+    from match_planner import group_pairs_by_job
+
+    shards: List[Shard] = []
+    for job_id, candidate_ids in group_pairs_by_job(pairs).items():
+        for i in range(0, len(candidate_ids), shard_size):
+            shards.append((job_id, candidate_ids[i:i + shard_size]))
+    return shards
+
+
+# ============================================================================
+# CHECKPOINT
+# ============================================================================
+
+def load_checkpoint(path: Path, prompt_version: str) -> Set[Pair]:
+    """
+    Pares ya guardados con éxito con este PROMPT_VERSION.
+
+    Las líneas de otra versión del prompt o con error no cuentan (se re-evalúan).
+    Una última línea cortada por un crash se ignora.
+    """
+    done: Set[Pair] = set()
+    if not path.exists():
+        return done
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get("status") == "success" and entry.get("prompt_version") == prompt_version:
+                done.add((entry["job_id"], entry["candidate_id"]))
+    return done
+
+
+# ============================================================================
+# WORKERS
+# ============================================================================
+
+def _init_worker(processes: int, verbose: bool) -> None:
+    """
+    Inicializa un proceso del pool antes de que importe matching_service: cada
+    proceso recibe su parte de los límites configurados y, si no hay, de los
+    que informan los headers (OPENAI_RATE_LIMIT_SHARE, ver rate_limiter.py)
+    """
+    for name in ("OPENAI_RPM_LIMIT", "OPENAI_TPM_LIMIT"):
+        limit = int(os.getenv(name, "0"))
+        if limit:
+            os.environ[name] = str(max(1, limit // processes))
+    os.environ["OPENAI_RATE_LIMIT_SHARE"] = str(processes)
+    if not verbose:
+        sys.stdout = open(os.devnull, "w", encoding="utf-8")
+
+
+def _run_shard(task: Tuple[Shard, Optional[int]]) -> Dict[str, Any]:
+    """Evalúa un shard en el proceso actual; devuelve el estado por par y el usage"""
+    (job_id, candidate_ids), concurrency = task
+    ms = _service()
+    from llm_usage import usage_delta
+
+    usage_before = ms.usage_stats.stats()
+    try:
+        result = ms.calculate_and_save_matches(job_id, candidate_ids, max_workers=concurrency)
+        outcomes = [
+            {"candidate_id": match["candidate_id"], "status": "success", "match_source": match["match_source"]}
+            for match in result["results"]
+        ] + [
+            {"candidate_id": error["candidate_id"], "status": "error", "error": error["error"]}
+            for error in result["errors"]
+        ]
+    except Exception as e:
+        outcomes = [{"candidate_id": candidate_id, "status": "error", "error": str(e)} for candidate_id in candidate_ids]
+
+    return {
+        "job_id": job_id,
+        "prompt_version": ms.PROMPT_VERSION,
+        "outcomes": outcomes,
+        "usage": usage_delta(usage_before, ms.usage_stats.stats())
+    }
+
+
+# ============================================================================
+# DRY-RUN: ESTIMACIÓN DE COSTO
+# ============================================================================
+
+def estimate_cost(pairs: List[Pair], sample_size: int = BACKFILL_SAMPLE_SIZE) -> Dict[str, Any]:
+    """
+    Estima tokens y costo del backfill a partir de una muestra de pares.
+
+    Renderiza los mensajes reales de la muestra (pre-filtro incluido: los pares
+    que se resuelven por reglas no llaman al LLM) y extrapola al total.
+
+    Returns:
+        Dict con pairs, sample, llm_ratio, tokens estimados y cost_usd
+    """
+    ms = _service()
+    from data_loader import load_snapshot
+    from llm_usage import estimate_cost_usd
+    from rate_limiter import ESTIMATED_COMPLETION_TOKENS
+
+    sample = random.Random(0).sample(pairs, min(sample_size, len(pairs)))
+    snapshot = load_snapshot(ms.supabase, [job_id for job_id, _ in sample], [candidate_id for _, candidate_id in sample])
+    contexts = ms.get_candidate_contexts(snapshot.candidates, snapshot.experiences_by_candidate)
+
+    job_contexts: Dict[str, str] = {}
+    llm_pairs = 0
+    prompt_chars = 0
+    cached_chars = 0
+    for job_id, candidate_id in sample:
+        job = snapshot.jobs.get(job_id)
+        candidate = snapshot.candidates.get(candidate_id)
+        if job is None or candidate is None:
+            continue
+        if ms.run_prefilter(job, candidate, snapshot.experiences_for(candidate_id)) is not None:
+            continue
+        if job_id not in job_contexts:
+            job_contexts[job_id] = ms.build_job_context(job)
+        prefix_chars = sum(len(m["content"]) for m in ms.build_job_prefix_messages(job_contexts[job_id]))
+        llm_pairs += 1
+        prompt_chars += sum(len(m["content"]) for m in ms.build_match_messages(job_contexts[job_id], contexts[candidate_id]))
+        if prefix_chars // 4 >= PROMPT_CACHE_MIN_TOKENS:
+            cached_chars += prefix_chars
+
+    llm_ratio = llm_pairs / len(sample) if sample else 0.0
+    llm_calls = round(len(pairs) * llm_ratio)
+    # La primera llamada de cada job no encuentra el prefijo en el cache
+    cached_calls = max(0, llm_calls - len({job_id for job_id, _ in pairs}))
+    usage = {
+        "prompt_tokens": prompt_chars // 4 * llm_calls // llm_pairs if llm_pairs else 0,
+        "cached_tokens": cached_chars // 4 * cached_calls // llm_pairs if llm_pairs else 0,
+        "completion_tokens": ESTIMATED_COMPLETION_TOKENS * llm_calls
+    }
+    return {
+        "pairs": len(pairs),
+        "sample": len(sample),
+        "llm_ratio": round(llm_ratio, 3),
+        "llm_calls": llm_calls,
+        "usage": usage,
+        "cost_usd": estimate_cost_usd(usage, ms.OPENAI_MODEL)
+    }
+
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+def run_backfill(
+    include_fresh: bool = False,
+    dry_run: bool = False,
+    processes: int = BACKFILL_PROCESSES,
+    concurrency: Optional[int] = None,
+    shard_size: int = BACKFILL_SHARD_SIZE,
+    checkpoint: Path = DEFAULT_CHECKPOINT_PATH,
+    verbose: bool = False,
+    pairs: Optional[List[Pair]] = None
+) -> Dict[str, Any]:
+    """
+    Ejecuta (o estima, con dry_run) el backfill.
+
+    Args:
+        include_fresh: Incluir los pares con un match al día (--all)
+        dry_run: Solo planificar y estimar el costo
+        processes: Procesos del pool
+        concurrency: Llamadas en paralelo por proceso (default: MATCHING_MAX_CONCURRENCY)
+        shard_size: Candidatos por shard
+        checkpoint: Archivo JSONL de progreso
+        verbose: Mostrar los logs de matching de cada proceso
+        pairs: Pares explícitos en lugar del plan (opcional)
+
+    Returns:
+        Dict con el plan y, si no es dry_run, processed, errors, throughput, usage y cost_usd
+    """
+    ms = _service()
+    from llm_usage import estimate_cost_usd
+
+    started = time.perf_counter()
+    print("\n🧮 [BACKFILL] Planificando pares...")
+    if pairs is None:
+        pairs = plan_pairs(include_fresh)
+    done = load_checkpoint(checkpoint, ms.PROMPT_VERSION)
+    pending = [pair for pair in dict.fromkeys(pairs) if pair not in done]
+    shards = make_shards(pending, shard_size)
+    print(f"   ✅ {len(pairs)} pares, {len(pairs) - len(pending)} ya en el checkpoint, "
+          f"{len(pending)} pendientes en {len(shards)} shards")
+
+    summary: Dict[str, Any] = {
+        "status": "success",
+        "pairs": len(pairs),
+        "checkpointed": len(pairs) - len(pending),
+        "pending": len(pending),
+        "shards": len(shards),
+        "dry_run": dry_run
+    }
+    if dry_run:
+        summary["estimate"] = estimate_cost(pending) if pending else None
+        return summary
+    if not shards:
+        return summary
+
+    processes = max(1, min(processes, len(shards)))
+    usage = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+    counts = {"success": 0, "error": 0}
+    by_source: Dict[str, int] = {}
+    errors: List[Dict[str, str]] = []
+    print(f"\n🚀 [BACKFILL] {processes} procesos × {concurrency or ms.MAX_CONCURRENT_MATCHES} llamadas en paralelo")
+
+    context = multiprocessing.get_context("spawn")
+    tasks: Iterator[Tuple[Shard, Optional[int]]] = ((shard, concurrency) for shard in shards)
+    with checkpoint.open("a", encoding="utf-8") as checkpoint_file, \
+            context.Pool(processes, initializer=_init_worker, initargs=(processes, verbose)) as pool:
+        for shard_result in pool.imap_unordered(_run_shard, tasks):
+            for outcome in shard_result["outcomes"]:
+                counts[outcome["status"]] += 1
+                if outcome["status"] == "success":
+                    by_source[outcome["match_source"]] = by_source.get(outcome["match_source"], 0) + 1
+                else:
+                    errors.append({"job_id": shard_result["job_id"], **{k: outcome[k] for k in ("candidate_id", "error")}})
+                checkpoint_file.write(json.dumps({
+                    "job_id": shard_result["job_id"],
+                    "candidate_id": outcome["candidate_id"],
+                    "status": outcome["status"],
+                    "prompt_version": shard_result["prompt_version"]
+                }) + "\n")
+            checkpoint_file.flush()
+            for field in usage:
+                usage[field] += shard_result["usage"][field]
+
+            finished = counts["success"] + counts["error"]
+            rate = finished / (time.perf_counter() - started)
+            print(f"   ✅ {finished}/{len(pending)} pares ({rate:.1f} pares/s, {counts['error']} errores)")
+
+    elapsed = time.perf_counter() - started
+    summary.update({
+        "status": "success" if not errors else "partial",
+        "processed": counts["success"],
+        "errors": errors,
+        "by_source": by_source,
+        "duration_s": round(elapsed, 1),
+        "throughput": round((counts["success"] + counts["error"]) / elapsed, 2) if elapsed else None,
+        "usage": usage,
+        "cost_usd": estimate_cost_usd(usage, ms.OPENAI_MODEL)
+    })
+    return summary
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+
+    def _option(name: str, default: Any) -> Any:
+        if name in args:
+            index = args.index(name)
+            value = args[index + 1]
+            del args[index:index + 2]
+            return value
+        return default
+
+    checkpoint_path = Path(_option("--checkpoint", DEFAULT_CHECKPOINT_PATH))
+    process_count = int(_option("--processes", BACKFILL_PROCESSES))
+    concurrency_option = _option("--concurrency", None)
+    shard_size_option = int(_option("--shard-size", BACKFILL_SHARD_SIZE))
+    flags = {"--all", "--dry-run", "--verbose"}
+    unknown = [arg for arg in args if arg not in flags]
+    if unknown:
+        print(
+            "Uso: python backfill.py [--all] [--dry-run] [--processes N] [--concurrency N]\n"
+            "     [--shard-size N] [--checkpoint <path>] [--verbose]"
+        )
+        sys.exit(1)
+
+    try:
+        result = run_backfill(
+            include_fresh="--all" in args,
+            dry_run="--dry-run" in args,
+            processes=process_count,
+            concurrency=int(concurrency_option) if concurrency_option else None,
+            shard_size=shard_size_option,
+            checkpoint=checkpoint_path,
+            verbose="--verbose" in args
+        )
+        print(json.dumps(result, indent=2, default=str))
+    except KeyboardInterrupt:
+        print(f"\n⏸️  Backfill interrumpido; relanzar el mismo comando retoma desde {checkpoint_path}")
+        sys.exit(130)
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        sys.exit(1)
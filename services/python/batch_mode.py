@@ -0,0 +1,481 @@
+"""
+Modo batch (OpenAI Batch API) para re-scoring masivo.
+
+Para backfills grandes no hace falta latencia interactiva: el Batch API cuesta
+la mitad y no consume el rate limit síncrono. El flujo es:
+
+1. prepare: carga los datos en bloque (data_loader), resuelve por reglas los
+   mismatches duros (prefilter) y los análisis ya cacheados, y renderiza el
+   resto (SYSTEM_PROMPT + mensaje del par) en archivos JSONL de requests
+2. submit:  sube cada JSONL (purpose="batch") y crea el batch
+3. poll:    consulta el estado hasta que todos los batches terminan
+4. collect: parsea cada línea de salida a MatchAnalysis, arma el resultado con
+   matching_core (mismo score y match_detail que el camino en línea) y hace
+   upsert en bloque (match_writer)
+
+Cada transición se guarda en un archivo de estado JSON, así que un run
+interrumpido se retoma con --resume sin volver a subir ni a pagar nada.
+
+Uso:
+    python batch_mode.py <job_id> <candidate_id> [<candidate_id> ...]
+    python batch_mode.py --stale                # pares desactualizados (match_planner)
+    python batch_mode.py --resume               # retomar el run del archivo de estado
+    Opciones: --state <path>  --poll-interval <segundos>  --no-wait
+
+Para probar sin OpenAI: python openai_stub_server.py y OPENAI_BASE_URL=http://127.0.0.1:8787/v1
+"""
+
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import matching_service as ms
+from data_loader import load_snapshot
+from llm_backends import llm_backend_name
+from llm_usage import extract_usage
+from match_writer import MatchWriter
+from matching_core import build_match_result, match_result, match_row, response_format_param
+
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+
+# Límite de requests por batch del Batch API (50.000)
+BATCH_MAX_REQUESTS = int(os.getenv("MATCH_BATCH_MAX_REQUESTS", "50000"))
+BATCH_POLL_INTERVAL_SECONDS = float(os.getenv("MATCH_BATCH_POLL_INTERVAL", "60"))
+
+DEFAULT_STATE_PATH = Path(os.getenv("MATCH_BATCH_STATE_PATH", ".match_batch_state.json"))
+
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def make_custom_id(job_id: str, candidate_id: str) -> str:
+    """custom_id de la línea del batch (identifica el par en la salida)"""
+    return f"{job_id}:{candidate_id}"
+
+
+def build_batch_line(custom_id: str, job_context: str, candidate_context: str) -> Dict[str, Any]:
+    """
+    Construye una línea del JSONL de entrada: el mismo request que
+    matching_service.analyze_match (modelo, mensajes, temperatura y
+    Structured Outputs con el schema de MatchAnalysis).
+    """
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {
+            "model": ms.OPENAI_MODEL,
+            "messages": ms.build_match_messages(job_context, candidate_context),
+            "temperature": ms.OPENAI_TEMPERATURE,
+            "response_format": response_format_param(ms.MatchAnalysis),
+            "prompt_cache_key": ms.prompt_cache_key(job_context)
+        }
+    }
+
+
+def parse_batch_output_line(line: Dict[str, Any]) -> ms.MatchAnalysis:
+    """
+    Parsea una línea del archivo de salida del batch a MatchAnalysis.
+
+    Raises:
+        ValueError: Si el request falló o la respuesta no cumple el schema
+    """
+    if line.get("error"):
+        raise ValueError(f"❌ Error del batch: {line['error']}")
+
+    response = line.get("response") or {}
+    if response.get("status_code") != 200:
+        raise ValueError(f"❌ Respuesta {response.get('status_code')}: {response.get('body')}")
+
+    message = response["body"]["choices"][0]["message"]
+    if message.get("refusal"):
+        raise ValueError(f"❌ El modelo rechazó el request: {message['refusal']}")
+    if not message.get("content"):
+        raise ValueError("❌ El modelo no devolvió un análisis (respuesta vacía)")
+
+    return ms.MatchAnalysis.model_validate_json(message["content"])
+
+
+def _openai_client() -> Any:
+    """
+    Cliente de OpenAI del Batch API (files y batches).
+
+    Raises:
+        ValueError: Si el backend del modelo no es openai (ms.openai_client es None)
+    """
+    client = ms.openai_client
+    if client is None:
+        raise ValueError(
+            f"❌ El modo batch usa el Batch API de OpenAI: requiere MATCHING_LLM_BACKEND=openai "
+            f"(actual: {llm_backend_name()}). Para probar sin OpenAI, usar openai_stub_server.py con OPENAI_BASE_URL"
+        )
+    return client
+
+
+# ============================================================================
+# ESTADO
+# ============================================================================
+
+def load_state(state_path: Path) -> Optional[Dict[str, Any]]:
+    """Lee el archivo de estado (None si no existe)"""
+    if not state_path.exists():
+        return None
+    return json.loads(state_path.read_text(encoding="utf-8"))
+
+
+def save_state(state_path: Path, state: Dict[str, Any]) -> None:
+    """Escribe el estado de forma atómica (archivo temporal + rename)"""
+    state["updated_at"] = datetime.now().isoformat()
+    tmp_path = state_path.with_name(state_path.name + ".tmp")
+    tmp_path.write_text(json.dumps(state, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, state_path)
+
+
+def is_finished(state: Dict[str, Any]) -> bool:
+    """True si todos los batches del run ya se recolectaron"""
+    return all(batch["collected"] for batch in state["batches"])
+
+
+# ============================================================================
+# PASOS
+# ============================================================================
+
+def prepare_batch(pairs: Iterable[Tuple[str, str]], state_path: Path) -> Dict[str, Any]:
+    """
+    Carga los datos de los pares, guarda directamente los que no necesitan al
+    LLM (pre-filtro o cache) y escribe los JSONL de entrada del resto.
+
+    Args:
+        pairs: Pares (job_id, candidate_id)
+        state_path: Archivo de estado; los JSONL se escriben a su lado
+
+    Returns:
+        Estado inicial del run (ya guardado en state_path)
+    """
+    pairs = list(dict.fromkeys(pairs))
+    print(f"\n📦 [BATCH] Preparando {len(pairs)} pares...")
+
+    snapshot = load_snapshot(ms.supabase, [job_id for job_id, _ in pairs], [cid for _, cid in pairs])
+    job_contexts: Dict[str, str] = {}
+    # Una lectura/escritura al resume store para todos los candidatos del run
+    candidate_contexts = ms.get_candidate_contexts(snapshot.candidates, snapshot.experiences_by_candidate)
+
+    state: Dict[str, Any] = {
+        "created_at": datetime.now().isoformat(),
+        "pairs": {},
+        "batches": [],
+        "counts": {"total": len(pairs), "rule_based": 0, "cached": 0, "submitted": 0, "processed": 0},
+        "errors": []
+    }
+    lines: List[Dict[str, Any]] = []
+
+    with MatchWriter(ms.supabase) as writer:
+        for job_id, candidate_id in pairs:
+            job = snapshot.jobs.get(job_id)
+            candidate = snapshot.candidates.get(candidate_id)
+            if job is None or candidate is None:
+                missing = f"Job no encontrado: {job_id}" if job is None else f"Candidato no encontrado: {candidate_id}"
+                state["errors"].append({"job_id": job_id, "candidate_id": candidate_id, "error": missing})
+                continue
+
+            experiences = snapshot.experiences_for(candidate_id)
+
+            # Mismatch duro: análisis por reglas, sin pasar por el batch
+            prefiltered = ms.run_prefilter(job, candidate, experiences)
+            if prefiltered is not None:
+                writer.add(match_row(build_match_result(
+                    job, candidate, experiences, prefiltered, ms.RULE_BASED_MATCH_SOURCE
+                )))
+                state["counts"]["rule_based"] += 1
+                continue
+
+            if job_id not in job_contexts:
+                job_contexts[job_id] = ms.build_job_context(job)
+            candidate_context = candidate_contexts[candidate_id]
+
+            # Análisis ya cacheado: se guarda sin pasar por el batch
+            cache_key = ms.make_cache_key(ms.PROMPT_VERSION, ms.OPENAI_MODEL, job_contexts[job_id], candidate_context)
+            cached = ms.analysis_cache.get(cache_key) if ms.analysis_cache is not None else None
+            if cached is not None:
+                match_analysis = ms.MatchAnalysis.model_validate_json(cached)
+                writer.add(match_row(build_match_result(job, candidate, experiences, match_analysis, ms.MATCH_SOURCE)))
+                state["counts"]["cached"] += 1
+                continue
+
+            # La huella de inputs se fija ahora: es la de los datos que se renderizaron en el batch
+            custom_id = make_custom_id(job_id, candidate_id)
+            state["pairs"][custom_id] = {
+                "job_id": job_id,
+                "candidate_id": candidate_id,
+                "input_fingerprint": ms.compute_input_fingerprint(job, candidate, experiences, ms.PROMPT_VERSION),
+                "cache_key": cache_key
+            }
+            lines.append(build_batch_line(custom_id, job_contexts[job_id], candidate_context))
+
+    # Un JSONL por batch (límite de requests por batch del API)
+    for index in range(0, len(lines), BATCH_MAX_REQUESTS):
+        chunk = lines[index:index + BATCH_MAX_REQUESTS]
+        input_path = state_path.with_name(f"{state_path.stem}.input-{len(state['batches'])}.jsonl")
+        input_path.write_text(
+            "".join(json.dumps(line, ensure_ascii=False) + "\n" for line in chunk),
+            encoding="utf-8"
+        )
+        state["batches"].append({
+            "input_path": str(input_path),
+            "requests": len(chunk),
+            "input_file_id": None,
+            "batch_id": None,
+            "status": "pending",
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": None,
+            "collected": False
+        })
+
+    state["counts"]["submitted"] = len(lines)
+    save_state(state_path, state)
+
+    print(f"   ⚡ Resueltos por reglas: {state['counts']['rule_based']}")
+    print(f"   ♻️  Obtenidos del cache: {state['counts']['cached']}")
+    print(f"   📝 Requests para el Batch API: {len(lines)} en {len(state['batches'])} batch(es)")
+    return state
+
+
+def submit_pending(state: Dict[str, Any], state_path: Path) -> None:
+    """Sube los JSONL y crea los batches que todavía no se enviaron"""
+    for batch in state["batches"]:
+        if batch["batch_id"] is not None:
+            continue
+
+        if batch["input_file_id"] is None:
+            content = Path(batch["input_path"]).read_bytes()
+            uploaded = _openai_client().files.create(
+                file=(Path(batch["input_path"]).name, io.BytesIO(content)),
+                purpose="batch"
+            )
+            batch["input_file_id"] = uploaded.id
+            save_state(state_path, state)
+
+        created = _openai_client().batches.create(
+            input_file_id=batch["input_file_id"],
+            endpoint=BATCH_ENDPOINT,
+            completion_window=BATCH_COMPLETION_WINDOW,
+            metadata={"source": "referal-program-matching", "prompt_version": ms.PROMPT_VERSION}
+        )
+        batch["batch_id"] = created.id
+        batch["status"] = created.status
+        save_state(state_path, state)
+        print(f"   🚀 Batch enviado: {created.id} ({batch['requests']} requests)")
+
+
+def poll_batches(
+    state: Dict[str, Any],
+    state_path: Path,
+    poll_interval: float = BATCH_POLL_INTERVAL_SECONDS,
+    wait: bool = True
+) -> bool:
+    """
+    Actualiza el estado de los batches en curso.
+
+    Args:
+        wait: Si es True, repite cada `poll_interval` segundos hasta que todos terminan
+
+    Returns:
+        True si todos los batches están en un estado terminal
+    """
+    while True:
+        for batch in state["batches"]:
+            if batch["batch_id"] is None or batch["status"] in TERMINAL_STATUSES:
+                continue
+            remote = _openai_client().batches.retrieve(batch["batch_id"])
+            batch["status"] = remote.status
+            batch["output_file_id"] = remote.output_file_id
+            batch["error_file_id"] = remote.error_file_id
+            if remote.request_counts is not None:
+                batch["request_counts"] = remote.request_counts.model_dump()
+        save_state(state_path, state)
+
+        pending = [b for b in state["batches"] if b["status"] not in TERMINAL_STATUSES]
+        if not pending or not wait:
+            return not pending
+
+        done = sum(1 for b in state["batches"] if b["status"] in TERMINAL_STATUSES)
+        print(f"   ⏳ {done}/{len(state['batches'])} batches terminados, esperando {poll_interval:.0f}s...")
+        time.sleep(poll_interval)
+
+
+def _read_jsonl_file(file_id: Optional[str]) -> List[Dict[str, Any]]:
+    if not file_id:
+        return []
+    content = _openai_client().files.content(file_id).text
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+def collect_results(state: Dict[str, Any], state_path: Path) -> None:
+    """Parsea la salida de los batches terminados y hace upsert de los resultados"""
+    for batch in state["batches"]:
+        if batch["collected"] or batch["status"] not in TERMINAL_STATUSES:
+            continue
+
+        seen = set()
+        with MatchWriter(ms.supabase) as writer:
+            for line in _read_jsonl_file(batch["output_file_id"]) + _read_jsonl_file(batch["error_file_id"]):
+                custom_id = line.get("custom_id")
+                pair = state["pairs"].get(custom_id)
+                if pair is None or custom_id in seen:
+                    continue
+                seen.add(custom_id)
+
+                try:
+                    match_analysis = parse_batch_output_line(line)
+                except Exception as e:
+                    state["errors"].append({"job_id": pair["job_id"], "candidate_id": pair["candidate_id"], "error": str(e)})
+                    continue
+
+                if ms.analysis_cache is not None:
+                    ms.analysis_cache.set(pair["cache_key"], match_analysis.model_dump_json())
+
+                usage = extract_usage(line["response"]["body"].get("usage"))
+                ms.usage_stats.record(usage)
+
+                writer.add(match_row(match_result(
+                    pair["job_id"],
+                    pair["candidate_id"],
+                    match_analysis,
+                    ms.MATCH_SOURCE,
+                    pair["input_fingerprint"],
+                    usage
+                )))
+
+        # Requests sin línea de salida (batch expirado, cancelado o fallido)
+        batch_ids = [
+            json.loads(raw)["custom_id"]
+            for raw in Path(batch["input_path"]).read_text(encoding="utf-8").splitlines() if raw.strip()
+        ]
+        for custom_id in batch_ids:
+            if custom_id not in seen:
+                pair = state["pairs"][custom_id]
+                state["errors"].append({
+                    "job_id": pair["job_id"],
+                    "candidate_id": pair["candidate_id"],
+                    "error": f"Sin resultado en el batch {batch['batch_id']} (status: {batch['status']})"
+                })
+
+        state["counts"]["processed"] += writer.written
+        batch["collected"] = True
+        save_state(state_path, state)
+        print(f"   💾 Batch {batch['batch_id']}: {writer.written} matches guardados")
+
+
+# ============================================================================
+# FUNCIÓN PRINCIPAL
+# ============================================================================
+
+def run_batch(
+    pairs: Optional[Iterable[Tuple[str, str]]] = None,
+    state_path: Path = DEFAULT_STATE_PATH,
+    poll_interval: float = BATCH_POLL_INTERVAL_SECONDS,
+    wait: bool = True
+) -> Dict[str, Any]:
+    """
+    Ejecuta (o retoma) un run del modo batch.
+
+    Args:
+        pairs: Pares (job_id, candidate_id) de un run nuevo. None para retomar
+            el run guardado en state_path
+        state_path: Archivo de estado del run
+        poll_interval: Segundos entre consultas de estado
+        wait: Esperar a que terminen los batches (False: enviar y salir; luego --resume)
+
+    Returns:
+        Dict con status, counts (total, rule_based, cached, submitted,
+        processed), batches y errors
+    """
+    # Antes de preparar: sin cliente de OpenAI no hay que guardar nada a medias
+    _openai_client()
+    state_path = Path(state_path)
+    state = load_state(state_path)
+
+    if pairs is not None:
+        if state is not None and not is_finished(state):
+            raise ValueError(
+                f"❌ {state_path} tiene un run sin terminar: retomalo con --resume o usa otro --state"
+            )
+        state = prepare_batch(pairs, state_path)
+    elif state is None:
+        raise ValueError(f"❌ No hay run para retomar en {state_path}")
+    else:
+        print(f"\n♻️  [BATCH] Retomando run de {state_path}")
+
+    submit_pending(state, state_path)
+    if poll_batches(state, state_path, poll_interval, wait):
+        collect_results(state, state_path)
+
+    finished = is_finished(state)
+    print(
+        f"\n{'✅' if finished else '⏳'} [BATCH] {state['counts']['processed']} matches por batch, "
+        f"{state['counts']['rule_based']} por reglas, {state['counts']['cached']} del cache, "
+        f"{len(state['errors'])} errores"
+    )
+
+    return {
+        "status": ("success" if not state["errors"] else "partial") if finished else "in_progress",
+        "state_path": str(state_path),
+        "counts": state["counts"],
+        "batches": [
+            {key: batch[key] for key in ("batch_id", "status", "requests", "request_counts")}
+            for batch in state["batches"]
+        ],
+        "errors": state["errors"]
+    }
+
+
+def _stale_pairs() -> List[Tuple[str, str]]:
+    stale = ms.plan_stale_pairs(ms.supabase, ms.PROMPT_VERSION)
+    return [(pair.job_id, pair.candidate_id) for pair in stale]
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+
+    def _option(name: str, default: Any) -> Any:
+        if name in args:
+            index = args.index(name)
+            value = args[index + 1]
+            del args[index:index + 2]
+            return value
+        return default
+
+    state_file = Path(_option("--state", DEFAULT_STATE_PATH))
+    interval = float(_option("--poll-interval", BATCH_POLL_INTERVAL_SECONDS))
+    wait_for_completion = "--no-wait" not in args
+    args = [arg for arg in args if arg != "--no-wait"]
+
+    try:
+        if args == ["--resume"]:
+            result = run_batch(None, state_file, interval, wait_for_completion)
+        elif args == ["--stale"]:
+            result = run_batch(_stale_pairs(), state_file, interval, wait_for_completion)
+        elif len(args) >= 2 and not args[0].startswith("--"):
+            result = run_batch([(args[0], cid) for cid in args[1:]], state_file, interval, wait_for_completion)
+        else:
+            print(
+                "Uso: python batch_mode.py <job_id> <candidate_id> [<candidate_id> ...] | --stale | --resume\n"
+                "     [--state <path>] [--poll-interval <segundos>] [--no-wait]"
+            )
+            sys.exit(1)
+
+        print(json.dumps(result, indent=2, default=str))
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        sys.exit(1)
@@ -0,0 +1,146 @@
+"""
+Benchmark: costo de importar matching_service (cold start).
+
+Corre `python -X importtime -c "import matching_service"` en un proceso nuevo
+por ronda (services/python, el mismo código que carga api/ai-match.py) y
+reporta la mediana del tiempo acumulado del import, el wall-clock del proceso
+(contra `python -c pass`), los módulos más caros y si openai/supabase se
+importaron (no deberían: se cargan en el primer uso, ver
+_ensure_clients_initialized).
+
+Uso:
+    python benchmarks/bench_import_time.py [--rounds 7] [--top 10] [--json]
+
+No necesita variables de entorno ni hace llamadas: importar el módulo no crea
+clientes.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+
+COPIES = {
+    "services": SERVICE_DIR,
+}
+
+# Dependencias pesadas que no deberían cargarse al importar el módulo
+HEAVY_MODULES = ("openai", "supabase", "httpx", "dotenv")
+
+# "import time: <self us> | <cumulative us> | <indentación><módulo>"
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def _clean_env() -> Dict[str, str]:
+    """Entorno sin credenciales: el import no debe necesitarlas"""
+    env = dict(os.environ)
+    for name in ("OPENAI_API_KEY", "SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY"):
+        env.pop(name, None)
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    return env
+
+
+def run_importtime(copy_dir: Path) -> Tuple[float, List[Tuple[str, int, int]]]:
+    """
+    Importa matching_service en un proceso nuevo con -X importtime.
+
+    Returns:
+        (wall-clock del proceso en ms, [(módulo, self µs, acumulado µs), ...])
+    """
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import matching_service"],
+        cwd=copy_dir,
+        env=_clean_env(),
+        capture_output=True,
+        text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if completed.returncode != 0:
+        raise ValueError(f"❌ Falló el import en {copy_dir}: {completed.stderr.strip().splitlines()[-1:]}")
+
+    # Solo los imports anidados bajo matching_service (no los del arranque: site, encodings, ...)
+    modules: List[Tuple[str, int, int]] = []
+    for line in completed.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        name, nested = match.group(4), len(match.group(3)) > 1
+        if not nested and name != "matching_service":
+            modules = []
+            continue
+        modules.append((name, int(match.group(1)), int(match.group(2))))
+        if name == "matching_service":
+            break
+    return wall_ms, modules
+
+
+def baseline_wall_ms() -> float:
+    """Wall-clock de arrancar el intérprete sin importar nada"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], env=_clean_env(), check=True)
+    return (time.perf_counter() - started) * 1000
+
+
+def measure(copy_dir: Path, rounds: int, top: int) -> Dict[str, Any]:
+    """Mediana de `rounds` imports en frío de una copia del módulo"""
+    walls, cumulatives = [], []
+    last_modules: List[Tuple[str, int, int]] = []
+    for _ in range(rounds):
+        wall_ms, modules = run_importtime(copy_dir)
+        walls.append(wall_ms)
+        cumulatives.append(next(cum for name, _, cum in modules if name == "matching_service") / 1000)
+        last_modules = modules
+
+    top_level = {}
+    for name, _, cumulative in last_modules:
+        root = name.split(".")[0]
+        top_level[root] = max(top_level.get(root, 0), cumulative)
+    top_level.pop("matching_service", None)
+
+    return {
+        "import_ms": round(statistics.median(cumulatives), 1),
+        "wall_ms": round(statistics.median(walls), 1),
+        "heavy_imported": [name for name in HEAVY_MODULES if name in top_level],
+        "top_modules": [
+            {"module": name, "cumulative_ms": round(cumulative / 1000, 1)}
+            for name, cumulative in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:top]
+        ]
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tiempo de import de matching_service (cold start)")
+    parser.add_argument("--rounds", type=int, default=7, help="Procesos por copia (default 7)")
+    parser.add_argument("--top", type=int, default=10, help="Módulos más caros a mostrar (default 10)")
+    parser.add_argument("--json", action="store_true", help="Imprimir el resultado como JSON")
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {
+        "python": sys.version.split()[0],
+        "interpreter_wall_ms": round(statistics.median(baseline_wall_ms() for _ in range(args.rounds)), 1),
+        "copies": {name: measure(path, args.rounds, args.top) for name, path in COPIES.items() if path.exists()}
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"Python {results['python']}, intérprete sin imports: {results['interpreter_wall_ms']} ms")
+    for name, result in results["copies"].items():
+        heavy = ", ".join(result["heavy_imported"]) or "ninguna"
+        print(f"\n[{name}] import: {result['import_ms']} ms, proceso: {result['wall_ms']} ms, dependencias pesadas: {heavy}")
+        for module in result["top_modules"]:
+            print(f"   {module['cumulative_ms']:>8} ms  {module['module']}")
+
+
+if __name__ == "__main__":
+    main()
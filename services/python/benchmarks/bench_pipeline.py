@@ -0,0 +1,412 @@
+"""
+Benchmark: throughput de punta a punta del pipeline de matching.
+
+Corre matching_service.calculate_and_save_matches (el mismo flujo batch que la
+CLI, el worker y el servidor HTTP) con el cliente real de supabase-py contra
+postgrest_stub.py y un backend local del modelo (ver llm_backends.py), sobre el
+dataset sintético de synthetic_data.py: un job contra 1, 10, 100, 1.000 y
+10.000 candidatos. Los stubs corren en procesos aparte para no competir por
+el GIL con el matcher.
+
+Por tamaño reporta pares/segundo (mediana de las rondas), la latencia p50/p95/
+p99 de cada etapa y la memoria pico de una ronda extra con tracemalloc:
+
+    fetch    cada query paginada de data_loader (jobs, candidates, experiencias)
+    render   contexto de cada candidato (build_candidate_context)
+    llm      cada llamada al modelo (call_structured_output, incluye reintentos)
+    score    score final y match_detail de cada par (build_match_result)
+    persist  cada upsert en bloque a job_candidate_matches (match_writer)
+
+El cache de análisis y el resume store se desactivan (cada ronda mide el
+camino en frío) salvo con --warm-caches.
+
+Uso:
+    python benchmarks/bench_pipeline.py [--sizes 1,10,100,1000,10000] [--rounds 3]
+                                        [--llm fake|http-stub] [--llm-latency-ms 0]
+                                        [--llm-error-rate 0] [--db-latency-ms 0]
+                                        [--concurrency 8] [--candidates-per-prompt 1]
+                                        [--experiences 4] [--seed 7] [--warm-caches]
+                                        [--no-memory] [--output results.json]
+                                        [--compare baseline.json] [--json]
+
+No necesita credenciales ni red: OpenAI y Supabase se reemplazan por los stubs.
+Para comparar commits, guardar el resultado con --output en uno y pasarlo con
+--compare en el otro (mismos --sizes, --seed y latencias).
+"""
+
+import argparse
+import contextlib
+import functools
+import json
+import os
+import platform
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+SERVICE_DIR = BENCHMARKS_DIR.parent
+sys.path.insert(0, str(SERVICE_DIR))
+sys.path.insert(0, str(BENCHMARKS_DIR))
+
+from synthetic_data import make_dataset  # noqa: E402
+
+DEFAULT_SIZES = (1, 10, 100, 1000, 10000)
+STAGES = ("fetch", "render", "llm", "score", "persist")
+PERCENTILES = (50, 95, 99)
+STUB_STARTUP_TIMEOUT_SECONDS = 60
+
+
+# ============================================================================
+# STUBS (procesos aparte)
+# ============================================================================
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port: int, process: subprocess.Popen, name: str) -> None:
+    """Espera a que el stub acepte conexiones (o falla si el proceso terminó)"""
+    deadline = time.monotonic() + STUB_STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise ValueError(f"❌ El stub {name} terminó al arrancar (código {process.returncode})")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise ValueError(f"❌ El stub {name} no respondió en {STUB_STARTUP_TIMEOUT_SECONDS}s")
+
+
+def start_stub(name: str, script: Path, options: List[str]) -> Tuple[subprocess.Popen, int]:
+    """
+    Arranca un stub (postgrest_stub.py u openai_stub_server.py) en un proceso nuevo.
+
+    Returns:
+        (proceso, puerto)
+    """
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, str(script), "--port", str(port), *options],
+        cwd=SERVICE_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    _wait_for_port(port, process, name)
+    return process, port
+
+
+# ============================================================================
+# MEDICIÓN POR ETAPA
+# ============================================================================
+
+class StageTimer:
+    """Duraciones (ms) por etapa, registradas desde cualquier hilo"""
+
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def wrap(self, stage: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Versión de fn que registra su duración en `stage`"""
+        @functools.wraps(fn)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                with self._lock:
+                    self.samples[stage].append(elapsed_ms)
+        return timed
+
+    def take(self) -> Dict[str, List[float]]:
+        """Devuelve y limpia las muestras acumuladas"""
+        with self._lock:
+            samples, self.samples = self.samples, defaultdict(list)
+        return samples
+
+
+def instrument(ms: Any, timer: StageTimer) -> None:
+    """Envuelve las funciones de cada etapa (se resuelven por nombre de módulo en cada llamada)"""
+    import data_loader
+    import match_writer
+
+    data_loader.fetch_all = timer.wrap("fetch", data_loader.fetch_all)
+    ms.build_candidate_context = timer.wrap("render", ms.build_candidate_context)
+    ms.call_structured_output = timer.wrap("llm", ms.call_structured_output)
+    ms.build_match_result = timer.wrap("score", ms.build_match_result)
+    match_writer.upsert_matches = timer.wrap("persist", match_writer.upsert_matches)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano (0 si no hay muestras)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize_stage(samples: List[float], rounds: int) -> Dict[str, Any]:
+    summary = {
+        "calls": len(samples) // rounds,
+        "total_ms": round(sum(samples) / rounds, 2)
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}_ms"] = round(percentile(samples, pct), 3)
+    return summary
+
+
+# ============================================================================
+# RONDAS
+# ============================================================================
+
+def run_round(ms: Any, job_id: str, candidate_ids: List[str]) -> Tuple[float, Dict[str, Any]]:
+    """
+    Una corrida de calculate_and_save_matches (sin los prints del matcher).
+
+    Returns:
+        (segundos, resultado)
+    """
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        result = ms.calculate_and_save_matches(job_id, candidate_ids)
+        elapsed = time.perf_counter() - started
+    return elapsed, result
+
+
+def measure_memory(ms: Any, job_id: str, candidate_ids: List[str]) -> Dict[str, float]:
+    """Ronda extra con tracemalloc: pico de memoria Python asignada durante la corrida"""
+    tracemalloc.start()
+    try:
+        run_round(ms, job_id, candidate_ids)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # ru_maxrss: KB en Linux, bytes en macOS; es el máximo del proceso hasta ahora
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    max_rss_mb = max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+    return {"peak_traced_mb": round(peak / (1024 * 1024), 2), "max_rss_mb": round(max_rss_mb, 1)}
+
+
+def measure_size(
+    ms: Any,
+    timer: StageTimer,
+    job_id: str,
+    candidate_ids: List[str],
+    rounds: int,
+    with_memory: bool
+) -> Dict[str, Any]:
+    """Rondas de un tamaño de batch: throughput, latencias por etapa y memoria"""
+    walls: List[float] = []
+    samples: Dict[str, List[float]] = defaultdict(list)
+    sources: Dict[str, int] = defaultdict(int)
+    errors = 0
+    timer.take()
+    for _ in range(rounds):
+        elapsed, result = run_round(ms, job_id, candidate_ids)
+        walls.append(elapsed)
+        errors += len(result["errors"])
+        for item in result["results"]:
+            sources[item["match_source"]] += 1
+        for stage, values in timer.take().items():
+            samples[stage].extend(values)
+
+    pairs = len(candidate_ids)
+    report: Dict[str, Any] = {
+        "pairs": pairs,
+        "rounds": rounds,
+        "pairs_per_second": round(pairs / statistics.median(walls), 1),
+        "wall_ms": {f"p{pct}": round(percentile(walls, pct) * 1000, 1) for pct in PERCENTILES},
+        "match_sources": {source: count // rounds for source, count in sorted(sources.items())},
+        "errors": errors,
+        "stages": {stage: summarize_stage(samples.get(stage, []), rounds) for stage in STAGES}
+    }
+    if with_memory:
+        report["memory"] = measure_memory(ms, job_id, candidate_ids)
+        timer.take()
+    return report
+
+
+# ============================================================================
+# COMPARACIÓN ENTRE COMMITS
+# ============================================================================
+
+def _delta(current: float, baseline: float) -> Optional[float]:
+    return round((current - baseline) / baseline * 100, 1) if baseline else None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """Variación porcentual (actual vs baseline) de pares/s y del p95 de cada etapa"""
+    comparison = {}
+    for size, current in results["sizes"].items():
+        previous = baseline.get("sizes", {}).get(size)
+        if previous is None:
+            continue
+        comparison[size] = {
+            "pairs_per_second_pct": _delta(current["pairs_per_second"], previous["pairs_per_second"]),
+            "p95_ms_pct": {
+                stage: _delta(current["stages"][stage]["p95_ms"], previous["stages"][stage]["p95_ms"])
+                for stage in STAGES if stage in previous.get("stages", {})
+            }
+        }
+    return comparison
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        completed = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVICE_DIR, capture_output=True, text=True, check=True
+        )
+        return completed.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def configure_environment(args: argparse.Namespace, supabase_port: int, llm_port: Optional[int]) -> None:
+    """Variables de matching_service: deben fijarse antes de importarlo"""
+    os.environ.update({
+        "SUPABASE_URL": f"http://127.0.0.1:{supabase_port}",
+        "SUPABASE_SERVICE_ROLE_KEY": "stub.stub.stub",
+        "MATCHING_LLM_BACKEND": args.llm,
+        "MATCHING_FAKE_LATENCY_MS": str(args.llm_latency_ms),
+        "MATCHING_MAX_CONCURRENCY": str(args.concurrency),
+        "MATCH_CANDIDATES_PER_PROMPT": str(args.candidates_per_prompt),
+    })
+    if llm_port is not None:
+        os.environ["MATCHING_LLM_STUB_URL"] = f"http://127.0.0.1:{llm_port}/v1"
+    if not args.warm_caches:
+        os.environ["MATCH_CACHE_BACKEND"] = "none"
+        os.environ["RESUME_STORE_BACKEND"] = "none"
+
+
+def print_report(results: Dict[str, Any]) -> None:
+    meta = results["meta"]
+    print(
+        f"Commit {meta['commit'] or '?'}, Python {meta['python']}, backend {meta['config']['llm']}, "
+        f"concurrencia {meta['config']['concurrency']}"
+    )
+    for size, report in results["sizes"].items():
+        memory = report.get("memory")
+        memory_text = f", memoria pico {memory['peak_traced_mb']} MB" if memory else ""
+        print(
+            f"\n[{size} pares] {report['pairs_per_second']} pares/s, "
+            f"wall p50 {report['wall_ms']['p50']} ms{memory_text}, errores {report['errors']}"
+        )
+        print(f"   {'etapa':<8} {'llamadas':>9} {'total ms':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for stage, stats in report["stages"].items():
+            print(
+                f"   {stage:<8} {stats['calls']:>9} {stats['total_ms']:>10} "
+                f"{stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}"
+            )
+    for size, delta in results.get("comparison", {}).items():
+        stages = ", ".join(f"{stage} {pct:+}%" for stage, pct in delta["p95_ms_pct"].items() if pct is not None)
+        pairs_pct = delta["pairs_per_second_pct"]
+        if pairs_pct is not None:
+            print(f"\nvs baseline [{size} pares]: pares/s {pairs_pct:+}%, p95 {stages}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Throughput de punta a punta del pipeline de matching")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Candidatos por batch (default 1,10,100,1000,10000)")
+    parser.add_argument("--rounds", type=int, default=3, help="Rondas medidas por tamaño (default 3)")
+    parser.add_argument("--llm", choices=("fake", "http-stub"), default="fake", help="Backend del modelo (default fake)")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Latencia por llamada al modelo (default 0)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fracción de llamadas con error (solo http-stub)")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="Latencia por request a PostgREST (default 0)")
+    parser.add_argument("--concurrency", type=int, default=8, help="MATCHING_MAX_CONCURRENCY (default 8)")
+    parser.add_argument("--candidates-per-prompt", type=int, default=1, help="MATCH_CANDIDATES_PER_PROMPT (default 1)")
+    parser.add_argument("--experiences", type=int, default=4, help="Experiencias por candidato (default 4)")
+    parser.add_argument("--seed", type=int, default=7, help="Semilla del dataset (default 7)")
+    parser.add_argument("--warm-caches", action="store_true", help="Dejar activos el cache de análisis y el resume store")
+    parser.add_argument("--no-memory", action="store_true", help="No medir memoria (sin la ronda con tracemalloc)")
+    parser.add_argument("--output", help="Guardar el resultado (JSON) en este archivo")
+    parser.add_argument("--compare", help="Resultado anterior (JSON de --output) contra el que comparar")
+    parser.add_argument("--json", action="store_true", help="Imprimir el resultado como JSON")
+    args = parser.parse_args()
+
+    sizes = sorted({int(size) for size in args.sizes.split(",") if size.strip()})
+    if not sizes or sizes[0] < 1:
+        raise ValueError("❌ --sizes debe ser una lista de enteros positivos")
+    dataset_options = ["--candidates", str(sizes[-1]), "--experiences", str(args.experiences), "--seed", str(args.seed)]
+
+    processes = []
+    try:
+        postgrest, supabase_port = start_stub(
+            "postgrest",
+            BENCHMARKS_DIR / "postgrest_stub.py",
+            [*dataset_options, "--latency-ms", str(args.db_latency_ms)]
+        )
+        processes.append(postgrest)
+        llm_port = None
+        if args.llm == "http-stub":
+            llm_stub, llm_port = start_stub(
+                "openai",
+                SERVICE_DIR / "openai_stub_server.py",
+                ["--latency-ms", str(args.llm_latency_ms), "--error-rate", str(args.llm_error_rate), "--seed", str(args.seed)]
+            )
+            processes.append(llm_stub)
+        configure_environment(args, supabase_port, llm_port)
+
+        # Se importa después de configurar el entorno (lee su configuración al importarse)
+        import matching_service as ms
+
+        dataset = make_dataset(sizes[-1], args.experiences, seed=args.seed)
+        job_id = dataset["jobs"][0]["id"]
+        candidate_ids = [candidate["id"] for candidate in dataset["candidates"]]
+
+        timer = StageTimer()
+        instrument(ms, timer)
+        # Calentamiento: clientes, conexiones y primer import de cada módulo fuera de la medición
+        run_round(ms, job_id, candidate_ids[:1])
+
+        results: Dict[str, Any] = {
+            "meta": {
+                "commit": _git_commit(),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "config": {name: value for name, value in vars(args).items() if name not in ("output", "compare", "json")}
+            },
+            "sizes": {
+                str(size): measure_size(ms, timer, job_id, candidate_ids[:size], args.rounds, not args.no_memory)
+                for size in sizes
+            }
+        }
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            results["comparison"] = compare(results, json.load(baseline_file))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark: select("*") vs proyección de columnas (data_loader.REQUIRED_FIELDS).
+
+Para cada tabla que lee el matcher hace la misma query contra PostgREST con
+select=* y con las columnas del esquema, y mide bytes transferidos (en el cable
+y descomprimidos), tiempo de respuesta y tiempo de decode del JSON.
+
+Uso:
+    python benchmarks/bench_projection.py [--limit 500] [--repeat 5] [--json]
+
+Requiere SUPABASE_URL y SUPABASE_SERVICE_ROLE_KEY (o un .env como matching_service).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SERVICE_DIR))
+
+from data_loader import REQUIRED_FIELDS, select_columns  # noqa: E402
+
+try:
+    from dotenv import load_dotenv
+    for env_file in (SERVICE_DIR / ".env", SERVICE_DIR.parent.parent / ".env", SERVICE_DIR.parent.parent / ".env.local"):
+        if env_file.exists():
+            load_dotenv(env_file)
+            break
+except ImportError:
+    pass
+
+
+def measure(client: httpx.Client, table: str, select: str, limit: int, repeat: int) -> Dict[str, Any]:
+    """Ejecuta la query `repeat` veces y devuelve medianas de bytes y tiempos"""
+    wire_bytes: List[int] = []
+    body_bytes: List[int] = []
+    fetch_ms: List[float] = []
+    decode_ms: List[float] = []
+    rows = 0
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(f"/rest/v1/{table}", params={"select": select, "limit": str(limit)})
+        response.raise_for_status()
+        fetched = time.perf_counter()
+
+        payload = json.loads(response.content)
+        decoded = time.perf_counter()
+
+        rows = len(payload)
+        wire_bytes.append(response.num_bytes_downloaded)
+        body_bytes.append(len(response.content))
+        fetch_ms.append((fetched - started) * 1000)
+        decode_ms.append((decoded - fetched) * 1000)
+
+    return {
+        "rows": rows,
+        "wire_bytes": int(statistics.median(wire_bytes)),
+        "body_bytes": int(statistics.median(body_bytes)),
+        "fetch_ms": round(statistics.median(fetch_ms), 2),
+        "decode_ms": round(statistics.median(decode_ms), 3)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="select('*') vs proyección de columnas")
+    parser.add_argument("--limit", type=int, default=500, help="Filas por query (default 500)")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por medición (default 5)")
+    parser.add_argument("--json", action="store_true", help="Imprimir el resultado como JSON")
+    args = parser.parse_args()
+
+    supabase_url = os.getenv("SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not supabase_url or not supabase_key:
+        raise ValueError("❌ SUPABASE_URL y SUPABASE_SERVICE_ROLE_KEY deben estar configuradas")
+
+    headers = {"apikey": supabase_key, "Authorization": f"Bearer {supabase_key}"}
+    results: Dict[str, Dict[str, Any]] = {}
+
+    with httpx.Client(base_url=supabase_url, headers=headers, timeout=60) as client:
+        for table in REQUIRED_FIELDS:
+            before = measure(client, table, "*", args.limit, args.repeat)
+            after = measure(client, table, select_columns(table), args.limit, args.repeat)
+            results[table] = {
+                "select_star": before,
+                "projected": after,
+                "bytes_saved_pct": round(100 * (1 - after["body_bytes"] / before["body_bytes"]), 1)
+                if before["body_bytes"] else 0.0
+            }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'tabla':<22} {'modo':<10} {'filas':>6} {'bytes (cable)':>14} {'bytes (JSON)':>13} {'fetch ms':>9} {'decode ms':>10}")
+    for table, result in results.items():
+        for mode, label in (("select_star", "*"), ("projected", "proyectado")):
+            m = result[mode]
+            print(
+                f"{table:<22} {label:<10} {m['rows']:>6} {m['wire_bytes']:>14} {m['body_bytes']:>13} "
+                f"{m['fetch_ms']:>9} {m['decode_ms']:>10}"
+            )
+        print(f"{'':<22} ahorro de bytes: {result['bytes_saved_pct']}%")
+
+
+if __name__ == "__main__":
+    main()
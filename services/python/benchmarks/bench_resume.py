@@ -0,0 +1,151 @@
+"""
+Benchmark: generate_candidate_resume para candidatos con 1, 10 y 100 experiencias.
+
+Compara la versión actual (ExperienceRecord, parse_date_string y format_month
+memoizados) con la implementación anterior, que parseaba start_date dos veces
+por experiencia (en la clave de orden y en el loop) y llamaba a strftime en
+cada una, y verifica que ambas generen el mismo texto.
+
+Uso:
+    python benchmarks/bench_resume.py [--repeat 2000] [--json]
+
+Importa solo matching_core: no necesita variables de entorno ni hace llamadas.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SERVICE_DIR))
+
+from matching_core import calculate_duration_months, format_duration, generate_candidate_resume  # noqa: E402
+
+SIZES = (1, 10, 100)
+
+
+def baseline_generate_candidate_resume(candidate_experiences: List[Dict[str, Any]]) -> str:
+    """Implementación anterior de generate_candidate_resume (referencia)"""
+    if not candidate_experiences:
+        return "Sin experiencia laboral registrada."
+
+    def parse_start_date(exp: Dict[str, Any]) -> date:
+        start_date_str = exp.get('start_date')
+        if start_date_str is None:
+            return date.today()
+        if isinstance(start_date_str, str):
+            try:
+                return datetime.fromisoformat(start_date_str.replace('Z', '+00:00')).date()
+            except:  # noqa: E722
+                try:
+                    return datetime.strptime(start_date_str.split('T')[0], '%Y-%m-%d').date()
+                except:  # noqa: E722
+                    return date.today()
+        elif isinstance(start_date_str, date):
+            return start_date_str
+        else:
+            return date.today()
+
+    sorted_experiences = sorted(candidate_experiences, key=lambda x: parse_start_date(x), reverse=True)
+    resume_parts = []
+    for exp in sorted_experiences:
+        start_date = parse_start_date(exp)
+        end_date_str = exp.get('end_date')
+        end_date = None
+        if end_date_str:
+            if isinstance(end_date_str, str):
+                try:
+                    end_date = datetime.fromisoformat(end_date_str.replace('Z', '+00:00')).date()
+                except:  # noqa: E722
+                    try:
+                        end_date = datetime.strptime(end_date_str.split('T')[0], '%Y-%m-%d').date()
+                    except:  # noqa: E722
+                        end_date = None
+            elif isinstance(end_date_str, date):
+                end_date = end_date_str
+
+        years, months = calculate_duration_months(start_date, end_date)
+        duration_str = format_duration(years, months)
+        start_str = start_date.strftime('%b %Y')
+        end_str = "Actualidad" if end_date is None else end_date.strftime('%b %Y')
+        period = f"{start_str} - {end_str} ({duration_str})"
+
+        entry = f"• {exp.get('role_title', 'Sin título')} en {exp.get('company_name', 'Sin empresa')} ({period})"
+        description = exp.get('description', '')
+        if description:
+            entry += f"\n  {description}"
+        resume_parts.append(entry)
+
+    return "\n\n".join(resume_parts)
+
+
+def make_experiences(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Experiencias sintéticas con los formatos de fecha que devuelve Supabase"""
+    experiences = []
+    end = date(2025, 6, 1)
+    for i in range(count):
+        start = end - timedelta(days=rng.randint(90, 1500))
+        current = i == 0
+        experiences.append({
+            "role_title": f"Role {i}",
+            "company_name": f"Company {rng.randint(1, 50)}",
+            "description": "Lideró el equipo de producto y definió el roadmap." if i % 3 else "",
+            "start_date": start.isoformat() if i % 2 else f"{start.isoformat()}T00:00:00Z",
+            "end_date": None if current else end.isoformat()
+        })
+        end = start
+    rng.shuffle(experiences)
+    return experiences
+
+
+def measure(fn: Callable[[List[Dict[str, Any]]], str], experiences: List[Dict[str, Any]], repeat: int) -> float:
+    """Mediana en microsegundos por llamada (5 rondas de `repeat` llamadas)"""
+    rounds = []
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fn(experiences)
+        rounds.append((time.perf_counter() - started) / repeat * 1e6)
+    return statistics.median(rounds)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="generate_candidate_resume: versión anterior vs actual")
+    parser.add_argument("--repeat", type=int, default=2000, help="Llamadas por ronda con 1 experiencia (default 2000)")
+    parser.add_argument("--json", action="store_true", help="Imprimir el resultado como JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    results: Dict[str, Dict[str, Any]] = {}
+
+    for size in SIZES:
+        experiences = make_experiences(size, rng)
+        if generate_candidate_resume(experiences) != baseline_generate_candidate_resume(experiences):
+            raise ValueError(f"❌ El resume con {size} experiencias no coincide con la versión anterior")
+
+        repeat = max(1, args.repeat // size)
+        baseline_us = measure(baseline_generate_candidate_resume, experiences, repeat)
+        current_us = measure(generate_candidate_resume, experiences, repeat)
+        results[str(size)] = {
+            "baseline_us": round(baseline_us, 2),
+            "current_us": round(current_us, 2),
+            "speedup": round(baseline_us / current_us, 2) if current_us else None
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'experiencias':>12} {'anterior µs':>12} {'actual µs':>10} {'speedup':>8}")
+    for size, result in results.items():
+        print(f"{size:>12} {result['baseline_us']:>12} {result['current_us']:>10} {result['speedup']:>7}x")
+
+
+if __name__ == "__main__":
+    main()
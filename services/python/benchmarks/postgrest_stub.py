@@ -0,0 +1,305 @@
+"""
+Servidor local que imita la API REST de Supabase (PostgREST) sobre tablas en memoria.
+
+Sirve el dataset sintético de synthetic_data.py para medir el pipeline de
+matching de punta a punta (bench_pipeline.py) sin un Postgres: el cliente real
+de supabase-py hace las mismas requests que contra Supabase y el stub responde
+con el subset de PostgREST que usa el matcher:
+
+    GET  /rest/v1/{tabla}?select=a, b&col=eq.v&col=in.(x,y)&order=id.asc&offset=0&limit=1000
+    POST /rest/v1/{tabla}?on_conflict=a,b     (upsert, Prefer: resolution=merge-duplicates)
+
+Filtros soportados: eq, neq, in, is (null). select acepta alias y rutas JSON
+(alias:columna->clave); order, una columna (asc/desc, comparada como texto). Cada request espera --latency-ms antes de responder
+(la ida y vuelta a la base).
+
+Uso:
+    python benchmarks/postgrest_stub.py [--port 54321] [--candidates 1000]
+                                        [--experiences 4] [--seed 7] [--latency-ms 0]
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_SERVICE_ROLE_KEY=stub.stub.stub \\
+        MATCHING_LLM_BACKEND=fake python matching_service.py <job_id> <candidate_ids...>
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic_data import make_dataset  # noqa: E402
+
+DEFAULT_PORT = 54321
+
+# Parámetros de la query que no son filtros
+_RESERVED_PARAMS = ("select", "offset", "limit", "order", "on_conflict", "columns")
+
+
+class PostgrestError(Exception):
+    """Error de la query (se responde como 400 con el formato de PostgREST)"""
+
+
+def _split_list(text: str) -> List[str]:
+    """Valores de in.(a,"b,c",d): separados por coma, con comillas dobles opcionales"""
+    values, current, quoted = [], [], False
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif char == "," and not quoted:
+            values.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    values.append("".join(current))
+    return values
+
+
+def parse_filter(expression: str) -> Tuple[str, Any]:
+    """'eq.v' → ('eq', 'v'); 'in.(a,b)' → ('in', {'a', 'b'})"""
+    operator, _, value = expression.partition(".")
+    if operator == "in":
+        if not (value.startswith("(") and value.endswith(")")):
+            raise PostgrestError(f"Filtro in mal formado: {expression}")
+        return operator, set(_split_list(value[1:-1]))
+    if operator in ("eq", "neq", "is"):
+        return operator, value
+    raise PostgrestError(f"Operador no soportado por el stub: {operator}")
+
+
+def parse_select(select: str) -> Optional[List[Tuple[str, str, List[str]]]]:
+    """'a, alias:b->c' → [('a', 'a', []), ('alias', 'b', ['c'])]; None para '*'"""
+    if select.strip() in ("", "*"):
+        return None
+    fields = []
+    for item in (part.strip() for part in select.split(",")):
+        alias, _, path = item.rpartition(":")
+        column, *keys = path.replace("->>", "->").split("->")
+        fields.append((alias or (keys[-1] if keys else column), column, keys))
+    return fields
+
+
+def _as_text(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _project(row: Dict[str, Any], fields: Optional[List[Tuple[str, str, List[str]]]]) -> Dict[str, Any]:
+    if fields is None:
+        return dict(row)
+    projected = {}
+    for name, column, keys in fields:
+        value = row.get(column)
+        for key in keys:
+            value = value.get(key) if isinstance(value, dict) else None
+        projected[name] = value
+    return projected
+
+
+class TableStore:
+    """Tablas en memoria con índices por columna (para eq/in) y por clave de upsert"""
+
+    def __init__(self, tables: Dict[str, List[Dict[str, Any]]]):
+        self.tables = {name: list(rows) for name, rows in tables.items()}
+        self.lock = threading.Lock()
+        self._indexes: Dict[Tuple[str, str], Dict[str, List[Dict[str, Any]]]] = {}
+        self._keys: Dict[Tuple[str, Tuple[str, ...]], Dict[Tuple[str, ...], int]] = {}
+
+    def _index(self, table: str, column: str) -> Dict[str, List[Dict[str, Any]]]:
+        index = self._indexes.get((table, column))
+        if index is None:
+            index = {}
+            for row in self.tables[table]:
+                index.setdefault(_as_text(row.get(column)), []).append(row)
+            self._indexes[(table, column)] = index
+        return index
+
+    def select(self, table: str, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """Filas que cumplen los filtros, proyectadas y paginadas (offset/limit)"""
+        options = {name: value for name, value in params if name in _RESERVED_PARAMS}
+        filters = [(name, *parse_filter(value)) for name, value in params if name not in _RESERVED_PARAMS]
+        fields = parse_select(options.get("select", "*"))
+
+        with self.lock:
+            if table not in self.tables:
+                raise PostgrestError(f"Tabla no encontrada: {table}")
+            # El primer filtro eq/in usa el índice de su columna; el resto se evalúa fila a fila
+            rows = self.tables[table]
+            indexed = next((f for f in filters if f[1] in ("eq", "in")), None)
+            if indexed is not None:
+                column, operator, value = indexed
+                index = self._index(table, column)
+                keys = [value] if operator == "eq" else sorted(value)
+                rows = [row for key in keys for row in index.get(key, [])]
+            for condition in filters:
+                if condition is indexed:
+                    continue
+                column, operator, value = condition
+                rows = [row for row in rows if self._matches(row.get(column), operator, value)]
+
+        if "order" in options:
+            column, _, direction = options["order"].partition(".")
+            rows = sorted(rows, key=lambda row: _as_text(row.get(column)), reverse=direction.startswith("desc"))
+
+        offset = int(options.get("offset", 0))
+        limit = int(options["limit"]) if "limit" in options else None
+        page = rows[offset:offset + limit if limit is not None else None]
+        return [_project(row, fields) for row in page]
+
+    @staticmethod
+    def _matches(value: Any, operator: str, expected: Any) -> bool:
+        if operator == "eq":
+            return _as_text(value) == expected
+        if operator == "neq":
+            return _as_text(value) != expected
+        if operator == "in":
+            return _as_text(value) in expected
+        return value is None if expected == "null" else _as_text(value).lower() == expected
+
+    def upsert(self, table: str, rows: List[Dict[str, Any]], conflict_columns: Tuple[str, ...]) -> List[Dict[str, Any]]:
+        """Inserta o mezcla (merge-duplicates) por la clave de conflicto"""
+        with self.lock:
+            stored = self.tables.setdefault(table, [])
+            positions = self._keys.get((table, conflict_columns))
+            if positions is None:
+                positions = {tuple(_as_text(row.get(c)) for c in conflict_columns): i for i, row in enumerate(stored)}
+                self._keys[(table, conflict_columns)] = positions
+            written = []
+            for row in rows:
+                key = tuple(_as_text(row.get(c)) for c in conflict_columns)
+                position = positions.get(key) if conflict_columns else None
+                if position is None:
+                    positions[key] = len(stored)
+                    stored.append(dict(row))
+                    written.append(stored[-1])
+                else:
+                    stored[position].update(row)
+                    written.append(stored[position])
+            # Las filas nuevas o modificadas invalidan los demás índices de la tabla
+            for index_key in [k for k in self._indexes if k[0] == table]:
+                del self._indexes[index_key]
+            for keys_key in [k for k in self._keys if k[0] == table and k[1] != conflict_columns]:
+                del self._keys[keys_key]
+            return [dict(row) for row in written]
+
+    def counts(self) -> Dict[str, int]:
+        with self.lock:
+            return {name: len(rows) for name, rows in self.tables.items()}
+
+
+class PostgrestHandler(BaseHTTPRequestHandler):
+    """Handler HTTP; las tablas están en self.server.store"""
+
+    # Keep-alive, como el pool de httpx del cliente de Supabase. Sin Nagle: headers
+    # y body salen en writes separados y el delayed ACK del cliente sumaría ~40 ms
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbose:
+            sys.stderr.write(f"[postgrest-stub] {format % args}\n")
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, message: str) -> None:
+        self._send_json(status, {"code": "PGRST100", "message": message, "details": None, "hint": None})
+
+    def _route(self) -> Tuple[Optional[str], List[Tuple[str, str]]]:
+        """(tabla, parámetros) de /rest/v1/{tabla}?..., o (None, []) si la ruta no existe"""
+        url = urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+        if len(parts) != 3 or parts[:2] != ["rest", "v1"]:
+            return None, []
+        return parts[2], parse_qsl(url.query, keep_blank_values=True)
+
+    def do_GET(self) -> None:
+        time.sleep(self.server.latency)
+        table, params = self._route()
+        if table is None:
+            self._send_error(404, f"Ruta no encontrada: {self.path}")
+            return
+        try:
+            self._send_json(200, self.server.store.select(table, params))
+        except (PostgrestError, ValueError) as e:
+            self._send_error(400, str(e))
+
+    def do_POST(self) -> None:
+        time.sleep(self.server.latency)
+        table, params = self._route()
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if table is None:
+            self._send_error(404, f"Ruta no encontrada: {self.path}")
+            return
+        try:
+            payload = json.loads(body or b"[]")
+        except json.JSONDecodeError as e:
+            self._send_error(400, f"JSON inválido: {e}")
+            return
+        rows = payload if isinstance(payload, list) else [payload]
+        on_conflict = dict(params).get("on_conflict", "")
+        conflict_columns = tuple(c.strip() for c in on_conflict.split(",") if c.strip())
+        written = self.server.store.upsert(table, rows, conflict_columns)
+        if "return=minimal" in (self.headers.get("Prefer") or ""):
+            self.send_response(201)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._send_json(201, written)
+
+
+def make_server(
+    tables: Dict[str, List[Dict[str, Any]]],
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    latency_ms: float = 0.0,
+    verbose: bool = False
+) -> ThreadingHTTPServer:
+    """
+    Crea el servidor (port=0 elige un puerto libre; ver server.server_address).
+
+    Args:
+        tables: {tabla: [filas]} (ver synthetic_data.make_dataset)
+        latency_ms: Espera antes de cada respuesta
+        verbose: Loguear cada request en stderr
+    """
+    server = ThreadingHTTPServer((host, port), PostgrestHandler)
+    server.daemon_threads = True
+    server.store = TableStore(tables)
+    server.latency = latency_ms / 1000
+    server.verbose = verbose
+    return server
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+
+    def _option(name: str, cast: Any, default: Any) -> Any:
+        return cast(args[args.index(name) + 1]) if name in args else default
+
+    dataset = make_dataset(
+        candidates=_option("--candidates", int, 1000),
+        experiences_per_candidate=_option("--experiences", int, 4),
+        seed=_option("--seed", int, 7)
+    )
+    stub = make_server(
+        dataset,
+        port=_option("--port", int, DEFAULT_PORT),
+        latency_ms=_option("--latency-ms", float, 0.0),
+        verbose="--verbose" in args
+    )
+    counts = ", ".join(f"{name}: {count}" for name, count in stub.store.counts().items())
+    print(f"✅ Stub de PostgREST escuchando en http://127.0.0.1:{stub.server_address[1]} ({counts})", file=sys.stderr)
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        stub.server_close()
@@ -0,0 +1,132 @@
+"""
+Datos sintéticos para los benchmarks: jobs, candidatos y experiencias.
+
+Determinísticos a partir de una semilla (el mismo dataset en cada commit y en
+cada proceso: bench_pipeline.py y postgrest_stub.py lo generan por separado),
+con las columnas de data_loader.REQUIRED_FIELDS y una mezcla realista para el
+pre-filtro: la mayoría de los candidatos son del mismo track que el job (van
+al LLM) y una fracción son mismatches obvios (se resuelven por reglas).
+
+Uso:
+    tables = make_dataset(candidates=1000, experiences_per_candidate=4, seed=7)
+    tables["jobs"], tables["candidates"], tables["candidate_experience"]
+"""
+
+import json
+import random
+import uuid
+from datetime import date, timedelta
+from typing import Any, Dict, List, Tuple
+
+# Tablas que sirve postgrest_stub.py (job_candidate_matches arranca vacía)
+TABLES = ("jobs", "candidates", "candidate_experience", "job_candidate_matches")
+
+# Fracción de candidatos con un mismatch duro contra el job PM (los resuelve el pre-filtro)
+DEFAULT_MISMATCH_RATE = 0.2
+
+_PM_TITLES = ("Product Manager", "Senior Product Manager", "Lead Product Manager", "Group Product Manager")
+_SE_TITLES = ("Software Engineer", "Senior Software Engineer", "Staff Engineer", "Backend Developer")
+# Sales vs Product y Engineer vs Product: los mismatches duros del SYSTEM_PROMPT para un job PM
+_OTHER_TITLES = ("Account Executive", "Sales Manager", "Business Development Manager", "Frontend Developer")
+_SENIORITIES = ("Junior", "Mid", "Senior", "Lead")
+_INDUSTRIES = ("Fintech", "E-commerce", "SaaS", "Healthtech", "Edtech", "Logística")
+_DESCRIPTIONS = (
+    "Lideró el equipo de producto y definió el roadmap trimestral con stakeholders de negocio.",
+    "Diseñó e implementó servicios de pagos con alta disponibilidad y métricas de conversión.",
+    "Coordinó discovery con usuarios, priorizó el backlog y lanzó la app móvil en tres países.",
+    "",
+)
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def make_job(rng: random.Random, index: int = 0) -> Dict[str, Any]:
+    """Fila de jobs (track PM, con requirements_json como lo guarda el front)"""
+    return {
+        "id": _uuid(rng),
+        "job_title": f"Senior Product Manager #{index}",
+        "description": "Buscamos un PM para liderar la plataforma de pagos: discovery, roadmap y métricas.",
+        "requirements_json": json.dumps({
+            "non_negotiables_text": "Experiencia liderando producto en fintech o e-commerce.",
+            "desired_trajectory_text": "Crecimiento de PM a Senior PM en startups de alto crecimiento.",
+            "needs_technical_background": bool(index % 2),
+            "seniority": "Senior",
+            "industries": rng.sample(_INDUSTRIES, 2),
+        }),
+        "job_level": "PM3",
+        "updated_at": "2025-06-01T00:00:00+00:00",
+    }
+
+
+def make_candidate(rng: random.Random, mismatch_rate: float = DEFAULT_MISMATCH_RATE) -> Dict[str, Any]:
+    """Fila de candidates (la mayoría PM/SE; una fracción, mismatch duro)"""
+    if rng.random() < mismatch_rate:
+        title = rng.choice(_OTHER_TITLES)
+    else:
+        title = rng.choice(_PM_TITLES + _SE_TITLES)
+    return {
+        "id": _uuid(rng),
+        "full_name": f"Candidato {rng.randint(1, 10 ** 6)}",
+        "current_job_title": title,
+        "seniority": rng.choice(_SENIORITIES),
+        "industry": rng.choice(_INDUSTRIES),
+        "updated_at": "2025-06-01T00:00:00+00:00",
+    }
+
+
+def make_experiences(
+    candidate_id: str,
+    count: int,
+    rng: random.Random,
+    titles: Tuple[str, ...] = _PM_TITLES + _SE_TITLES
+) -> List[Dict[str, Any]]:
+    """Experiencias con los formatos de fecha que devuelve Supabase (la primera, actual)"""
+    experiences = []
+    end = date(2025, 6, 1)
+    for i in range(count):
+        start = end - timedelta(days=rng.randint(180, 1500))
+        experiences.append({
+            "id": _uuid(rng),
+            "candidate_id": candidate_id,
+            "role_title": rng.choice(titles),
+            "company_name": f"Company {rng.randint(1, 500)}",
+            "description": rng.choice(_DESCRIPTIONS),
+            "start_date": start.isoformat() if i % 2 else f"{start.isoformat()}T00:00:00Z",
+            "end_date": None if i == 0 else end.isoformat(),
+        })
+        end = start
+    return experiences
+
+
+def make_dataset(
+    candidates: int,
+    experiences_per_candidate: int = 4,
+    jobs: int = 1,
+    seed: int = 7,
+    mismatch_rate: float = DEFAULT_MISMATCH_RATE
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Dataset completo en memoria.
+
+    Args:
+        candidates: Cantidad de candidatos
+        experiences_per_candidate: Experiencias por candidato
+        jobs: Cantidad de jobs
+        seed: Semilla (mismo seed → mismas filas e IDs)
+        mismatch_rate: Fracción de candidatos que el pre-filtro descarta
+
+    Returns:
+        {tabla: [filas]} para las tablas de TABLES
+    """
+    rng = random.Random(seed)
+    tables: Dict[str, List[Dict[str, Any]]] = {table: [] for table in TABLES}
+    tables["jobs"] = [make_job(rng, i) for i in range(jobs)]
+    for _ in range(candidates):
+        candidate = make_candidate(rng, mismatch_rate)
+        tables["candidates"].append(candidate)
+        # Los mismatches tienen toda su trayectoria en otra familia (si no, el pre-filtro los deja pasar)
+        titles = _OTHER_TITLES if candidate["current_job_title"] in _OTHER_TITLES else _PM_TITLES + _SE_TITLES
+        tables["candidate_experience"].extend(make_experiences(candidate["id"], experiences_per_candidate, rng, titles))
+    return tables
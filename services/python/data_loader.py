@@ -0,0 +1,218 @@
+"""
+Carga en bloque de los datos de matching.
+
+En lugar de tres select("*") por par (job, candidato, experiencias), el loader
+recibe los conjuntos de IDs de jobs y candidatos, trae cada tabla una sola vez
+con filtros in_() y solo las columnas que usa el matcher, agrupa las
+experiencias por candidate_id y devuelve un snapshot en memoria: 3 queries por
+batch en lugar de 3×N.
+
+Uso:
+    snapshot = load_snapshot(supabase, [job_id], candidate_ids)
+    job = snapshot.jobs[job_id]
+    experiences = snapshot.experiences_for(candidate_id)
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Tuple
+
+from matching_core.fingerprint import EXPERIENCE_CONTENT_FIELDS
+from metrics import span
+
+# Esquema de campos requeridos por tabla: todas las lecturas del matcher proyectan
+# estas columnas en lugar de select("*") (las filas de candidates pueden traer
+# payloads anchos, ej. LinkedIn). Un campo nuevo en los contextos del LLM, el
+# pre-filtro o la huella de inputs debe agregarse aquí.
+REQUIRED_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "jobs": ("id", "job_title", "description", "requirements_json", "job_level", "updated_at"),
+    "candidates": ("id", "full_name", "current_job_title", "seniority", "industry", "updated_at"),
+    "candidate_experience": ("candidate_id",) + EXPERIENCE_CONTENT_FIELDS,
+}
+
+# Campos que necesita el planificador de re-matching (solo la huella de inputs)
+FINGERPRINT_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "jobs": ("id", "updated_at"),
+    "candidates": ("id", "updated_at"),
+    "candidate_experience": ("candidate_id",) + EXPERIENCE_CONTENT_FIELDS,
+    "job_candidate_matches": ("job_id", "candidate_id", "input_fingerprint:match_detail->input_fingerprint"),
+    "hyperconnector_candidates": ("candidate_id",),
+}
+
+# Máximo de filas por página de PostgREST (límite por defecto de Supabase)
+PAGE_SIZE = 1000
+
+# Columna única por la que se ordena cada query paginada: sin ORDER BY, Postgres
+# no garantiza el orden entre páginas y range() puede repetir o saltear filas
+PAGE_ORDER_COLUMN = "id"
+
+# Máximo de IDs por filtro in_() (mantiene la URL de PostgREST acotada)
+IN_QUERY_CHUNK_SIZE = 100
+
+
+def select_columns(table: str, schema: Dict[str, Tuple[str, ...]] = REQUIRED_FIELDS) -> str:
+    """String de select() de PostgREST con los campos de `table` según `schema`"""
+    return ", ".join(schema[table])
+
+
+def fetch_all(build_query: Callable[[], Any], order_by: str = PAGE_ORDER_COLUMN) -> List[Dict[str, Any]]:
+    """Pagina una query de PostgREST con range() (ordenada por `order_by`) hasta traer todas las filas"""
+    rows: List[Dict[str, Any]] = []
+    offset = 0
+    while True:
+        response = build_query().order(order_by).range(offset, offset + PAGE_SIZE - 1).execute()
+        page = response.data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+def fetch_all_in(supabase: Any, table: str, columns: str, column: str, values: List[str]) -> List[Dict[str, Any]]:
+    """fetch_all con filtro in_() en chunks de IN_QUERY_CHUNK_SIZE"""
+    rows: List[Dict[str, Any]] = []
+    for i in range(0, len(values), IN_QUERY_CHUNK_SIZE):
+        chunk = values[i:i + IN_QUERY_CHUNK_SIZE]
+        rows.extend(fetch_all(lambda: supabase.table(table).select(columns).in_(column, chunk)))
+    return rows
+
+
+async def fetch_all_async(build_query: Callable[[], Any], order_by: str = PAGE_ORDER_COLUMN) -> List[Dict[str, Any]]:
+    """Versión asíncrona de fetch_all (cliente asíncrono de Supabase)"""
+    rows: List[Dict[str, Any]] = []
+    offset = 0
+    while True:
+        response = await build_query().order(order_by).range(offset, offset + PAGE_SIZE - 1).execute()
+        page = response.data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+async def fetch_all_in_async(
+    supabase: Any,
+    table: str,
+    columns: str,
+    column: str,
+    values: List[str]
+) -> List[Dict[str, Any]]:
+    """Versión asíncrona de fetch_all_in, con los chunks consultados en paralelo"""
+    def _query(chunk: List[str]) -> Callable[[], Any]:
+        return lambda: supabase.table(table).select(columns).in_(column, chunk)
+
+    pages = await asyncio.gather(*(
+        fetch_all_async(_query(values[i:i + IN_QUERY_CHUNK_SIZE]))
+        for i in range(0, len(values), IN_QUERY_CHUNK_SIZE)
+    ))
+    return [row for page in pages for row in page]
+
+
+class MatchingSnapshot(NamedTuple):
+    """Datos de un batch de matching, indexados por ID"""
+    jobs: Dict[str, Dict[str, Any]]
+    candidates: Dict[str, Dict[str, Any]]
+    experiences_by_candidate: Dict[str, List[Dict[str, Any]]]
+
+    def experiences_for(self, candidate_id: str) -> List[Dict[str, Any]]:
+        """Experiencias del candidato (lista vacía si no tiene)"""
+        return self.experiences_by_candidate.get(candidate_id, [])
+
+
+def load_snapshot(supabase: Any, job_ids: Iterable[str], candidate_ids: Iterable[str]) -> MatchingSnapshot:
+    """
+    Trae jobs, candidatos y experiencias de un batch con una query por tabla.
+
+    Args:
+        supabase: Cliente de Supabase
+        job_ids: IDs de los jobs del batch
+        candidate_ids: IDs de los candidatos del batch
+
+    Returns:
+        MatchingSnapshot. Los IDs que no existen simplemente no aparecen en
+        jobs/candidates; el caller decide cómo reportarlos.
+    """
+    job_ids = list(dict.fromkeys(job_ids))
+    candidate_ids = list(dict.fromkeys(candidate_ids))
+
+    with span("job_fetch", ids=len(job_ids)) as current:
+        jobs = {
+            row["id"]: row
+            for row in fetch_all_in(supabase, "jobs", select_columns("jobs"), "id", job_ids)
+        }
+        current.set(rows=len(jobs))
+    with span("candidate_fetch", ids=len(candidate_ids)) as current:
+        candidates = {
+            row["id"]: row
+            for row in fetch_all_in(supabase, "candidates", select_columns("candidates"), "id", candidate_ids)
+        }
+        current.set(rows=len(candidates))
+
+    experiences_by_candidate: Dict[str, List[Dict[str, Any]]] = {}
+    with span("experience_fetch", ids=len(candidates)) as current:
+        experience_rows = fetch_all_in(
+            supabase,
+            "candidate_experience",
+            select_columns("candidate_experience"),
+            "candidate_id",
+            list(candidates)
+        )
+        current.set(rows=len(experience_rows))
+    for row in experience_rows:
+        experiences_by_candidate.setdefault(row["candidate_id"], []).append(row)
+
+    return MatchingSnapshot(jobs, candidates, experiences_by_candidate)
+
+
+async def _fetch_with_span(stage: str, ids: int, query: Awaitable[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Espera `query` dentro de un span de la etapa (ver metrics.span)"""
+    with span(stage, ids=ids) as current:
+        rows = await query
+        current.set(rows=len(rows))
+    return rows
+
+
+async def load_snapshot_async(
+    supabase: Any,
+    job_ids: Iterable[str],
+    candidate_ids: Iterable[str]
+) -> MatchingSnapshot:
+    """
+    Versión asíncrona de load_snapshot: las tres tablas se consultan en paralelo
+    (las experiencias se filtran por los IDs pedidos, no por los encontrados).
+    """
+    job_ids = list(dict.fromkeys(job_ids))
+    candidate_ids = list(dict.fromkeys(candidate_ids))
+
+    job_rows, candidate_rows, experience_rows = await asyncio.gather(
+        _fetch_with_span(
+            "job_fetch",
+            len(job_ids),
+            fetch_all_in_async(supabase, "jobs", select_columns("jobs"), "id", job_ids)
+        ),
+        _fetch_with_span(
+            "candidate_fetch",
+            len(candidate_ids),
+            fetch_all_in_async(supabase, "candidates", select_columns("candidates"), "id", candidate_ids)
+        ),
+        _fetch_with_span(
+            "experience_fetch",
+            len(candidate_ids),
+            fetch_all_in_async(
+                supabase,
+                "candidate_experience",
+                select_columns("candidate_experience"),
+                "candidate_id",
+                candidate_ids
+            )
+        )
+    )
+
+    experiences_by_candidate: Dict[str, List[Dict[str, Any]]] = {}
+    for row in experience_rows:
+        experiences_by_candidate.setdefault(row["candidate_id"], []).append(row)
+
+    return MatchingSnapshot(
+        {row["id"]: row for row in job_rows},
+        {row["id"]: row for row in candidate_rows},
+        experiences_by_candidate
+    )
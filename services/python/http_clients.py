@@ -0,0 +1,165 @@
+"""
+Clientes HTTP compartidos para OpenAI y Supabase.
+
+Los SDKs crean por defecto su propio httpx.Client con límites y timeouts
+genéricos (Supabase: 120s de timeout, HTTP/1.1). Acá se construye un pool por
+servicio con keep-alive, HTTP/2 (si está instalado `h2`) y timeouts ajustados,
+y warm_up() abre las conexiones (DNS + TCP + TLS) de ambos servicios en
+paralelo para que el primer match no pague los handshakes.
+
+Variables de entorno:
+- HTTP_HTTP2: usar HTTP/2 cuando esté disponible (default true)
+- HTTP_MAX_CONNECTIONS: conexiones máximas por pool (default 100)
+- HTTP_MAX_KEEPALIVE_CONNECTIONS: conexiones ociosas que se mantienen abiertas (default 20)
+- HTTP_KEEPALIVE_EXPIRY: segundos que una conexión ociosa sigue abierta (default 90)
+- HTTP_CONNECT_TIMEOUT: timeout de conexión en segundos (default 5)
+- OPENAI_TIMEOUT_SECONDS: timeout de lectura de OpenAI (default 120, Structured Outputs es lento)
+- SUPABASE_TIMEOUT_SECONDS: timeout de lectura de Supabase (default 30)
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+from supabase import Client, acreate_client, create_client
+
+try:
+    from supabase import AsyncClientOptions, ClientOptions
+except ImportError:
+    # supabase-py antiguo: ClientOptions(...) falla con TypeError y se usan los clientes por defecto
+    AsyncClientOptions = ClientOptions = None
+
+
+HTTP2_ENABLED = os.getenv("HTTP_HTTP2", "true").strip().lower() not in ("0", "false", "no", "off")
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "90"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "120"))
+SUPABASE_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "30"))
+
+
+def http2_available() -> bool:
+    """True si HTTP/2 está habilitado y el paquete `h2` está instalado"""
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def pool_limits() -> httpx.Limits:
+    """Límites del pool de conexiones (mismos para ambos servicios)"""
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+    )
+
+
+def request_timeout(read_seconds: float) -> httpx.Timeout:
+    """Timeout con conexión corta y lectura según el servicio"""
+    return httpx.Timeout(read_seconds, connect=HTTP_CONNECT_TIMEOUT)
+
+
+# ============================================================================
+# CLIENTES SÍNCRONOS
+# ============================================================================
+
+def create_openai_client(api_key: str, **kwargs: Any) -> OpenAI:
+    """
+    Cliente de OpenAI sobre un pool propio (keep-alive, HTTP/2, timeouts).
+
+    Args:
+        api_key: API key de OpenAI
+        **kwargs: Argumentos extra para OpenAI(...) (ej: base_url)
+    """
+    http_client = DefaultHttpxClient(http2=http2_available(), limits=pool_limits())
+    # El SDK aplica su propio timeout en cada request: se configura en el cliente, no en httpx
+    return OpenAI(api_key=api_key, http_client=http_client, timeout=request_timeout(OPENAI_TIMEOUT_SECONDS), **kwargs)
+
+
+def create_supabase_client(supabase_url: str, supabase_key: str) -> Client:
+    """Cliente de Supabase con PostgREST sobre un pool propio (keep-alive, HTTP/2, timeouts)"""
+    http_client = httpx.Client(
+        http2=http2_available(),
+        limits=pool_limits(),
+        timeout=request_timeout(SUPABASE_TIMEOUT_SECONDS)
+    )
+    try:
+        options = ClientOptions(httpx_client=http_client)
+    except TypeError:
+        # supabase-py sin soporte para un httpx.Client propio (< 2.10)
+        http_client.close()
+        return create_client(supabase_url, supabase_key)
+    return create_client(supabase_url, supabase_key, options=options)
+
+
+# ============================================================================
+# CLIENTES ASÍNCRONOS
+# ============================================================================
+
+def create_async_openai_client(api_key: str, **kwargs: Any) -> AsyncOpenAI:
+    """Igual que create_openai_client, para AsyncOpenAI"""
+    http_client = DefaultAsyncHttpxClient(http2=http2_available(), limits=pool_limits())
+    # El SDK aplica su propio timeout en cada request: se configura en el cliente, no en httpx
+    return AsyncOpenAI(api_key=api_key, http_client=http_client, timeout=request_timeout(OPENAI_TIMEOUT_SECONDS), **kwargs)
+
+
+async def create_async_supabase_client(supabase_url: str, supabase_key: str) -> Any:
+    """Igual que create_supabase_client, para el cliente asíncrono de Supabase"""
+    http_client = httpx.AsyncClient(
+        http2=http2_available(),
+        limits=pool_limits(),
+        timeout=request_timeout(SUPABASE_TIMEOUT_SECONDS)
+    )
+    try:
+        options = AsyncClientOptions(httpx_client=http_client)
+    except TypeError:
+        await http_client.aclose()
+        return await acreate_client(supabase_url, supabase_key)
+    return await acreate_client(supabase_url, supabase_key, options=options)
+
+
+# ============================================================================
+# WARM-UP
+# ============================================================================
+
+def _open_connection(http_client: httpx.Client, url: str) -> float:
+    """HEAD liviano que deja una conexión abierta en el pool; devuelve ms"""
+    started = time.perf_counter()
+    http_client.head(url)
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def warm_up(openai_client: Optional[OpenAI], supabase_client: Optional[Client]) -> Dict[str, Any]:
+    """
+    Abre en paralelo las conexiones (DNS + TCP + TLS) a OpenAI y Supabase.
+
+    No consume tokens ni lee datos: el status de la respuesta no importa, solo
+    que la conexión quede en el pool de keep-alive del cliente que usa el SDK.
+
+    Returns:
+        {"openai": ms | error, "supabase": ms | error}
+    """
+    targets = {}
+    if openai_client is not None:
+        targets["openai"] = (openai_client._client, str(openai_client.base_url))
+    if supabase_client is not None:
+        postgrest = supabase_client.postgrest
+        targets["supabase"] = (postgrest.session, f"{str(postgrest.base_url).rstrip('/')}/")
+
+    def _warm(target: tuple) -> Any:
+        try:
+            return _open_connection(*target)
+        except Exception as e:
+            return f"error: {e}"
+
+    with ThreadPoolExecutor(max_workers=max(1, len(targets))) as executor:
+        results = dict(zip(targets, executor.map(_warm, targets.values())))
+    return results
@@ -0,0 +1,370 @@
+"""
+Backends del LLM: quién responde las llamadas de Structured Outputs del matching.
+
+matching_service y async_matching no llaman al SDK de OpenAI directamente sino
+a un LLMBackend (parse / aparse), elegido con MATCHING_LLM_BACKEND:
+
+- openai (default): OpenAI con los clientes de http_clients.py
+- http-stub: POST /v1/chat/completions a un servidor local compatible
+  (openai_stub_server.py) con latencia y errores configurables en el servidor;
+  mide el pipeline completo (red incluida) sin costo ni API key
+- fake: en el mismo proceso, determinístico y sin red: devuelve MatchAnalysis
+  válidos derivados del hash del prompt, con latencia opcional; mide el
+  overhead propio del pipeline sin la latencia del modelo
+
+Los errores de los backends locales (LLMBackendError) se reintentan igual que
+los de OpenAI (ver rate_limiter.is_retryable). Los backends locales guardan sus
+análisis con otro match_source y otra clave de cache que OpenAI.
+
+Variables de entorno:
+- MATCHING_LLM_BACKEND: openai | http-stub | fake (default openai)
+- MATCHING_LLM_STUB_URL: base URL del stub (default http://127.0.0.1:8787/v1)
+- MATCHING_FAKE_LATENCY_MS: latencia simulada por llamada del backend fake (default 0)
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Protocol
+
+from matching_core import MATCH_SOURCE, OPENAI_MODEL, OPENAI_TEMPERATURE, MultiMatchAnalysis, response_format_param
+
+
+LLM_BACKENDS = ("openai", "http-stub", "fake")
+DEFAULT_LLM_STUB_URL = "http://127.0.0.1:8787/v1"
+LLM_STUB_TIMEOUT_SECONDS = 120.0
+
+# Niveles de Career Matrix que usa el backend fake
+_FAKE_LEVELS = ("PM1", "PM2", "PM3", "PM4", "PM5", "PM6")
+_CANDIDATE_BLOCK = re.compile(r"^=== CANDIDATE ?(C\d+)? ===$", re.MULTILINE)
+
+
+class LLMBackendError(Exception):
+    """
+    Error de un backend local. status_code None es un error de conexión;
+    response.headers lleva retry-after-ms/retry-after si el stub los mandó.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None, headers: Optional[Mapping[str, str]] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=dict(headers or {}))
+
+
+class StructuredResponse(NamedTuple):
+    """Respuesta normalizada de una llamada de Structured Outputs"""
+    parsed: Any                             # Instancia de response_format (None si el modelo se negó)
+    refusal: Optional[str]
+    usage: Any                              # usage del SDK o dict (ver llm_usage.extract_usage)
+    headers: Optional[Mapping[str, str]]    # Headers HTTP (x-ratelimit-*, ver RateLimitScheduler.call)
+
+
+class LLMBackend(Protocol):
+    """Interfaz de los backends: una llamada de Structured Outputs, síncrona y asíncrona"""
+
+    name: str
+    model: str          # Modelo de la clave del cache de análisis
+    match_source: str   # Origen que se guarda en job_candidate_matches
+
+    def parse(
+        self,
+        messages: List[Dict[str, str]],
+        response_format: type,
+        prompt_cache_key: Optional[str] = None
+    ) -> StructuredResponse:
+        ...
+
+    async def aparse(
+        self,
+        messages: List[Dict[str, str]],
+        response_format: type,
+        prompt_cache_key: Optional[str] = None
+    ) -> StructuredResponse:
+        ...
+
+
+def parsed_or_raise(response: StructuredResponse) -> Any:
+    """
+    Instancia parseada de la respuesta.
+
+    Raises:
+        ValueError: Si el modelo se negó (refusal) o no devolvió contenido
+    """
+    if response.parsed is not None:
+        return response.parsed
+    if response.refusal:
+        raise ValueError(f"❌ El modelo rechazó el request: {response.refusal}")
+    raise ValueError("❌ El modelo no devolvió un análisis (respuesta vacía)")
+
+
+def llm_backend_name() -> str:
+    """Backend configurado en MATCHING_LLM_BACKEND (se lee en cada llamada, después del .env)"""
+    name = os.getenv("MATCHING_LLM_BACKEND", "openai").strip().lower() or "openai"
+    if name not in LLM_BACKENDS:
+        raise ValueError(f"❌ MATCHING_LLM_BACKEND inválido: {name} (opciones: {', '.join(LLM_BACKENDS)})")
+    return name
+
+
+# ============================================================================
+# OPENAI
+# ============================================================================
+
+class OpenAIBackend:
+    """OpenAI con Structured Outputs (los reintentos los hace RateLimitScheduler, no el SDK)"""
+
+    name = "openai"
+    match_source = MATCH_SOURCE
+
+    def __init__(
+        self,
+        client: Any = None,
+        async_client: Any = None,
+        model: str = OPENAI_MODEL,
+        temperature: float = OPENAI_TEMPERATURE
+    ):
+        self.client = client
+        self.async_client = async_client
+        self.model = model
+        self.temperature = temperature
+
+    def _request(self, messages: List[Dict[str, str]], response_format: type, prompt_cache_key: Optional[str]) -> Dict[str, Any]:
+        request = {
+            "model": self.model,
+            "messages": messages,
+            "response_format": response_format,
+            "temperature": self.temperature
+        }
+        if prompt_cache_key:
+            # Por extra_body y no como kwarg: los SDK anteriores a prompt_cache_key
+            # rechazan el argumento con TypeError, la API lo acepta igual en el body
+            request["extra_body"] = {"prompt_cache_key": prompt_cache_key}
+        return request
+
+    @staticmethod
+    def _response(raw_response: Any) -> StructuredResponse:
+        completion = raw_response.parse()
+        message = completion.choices[0].message
+        return StructuredResponse(message.parsed, message.refusal, completion.usage, raw_response.headers)
+
+    def parse(self, messages, response_format, prompt_cache_key=None) -> StructuredResponse:
+        if self.client is None:
+            raise ValueError("❌ OpenAIBackend sin cliente síncrono")
+        raw_response = self.client.with_options(max_retries=0).beta.chat.completions.with_raw_response.parse(
+            **self._request(messages, response_format, prompt_cache_key)
+        )
+        return self._response(raw_response)
+
+    async def aparse(self, messages, response_format, prompt_cache_key=None) -> StructuredResponse:
+        if self.async_client is None:
+            raise ValueError("❌ OpenAIBackend sin cliente asíncrono")
+        raw_response = await self.async_client.with_options(max_retries=0).beta.chat.completions.with_raw_response.parse(
+            **self._request(messages, response_format, prompt_cache_key)
+        )
+        return self._response(raw_response)
+
+
+# ============================================================================
+# STUB HTTP
+# ============================================================================
+
+class HTTPStubBackend:
+    """
+    Chat completions contra un servidor local compatible con OpenAI
+    (openai_stub_server.py): mismo wire format, sin el SDK.
+    """
+
+    name = "http-stub"
+    match_source = "llm-http-stub"
+
+    def __init__(self, base_url: Optional[str] = None, timeout: float = LLM_STUB_TIMEOUT_SECONDS):
+        self.base_url = (base_url or os.getenv("MATCHING_LLM_STUB_URL") or DEFAULT_LLM_STUB_URL).rstrip("/")
+        self.timeout = timeout
+        self.model = f"{self.name}:{OPENAI_MODEL}"
+        self._client = None
+        self._async_client = None
+        self._lock = threading.Lock()
+
+    def _body(self, messages: List[Dict[str, str]], response_format: type, prompt_cache_key: Optional[str]) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": OPENAI_TEMPERATURE,
+            "prompt_cache_key": prompt_cache_key,
+            "response_format": response_format_param(response_format)
+        }
+
+    @staticmethod
+    def _response(http_response: Any, response_format: type) -> StructuredResponse:
+        if http_response.status_code >= 400:
+            raise LLMBackendError(
+                f"Stub respondió {http_response.status_code}: {http_response.text[:200]}",
+                http_response.status_code,
+                http_response.headers
+            )
+        completion = http_response.json()
+        message = completion["choices"][0]["message"]
+        parsed = response_format.model_validate_json(message["content"]) if message.get("content") else None
+        return StructuredResponse(parsed, message.get("refusal"), completion.get("usage"), http_response.headers)
+
+    def parse(self, messages, response_format, prompt_cache_key=None) -> StructuredResponse:
+        import httpx
+
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(timeout=self.timeout)
+        try:
+            http_response = self._client.post(
+                f"{self.base_url}/chat/completions",
+                json=self._body(messages, response_format, prompt_cache_key)
+            )
+        except httpx.TransportError as e:
+            raise LLMBackendError(f"No se pudo conectar al stub en {self.base_url}: {e}")
+        return self._response(http_response, response_format)
+
+    async def aparse(self, messages, response_format, prompt_cache_key=None) -> StructuredResponse:
+        import httpx
+
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(timeout=self.timeout)
+        try:
+            http_response = await self._async_client.post(
+                f"{self.base_url}/chat/completions",
+                json=self._body(messages, response_format, prompt_cache_key)
+            )
+        except httpx.TransportError as e:
+            raise LLMBackendError(f"No se pudo conectar al stub en {self.base_url}: {e}")
+        return self._response(http_response, response_format)
+
+
+# ============================================================================
+# FAKE DETERMINÍSTICO
+# ============================================================================
+
+def _digest(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+def _fake_score(digest: bytes, offset: int) -> float:
+    """Score 30.0-100.0 con un decimal, derivado de dos bytes del digest"""
+    return 30.0 + int.from_bytes(digest[offset:offset + 2], "big") % 701 / 10
+
+
+def fake_match_analysis(seed_text: str) -> Dict[str, Any]:
+    """
+    MatchAnalysis (como dict) determinístico para un texto: el mismo prompt
+    siempre da los mismos scores.
+    """
+    digest = _digest(seed_text)
+    reason = "Análisis determinístico (backend fake)"
+    return {
+        "seniority_match": {
+            "job_level": _FAKE_LEVELS[digest[0] % len(_FAKE_LEVELS)],
+            "candidate_level": _FAKE_LEVELS[digest[1] % len(_FAKE_LEVELS)],
+            "score": _fake_score(digest, 2),
+            "reason": reason
+        },
+        "role_fit": {"job_role": "fake", "candidate_role": "fake", "score": _fake_score(digest, 4), "reason": reason},
+        "industry": {"job_industries": [], "candidate_industries": [], "score": _fake_score(digest, 6), "reason": reason},
+        "stability": {"score": _fake_score(digest, 8), "reason": reason}
+    }
+
+
+def fake_analysis_payload(messages: List[Dict[str, str]], multi: bool = False) -> Dict[str, Any]:
+    """
+    Respuesta fake para los mensajes del matching: un MatchAnalysis por cada
+    bloque "=== CANDIDATE ... ===" del último mensaje (uno solo, o con
+    multi=True un MultiMatchAnalysis con todos). El análisis depende del prefijo
+    del job y del contexto del candidato, no del formato del prompt: el mismo
+    par da lo mismo por el camino individual, multi-candidato o asíncrono.
+    """
+    prefix = "\n".join(str(message.get("content", "")) for message in messages[:-1])
+    content = str(messages[-1].get("content", "")) if messages else ""
+    blocks = _CANDIDATE_BLOCK.split(content)
+    analyses = [
+        (reference, fake_match_analysis(f"{prefix}\n{block.strip()}"))
+        for reference, block in zip(blocks[1::2], blocks[2::2])
+    ]
+    if not multi:
+        return analyses[0][1] if analyses else fake_match_analysis(f"{prefix}\n{content}")
+    return {"matches": [{"candidate_id": reference, **analysis} for reference, analysis in analyses]}
+
+
+def fake_usage(messages: List[Dict[str, str]], completion_chars: int, cached: bool) -> Dict[str, Any]:
+    """Usage aproximado (~4 caracteres por token); si cached, el prefijo del job cuenta como cacheado"""
+    prefix_tokens = sum(len(str(message.get("content", ""))) for message in messages[:-1]) // 4
+    prompt_tokens = prefix_tokens + (len(str(messages[-1].get("content", ""))) // 4 if messages else 0)
+    completion_tokens = completion_chars // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": prefix_tokens if cached else 0}
+    }
+
+
+class DeterministicBackend:
+    """
+    Backend en proceso y sin red: MatchAnalysis válidos y reproducibles, usage
+    aproximado (con el prefijo del job cacheado desde la segunda llamada con el
+    mismo prompt_cache_key) y latencia fija opcional.
+    """
+
+    name = "fake"
+    match_source = "llm-fake"
+
+    def __init__(self, latency_ms: Optional[float] = None):
+        self.latency_ms = float(os.getenv("MATCHING_FAKE_LATENCY_MS", "0")) if latency_ms is None else latency_ms
+        self.model = f"{self.name}:{OPENAI_MODEL}"
+        self.calls = 0
+        self._seen_cache_keys = set()
+        self._lock = threading.Lock()
+
+    def _respond(self, messages, response_format, prompt_cache_key) -> StructuredResponse:
+        payload = fake_analysis_payload(messages, multi=issubclass(response_format, MultiMatchAnalysis))
+        parsed = response_format.model_validate(payload)
+        with self._lock:
+            self.calls += 1
+            cached = prompt_cache_key in self._seen_cache_keys
+            self._seen_cache_keys.add(prompt_cache_key)
+        return StructuredResponse(parsed, None, fake_usage(messages, len(parsed.model_dump_json()), cached), None)
+
+    def parse(self, messages, response_format, prompt_cache_key=None) -> StructuredResponse:
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000)
+        return self._respond(messages, response_format, prompt_cache_key)
+
+    async def aparse(self, messages, response_format, prompt_cache_key=None) -> StructuredResponse:
+        if self.latency_ms > 0:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return self._respond(messages, response_format, prompt_cache_key)
+
+
+# ============================================================================
+# FACTORY
+# ============================================================================
+
+def create_llm_backend(
+    name: Optional[str] = None,
+    openai_client: Any = None,
+    async_openai_client: Any = None
+) -> LLMBackend:
+    """
+    Crea el backend configurado (MATCHING_LLM_BACKEND si name es None).
+
+    Args:
+        name: openai | http-stub | fake
+        openai_client: Cliente síncrono de OpenAI (solo backend openai)
+        async_openai_client: Cliente asíncrono de OpenAI (solo backend openai)
+    """
+    name = name or llm_backend_name()
+    if name not in LLM_BACKENDS:
+        raise ValueError(f"❌ Backend de LLM desconocido: {name} (opciones: {', '.join(LLM_BACKENDS)})")
+    if name == "fake":
+        return DeterministicBackend()
+    if name == "http-stub":
+        return HTTPStubBackend()
+    return OpenAIBackend(openai_client, async_openai_client)
@@ -0,0 +1,132 @@
+"""
+Uso de tokens de las llamadas al LLM.
+
+OpenAI cachea automáticamente los prefijos de prompt idénticos (≥1024 tokens)
+y lo reporta en usage.prompt_tokens_details.cached_tokens. Este módulo
+normaliza el usage de cada respuesta (objeto del SDK o dict del Batch API) para
+guardarlo en match_detail.usage, lleva contadores acumulados del proceso y
+estima el costo en USD de un conjunto de llamadas.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+
+# Precios en USD por millón de tokens (input, input cacheado, output)
+MODEL_PRICING: Dict[str, Dict[str, float]] = {
+    "gpt-4o-2024-08-06": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+}
+
+
+def _field(source: Any, name: str) -> Any:
+    if source is None:
+        return None
+    if isinstance(source, dict):
+        return source.get(name)
+    return getattr(source, name, None)
+
+
+def extract_usage(usage: Any, latency_ms: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    Normaliza el usage de una respuesta de chat completions.
+
+    Args:
+        usage: response.usage (objeto del SDK) o body["usage"] (dict)
+        latency_ms: Duración de la llamada (opcional)
+
+    Returns:
+        Dict con prompt_tokens, cached_tokens, completion_tokens, total_tokens
+        y latency_ms, o None si la respuesta no trae usage
+    """
+    if usage is None:
+        return None
+
+    prompt_tokens = _field(usage, "prompt_tokens") or 0
+    completion_tokens = _field(usage, "completion_tokens") or 0
+    cached_tokens = _field(_field(usage, "prompt_tokens_details"), "cached_tokens") or 0
+
+    return {
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": _field(usage, "total_tokens") or prompt_tokens + completion_tokens,
+        "latency_ms": round(latency_ms, 1) if latency_ms is not None else None
+    }
+
+
+class UsageStats:
+    """Contadores acumulados de tokens y latencia de las llamadas al LLM"""
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.latency_ms_total = 0.0
+        self._timed_requests = 0
+        self._lock = threading.Lock()
+
+    def record(self, usage: Optional[Dict[str, Any]]) -> None:
+        """Suma el usage normalizado de una respuesta (ver extract_usage)"""
+        if usage is None:
+            return
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += usage["prompt_tokens"]
+            self.cached_tokens += usage["cached_tokens"]
+            self.completion_tokens += usage["completion_tokens"]
+            if usage.get("latency_ms") is not None:
+                self.latency_ms_total += usage["latency_ms"]
+                self._timed_requests += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Devuelve requests, tokens, proporción de prompt cacheado y latencia promedio"""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cached_ratio": round(self.cached_tokens / self.prompt_tokens, 4) if self.prompt_tokens else 0.0,
+                "avg_latency_ms": round(self.latency_ms_total / self._timed_requests, 1) if self._timed_requests else None
+            }
+
+
+def usage_delta(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Tokens y requests consumidos entre dos llamadas a UsageStats.stats().
+
+    Si otros matches corren en paralelo en el mismo proceso, el delta los incluye.
+    """
+    return {
+        field: after[field] - before[field]
+        for field in ("requests", "prompt_tokens", "cached_tokens", "completion_tokens")
+    }
+
+
+def estimate_cost_usd(usage: Dict[str, Any], model: str) -> Optional[float]:
+    """
+    Estima el costo de un conjunto de llamadas según MODEL_PRICING.
+
+    Los tokens cacheados se cobran al precio de input cacheado y el resto del
+    prompt al precio normal.
+
+    Args:
+        usage: Dict con prompt_tokens, cached_tokens y completion_tokens
+        model: Modelo usado (ej: matching_service.OPENAI_MODEL)
+
+    Returns:
+        Costo en USD, o None si el modelo no tiene precio configurado
+    """
+    pricing = MODEL_PRICING.get(model)
+    if pricing is None:
+        return None
+    uncached_tokens = usage["prompt_tokens"] - usage["cached_tokens"]
+    cost = (
+        uncached_tokens * pricing["input"]
+        + usage["cached_tokens"] * pricing["cached_input"]
+        + usage["completion_tokens"] * pricing["output"]
+    ) / 1_000_000
+    return round(cost, 6)
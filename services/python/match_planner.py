@@ -0,0 +1,170 @@
+"""
+Planificador de re-matching incremental.
+
+Cada match guarda en match_detail.input_fingerprint la "huella" de los inputs
+con los que se calculó (updated_at del job y del candidato, hash de sus
+experiencias y versión del prompt). El planificador compara esas huellas con
+el estado actual de jobs, candidates y candidate_experience y devuelve solo
+los pares que hay que volver a evaluar.
+
+La huella (compute_input_fingerprint, experience_fingerprint) se calcula en
+matching_core.fingerprint; este módulo hace las lecturas y la comparación.
+"""
+
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from data_loader import FINGERPRINT_FIELDS, fetch_all, fetch_all_in, select_columns
+from matching_core.fingerprint import compute_input_fingerprint, experience_fingerprint
+
+
+# Estados de job que ya no reciben recomendaciones (igual que el Control Tower)
+CLOSED_JOB_STATUSES = ("Recomendación Contratada", "Recomendación Cancelada")
+
+
+class StalePair(NamedTuple):
+    """Par job ↔ candidato que necesita re-matching"""
+    job_id: str
+    candidate_id: str
+    reason: str  # new | job | candidate | experience | prompt
+
+
+def _stale_reason(stored: Optional[Dict[str, Any]], current: Dict[str, str]) -> Optional[str]:
+    """Devuelve por qué un par está desactualizado, o None si está al día"""
+    if not stored:
+        return "new"
+    if stored.get("prompt_version") != current["prompt_version"]:
+        return "prompt"
+    if stored.get("job_updated_at") != current["job_updated_at"]:
+        return "job"
+    if stored.get("candidate_updated_at") != current["candidate_updated_at"]:
+        return "candidate"
+    if stored.get("experience_hash") != current["experience_hash"]:
+        return "experience"
+    return None
+
+
+def fetch_active_jobs(supabase: Any) -> List[Dict[str, Any]]:
+    """Jobs que todavía reciben recomendaciones (id, updated_at)"""
+    def _active_jobs():
+        query = supabase.table("jobs").select(select_columns("jobs", FINGERPRINT_FIELDS))
+        for status in CLOSED_JOB_STATUSES:
+            query = query.neq("status", status)
+        return query
+    return fetch_all(_active_jobs)
+
+
+def network_candidate_ids(supabase: Any, hyperconnector_ids: Optional[List[str]] = None) -> List[str]:
+    """
+    Candidatos de la red de hyperconnectors (hyperconnector_candidates), sin duplicados.
+
+    Args:
+        supabase: Cliente de Supabase
+        hyperconnector_ids: Limitar a las redes de estos hyperconnectors (opcional)
+    """
+    columns = select_columns("hyperconnector_candidates", FINGERPRINT_FIELDS)
+    if hyperconnector_ids:
+        links = fetch_all_in(
+            supabase,
+            "hyperconnector_candidates",
+            columns,
+            "hyperconnector_id",
+            list(dict.fromkeys(hyperconnector_ids))
+        )
+    else:
+        links = fetch_all(lambda: supabase.table("hyperconnector_candidates").select(columns))
+    return list(dict.fromkeys(link["candidate_id"] for link in links))
+
+
+def plan_stale_pairs(
+    supabase: Any,
+    prompt_version: str,
+    job_ids: Optional[List[str]] = None,
+    candidate_ids: Optional[List[str]] = None
+) -> List[StalePair]:
+    """
+    Calcula el conjunto mínimo de pares job ↔ candidato que hay que re-evaluar.
+
+    Por defecto considera todos los jobs activos contra todos los candidatos de
+    hyperconnector_candidates (el mismo universo que el Control Tower).
+
+    Args:
+        supabase: Cliente de Supabase
+        prompt_version: Versión actual del prompt (ver matching_service.PROMPT_VERSION)
+        job_ids: Limitar a estos jobs (opcional)
+        candidate_ids: Limitar a estos candidatos (opcional)
+
+    Returns:
+        Lista de StalePair ordenada por job
+    """
+    # Jobs (id, updated_at)
+    if job_ids:
+        jobs = fetch_all_in(
+            supabase,
+            "jobs",
+            select_columns("jobs", FINGERPRINT_FIELDS),
+            "id",
+            list(dict.fromkeys(job_ids))
+        )
+    else:
+        jobs = fetch_active_jobs(supabase)
+
+    # Candidatos (id, updated_at)
+    if not candidate_ids:
+        candidate_ids = network_candidate_ids(supabase)
+    candidate_ids = list(dict.fromkeys(candidate_ids))
+
+    if not jobs or not candidate_ids:
+        return []
+
+    candidates = fetch_all_in(
+        supabase,
+        "candidates",
+        select_columns("candidates", FINGERPRINT_FIELDS),
+        "id",
+        candidate_ids
+    )
+
+    experiences_by_candidate: Dict[str, List[Dict[str, Any]]] = {}
+    experience_columns = select_columns("candidate_experience", FINGERPRINT_FIELDS)
+    for exp in fetch_all_in(supabase, "candidate_experience", experience_columns, "candidate_id", candidate_ids):
+        experiences_by_candidate.setdefault(exp["candidate_id"], []).append(exp)
+
+    # Huellas guardadas en los matches existentes
+    stored: Dict[tuple, Optional[Dict[str, Any]]] = {}
+    for row in fetch_all_in(
+        supabase,
+        "job_candidate_matches",
+        select_columns("job_candidate_matches", FINGERPRINT_FIELDS),
+        "job_id",
+        [job["id"] for job in jobs]
+    ):
+        stored[(row["job_id"], row["candidate_id"])] = row.get("input_fingerprint")
+
+    stale: List[StalePair] = []
+    for job in jobs:
+        for candidate in candidates:
+            current = compute_input_fingerprint(
+                job,
+                candidate,
+                experiences_by_candidate.get(candidate["id"], []),
+                prompt_version
+            )
+            reason = _stale_reason(stored.get((job["id"], candidate["id"])), current)
+            if reason:
+                stale.append(StalePair(job["id"], candidate["id"], reason))
+
+    return stale
+
+
+def group_pairs_by_job(pairs: Iterable[Sequence[str]]) -> Dict[str, List[str]]:
+    """
+    Agrupa pares por job_id (para enviarlos a calculate_and_save_matches),
+    sin duplicados y preservando el orden.
+
+    Args:
+        pairs: StalePair o tuplas (job_id, candidate_id)
+    """
+    grouped: Dict[str, Dict[str, None]] = {}
+    for pair in pairs:
+        grouped.setdefault(pair[0], {})[pair[1]] = None
+    return {job_id: list(candidate_ids) for job_id, candidate_ids in grouped.items()}
@@ -0,0 +1,190 @@
+"""
+Capa de escritura de job_candidate_matches.
+
+Usa un upsert real (ON CONFLICT (job_id, candidate_id)) en lugar de
+update + insert: un solo round trip por escritura y sin carrera entre los dos
+pasos. MatchWriter acumula filas y las escribe en batches con reintentos.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from matching_core.persistence import build_match_row
+from metrics import span
+
+
+MATCHES_TABLE = "job_candidate_matches"
+MATCHES_CONFLICT_COLUMNS = "job_id,candidate_id"
+
+# Filas por upsert y reintentos por batch
+MATCH_WRITE_BATCH_SIZE = int(os.getenv("MATCH_WRITE_BATCH_SIZE", "100"))
+MATCH_WRITE_MAX_RETRIES = int(os.getenv("MATCH_WRITE_MAX_RETRIES", "3"))
+MATCH_WRITE_RETRY_BACKOFF_SECONDS = 0.5
+
+
+class MatchWriteError(Exception):
+    """No se pudo escribir un batch de matches después de todos los reintentos"""
+
+    def __init__(self, message: str, rows: List[Dict[str, Any]]):
+        super().__init__(message)
+        self.rows = rows
+
+
+def _dedupe(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Deja una fila por (job_id, candidate_id), la última.
+    Postgres rechaza un ON CONFLICT DO UPDATE que toca la misma fila dos veces.
+    """
+    by_pair: Dict[tuple, Dict[str, Any]] = {}
+    for row in rows:
+        by_pair[(row["job_id"], row["candidate_id"])] = row
+    return list(by_pair.values())
+
+
+def _chunks(rows: List[Dict[str, Any]], size: int) -> List[List[Dict[str, Any]]]:
+    return [rows[i:i + size] for i in range(0, len(rows), size)]
+
+
+def upsert_matches(
+    supabase: Any,
+    rows: List[Dict[str, Any]],
+    batch_size: int = MATCH_WRITE_BATCH_SIZE,
+    max_retries: int = MATCH_WRITE_MAX_RETRIES
+) -> int:
+    """
+    Escribe filas de job_candidate_matches con upsert en batches, con reintentos
+    y backoff exponencial por batch.
+
+    Args:
+        supabase: Cliente de Supabase
+        rows: Filas (ver build_match_row)
+        batch_size: Filas por statement
+        max_retries: Reintentos por batch antes de fallar
+
+    Returns:
+        Cantidad de filas escritas
+
+    Raises:
+        MatchWriteError: Si un batch falla después de todos los reintentos
+    """
+    written = 0
+    for chunk in _chunks(_dedupe(rows), batch_size):
+        with span("db_write", rows=len(chunk)) as current:
+            for attempt in range(max_retries + 1):
+                current.set(attempts=attempt + 1)
+                try:
+                    supabase.table(MATCHES_TABLE).upsert(chunk, on_conflict=MATCHES_CONFLICT_COLUMNS).execute()
+                    written += len(chunk)
+                    break
+                except Exception as e:
+                    if attempt == max_retries:
+                        raise MatchWriteError(
+                            f"❌ No se pudieron guardar {len(chunk)} matches después de {max_retries + 1} intentos: {e}",
+                            chunk
+                        ) from e
+                    print(f"   ⚠️  Error guardando {len(chunk)} matches (intento {attempt + 1}), reintentando: {e}")
+                    time.sleep(MATCH_WRITE_RETRY_BACKOFF_SECONDS * (2 ** attempt))
+    return written
+
+
+async def upsert_matches_async(
+    supabase: Any,
+    rows: List[Dict[str, Any]],
+    batch_size: int = MATCH_WRITE_BATCH_SIZE,
+    max_retries: int = MATCH_WRITE_MAX_RETRIES
+) -> int:
+    """Versión asíncrona de upsert_matches (cliente asíncrono de Supabase)"""
+    written = 0
+    for chunk in _chunks(_dedupe(rows), batch_size):
+        with span("db_write", rows=len(chunk)) as current:
+            for attempt in range(max_retries + 1):
+                current.set(attempts=attempt + 1)
+                try:
+                    await supabase.table(MATCHES_TABLE).upsert(chunk, on_conflict=MATCHES_CONFLICT_COLUMNS).execute()
+                    written += len(chunk)
+                    break
+                except Exception as e:
+                    if attempt == max_retries:
+                        raise MatchWriteError(
+                            f"❌ No se pudieron guardar {len(chunk)} matches después de {max_retries + 1} intentos: {e}",
+                            chunk
+                        ) from e
+                    print(f"   ⚠️  Error guardando {len(chunk)} matches (intento {attempt + 1}), reintentando: {e}")
+                    await asyncio.sleep(MATCH_WRITE_RETRY_BACKOFF_SECONDS * (2 ** attempt))
+    return written
+
+
+class MatchWriter:
+    """
+    Buffer de escritura: acumula filas y hace flush con upsert cada `batch_size`
+    filas (y al salir del bloque with).
+
+        with MatchWriter(supabase) as writer:
+            for ...:
+                writer.add(build_match_row(...))
+
+    Con on_written / on_failed el flush no lanza: cada batch escrito se pasa a
+    on_written(filas) y cada batch que falló después de los reintentos a
+    on_failed(filas, error), así el caller confirma (o marca con error) recién
+    lo que quedó guardado. Sin callbacks, un batch que falla lanza MatchWriteError.
+    """
+
+    def __init__(
+        self,
+        supabase: Any,
+        batch_size: int = MATCH_WRITE_BATCH_SIZE,
+        max_retries: int = MATCH_WRITE_MAX_RETRIES,
+        on_written: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+        on_failed: Optional[Callable[[List[Dict[str, Any]], Exception], None]] = None
+    ):
+        self.supabase = supabase
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.on_written = on_written
+        self.on_failed = on_failed
+        self.written = 0
+        self.failed = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, row: Dict[str, Any]) -> None:
+        """Agrega una fila; hace flush si el buffer llegó a batch_size"""
+        with self._lock:
+            self._buffer.append(row)
+            should_flush = len(self._buffer) >= self.batch_size
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> int:
+        """Escribe todo lo acumulado. Devuelve la cantidad de filas escritas"""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+
+        written = 0
+        for chunk in _chunks(_dedupe(rows), self.batch_size):
+            try:
+                chunk_written = upsert_matches(self.supabase, chunk, self.batch_size, self.max_retries)
+            except MatchWriteError as e:
+                if self.on_failed is None:
+                    raise
+                with self._lock:
+                    self.failed += len(chunk)
+                self.on_failed(chunk, e)
+                continue
+            written += chunk_written
+            with self._lock:
+                self.written += chunk_written
+            if self.on_written is not None:
+                self.on_written(chunk)
+        return written
+
+    def __enter__(self) -> "MatchWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.flush()
@@ -0,0 +1,67 @@
+"""
+Núcleo del matching: la lógica compartida por todos los puntos de entrada.
+
+Funciones puras de render de contextos, prompts, pre-filtro, scoring, huella
+de inputs y filas de persistencia, sin clientes, estado global ni imports de
+services/python (se importa sin ese directorio en sys.path). Las lecturas y
+escrituras (data_loader, match_writer, match_planner) dependen del núcleo, no
+al revés. Los adaptadores solo orquestan:
+
+- matching_service.py: CLI, worker stdin/stdout y flujo síncrono/batch
+- async_matching.py: motor asíncrono
+- api/ai-match.py: función serverless de Vercel (importa matching_service)
+- matching_server.py, batch_mode.py, backfill.py: sobre matching_service
+
+Un cambio de prompt, pesos o formato de match_detail hecho acá llega a todos.
+"""
+
+from .context import (
+    RESUME_FORMAT_VERSION,
+    ExperienceRecord,
+    build_candidate_context,
+    build_job_context,
+    calculate_duration_months,
+    format_duration,
+    format_month,
+    generate_candidate_resume,
+    get_job_level_and_industries,
+    normalize_experience,
+    parse_date_string,
+    parse_job_requirements,
+)
+from .fingerprint import EXPERIENCE_CONTENT_FIELDS, compute_input_fingerprint, experience_fingerprint
+from .models import (
+    CandidateMatchAnalysis,
+    Industry,
+    MatchAnalysis,
+    MultiMatchAnalysis,
+    RoleFit,
+    SeniorityMatch,
+    Stability,
+    response_format_param,
+)
+from .persistence import build_match_row, match_row
+from .prefilter import prefilter_match
+from .prompts import (
+    MATCH_INSTRUCTIONS,
+    OPENAI_MODEL,
+    OPENAI_TEMPERATURE,
+    SYSTEM_PROMPT,
+    build_job_prefix_messages,
+    build_match_messages,
+    build_multi_match_messages,
+    candidate_reference,
+    prompt_cache_key,
+)
+from .scoring import (
+    MATCH_SOURCE,
+    MATCH_WEIGHTS,
+    PREFILTER_ENABLED,
+    PROMPT_VERSION,
+    RULE_BASED_MATCH_SOURCE,
+    build_match_detail,
+    build_match_result,
+    compute_final_score,
+    match_result,
+    run_prefilter,
+)
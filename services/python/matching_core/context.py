@@ -0,0 +1,300 @@
+"""
+Render de contextos: el texto de job y candidato que se envía al modelo.
+
+Funciones puras (sin clientes ni I/O): reciben filas de jobs, candidates y
+candidate_experience tal como las devuelve data_loader y devuelven strings.
+"""
+
+import json
+from datetime import datetime, date
+from functools import lru_cache
+from operator import attrgetter
+from typing import Optional, List, Dict, Any, NamedTuple
+
+
+# Versión del formato del contexto de candidato (generate_candidate_resume,
+# build_candidate_context): subirla al cambiar el texto renderizado invalida los
+# resumes guardados en resume_store
+RESUME_FORMAT_VERSION = "1"
+
+
+def calculate_duration_months(start_date: date, end_date: Optional[date]) -> tuple[int, int]:
+    """
+    Calcula la duración entre dos fechas en años y meses.
+    
+    Args:
+        start_date: Fecha de inicio
+        end_date: Fecha de fin (None si es trabajo actual)
+    
+    Returns:
+        Tuple (años, meses)
+    """
+    if end_date is None:
+        end_date = date.today()
+    
+    # Calcular diferencia
+    years = end_date.year - start_date.year
+    months = end_date.month - start_date.month
+    
+    # Ajustar si el día de fin es anterior al día de inicio
+    if end_date.day < start_date.day:
+        months -= 1
+    
+    # Ajustar años y meses
+    if months < 0:
+        years -= 1
+        months += 12
+    
+    return years, months
+
+
+def format_duration(years: int, months: int) -> str:
+    """Formatea duración en texto legible"""
+    parts = []
+    if years > 0:
+        parts.append(f"{years} año{'s' if years > 1 else ''}")
+    if months > 0:
+        parts.append(f"{months} mes{'es' if months > 1 else ''}")
+    return ", ".join(parts) if parts else "Menos de 1 mes"
+
+
+class ExperienceRecord(NamedTuple):
+    """Experiencia normalizada: fechas ya parseadas, se construye una vez por fila"""
+    start_date: date
+    end_date: Optional[date]
+    role_title: Any
+    company_name: Any
+    description: Any
+
+
+@lru_cache(maxsize=8192)
+def parse_date_string(value: str) -> Optional[date]:
+    """
+    Parsea una fecha ISO ("2021-03-01", "2021-03-01T00:00:00Z", ...).
+    Memoizada: las mismas fechas se repiten entre experiencias y candidatos.
+    
+    Returns:
+        date o None si el string no es una fecha válida
+    """
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).date()
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(value.split('T')[0], '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=2048)
+def format_month(year: int, month: int) -> str:
+    """Etiqueta "%b %Y" de un mes (memoizada: strftime es lo más caro del resume)"""
+    return date(year, month, 1).strftime('%b %Y')
+
+
+def normalize_experience(exp: Dict[str, Any], today: date) -> ExperienceRecord:
+    """
+    Convierte una fila de candidate_experience en ExperienceRecord.
+    
+    Args:
+        exp: Fila de candidate_experience
+        today: Fallback de start_date si falta o no se puede parsear
+    
+    Returns:
+        ExperienceRecord (end_date None = trabajo actual)
+    """
+    start_value = exp.get('start_date')
+    if isinstance(start_value, str):
+        start_date = parse_date_string(start_value) or today
+    elif isinstance(start_value, date):
+        start_date = start_value
+    else:
+        start_date = today
+    
+    end_value = exp.get('end_date')
+    end_date = None
+    if end_value:
+        if isinstance(end_value, str):
+            end_date = parse_date_string(end_value)
+        elif isinstance(end_value, date):
+            end_date = end_value
+    
+    return ExperienceRecord(
+        start_date,
+        end_date,
+        exp.get('role_title', 'Sin título'),
+        exp.get('company_name', 'Sin empresa'),
+        exp.get('description', '')
+    )
+
+
+def generate_candidate_resume(candidate_experiences: List[Dict[str, Any]]) -> str:
+    """
+    Genera un string de texto cronológico (Resume) a partir de las experiencias del candidato.
+    
+    Args:
+        candidate_experiences: Lista de experiencias del candidato
+    
+    Returns:
+        String formateado con el resume cronológico
+    """
+    if not candidate_experiences:
+        return "Sin experiencia laboral registrada."
+    
+    # Cada fila se parsea una sola vez; sin fecha de inicio válida se usa hoy
+    today = date.today()
+    records = [normalize_experience(exp, today) for exp in candidate_experiences]
+    
+    # Ordenar por fecha de inicio (más reciente primero)
+    records.sort(key=attrgetter('start_date'), reverse=True)
+    
+    resume_parts = []
+    
+    for record in records:
+        # Calcular duración
+        years, months = calculate_duration_months(record.start_date, record.end_date)
+        duration_str = format_duration(years, months)
+        
+        # Formatear período
+        start_str = format_month(record.start_date.year, record.start_date.month)
+        end_str = "Actualidad" if record.end_date is None else format_month(record.end_date.year, record.end_date.month)
+        
+        # Construir entrada del resume
+        entry = f"• {record.role_title} en {record.company_name} ({start_str} - {end_str} ({duration_str}))"
+        if record.description:
+            entry += f"\n  {record.description}"
+        
+        resume_parts.append(entry)
+    
+    return "\n\n".join(resume_parts)
+
+
+def parse_job_requirements(requirements_json_data: Any) -> Dict[str, Any]:
+    """
+    Parsea el JSON de requirements_json y extrae la información relevante.
+    
+    Args:
+        requirements_json_data: Puede ser un string JSON o un dict ya parseado
+    
+    Returns:
+        Dict con non_negotiables_text, desired_trajectory_text, needs_technical_background
+    """
+    if not requirements_json_data:
+        return {
+            "non_negotiables_text": "",
+            "desired_trajectory_text": "",
+            "needs_technical_background": False
+        }
+    
+    # Si ya es un dict, usarlo directamente
+    if isinstance(requirements_json_data, dict):
+        requirements = requirements_json_data
+    # Si es un string, parsearlo
+    elif isinstance(requirements_json_data, str):
+        try:
+            requirements = json.loads(requirements_json_data)
+        except json.JSONDecodeError as e:
+            print(f"⚠️  Error parseando requirements_json: {e}")
+            return {
+                "non_negotiables_text": "",
+                "desired_trajectory_text": "",
+                "needs_technical_background": False
+            }
+    else:
+        print(f"⚠️  requirements_json tiene tipo inesperado: {type(requirements_json_data)}")
+        return {
+            "non_negotiables_text": "",
+            "desired_trajectory_text": "",
+            "needs_technical_background": False
+        }
+    
+    return {
+        "non_negotiables_text": requirements.get("non_negotiables_text", ""),
+        "desired_trajectory_text": requirements.get("desired_trajectory_text", ""),
+        "needs_technical_background": requirements.get("needs_technical_background", False),
+        "seniority": requirements.get("seniority", ""),
+        "industries": requirements.get("industries", [])
+    }
+
+
+
+def get_job_level_and_industries(job: Dict[str, Any]) -> tuple[Dict[str, Any], str, List[str]]:
+    """
+    Extrae requirements parseados, nivel (Career Matrix) e industrias del job.
+    
+    Returns:
+        Tuple (requirements, job_seniority, job_industries)
+    """
+    # Parsear requirements_json
+    requirements = parse_job_requirements(job.get('requirements_json', ''))
+    
+    # Obtener seniority level del job (puede estar en job_level o requirements_json.seniority)
+    job_seniority = job.get('job_level') or requirements.get('seniority', '')
+    
+    # Obtener industrias del job (puede estar en requirements_json.industries)
+    job_industries = requirements.get('industries', [])
+    if isinstance(job_industries, str):
+        job_industries = [job_industries] if job_industries else []
+    elif not isinstance(job_industries, list):
+        job_industries = []
+    
+    return requirements, job_seniority, job_industries
+
+
+def build_job_context(job: Dict[str, Any]) -> str:
+    """
+    Construye el contexto de texto del job que se envía al LLM.
+    
+    Args:
+        job: Fila de la tabla jobs
+    
+    Returns:
+        String con el contexto del job
+    """
+    requirements, job_seniority, job_industries = get_job_level_and_industries(job)
+    
+    return f"""
+TÍTULO DE LA VACANTE: {job.get('job_title', 'Sin título')}
+NIVEL REQUERIDO (Career Matrix): {job_seniority if job_seniority else 'No especificado - inferir del título y descripción'}
+INDUSTRIAS: {', '.join(job_industries) if job_industries else 'No especificadas'}
+
+DESCRIPCIÓN:
+{job.get('description', 'Sin descripción')}
+
+REQUISITOS NO NEGOCIABLES:
+{requirements.get('non_negotiables_text', 'No especificados')}
+
+TRAYECTORIA DESEADA:
+{requirements.get('desired_trajectory_text', 'No especificada')}
+
+REQUIERE BACKGROUND TÉCNICO: {'Sí' if requirements.get('needs_technical_background') else 'No'}
+"""
+
+
+def build_candidate_context(candidate: Dict[str, Any], experiences: List[Dict[str, Any]]) -> str:
+    """
+    Construye el contexto de texto del candidato (incluye el resume cronológico).
+    
+    Args:
+        candidate: Fila de la tabla candidates
+        experiences: Filas de candidate_experience del candidato
+    
+    Returns:
+        String con el contexto del candidato
+    """
+    # Generar resume del candidato
+    candidate_resume = generate_candidate_resume(experiences)
+    
+    # Obtener seniority del candidato
+    candidate_seniority = candidate.get('seniority', '')
+    
+    return f"""
+NOMBRE: {candidate.get('full_name', 'Sin nombre')}
+TÍTULO ACTUAL: {candidate.get('current_job_title', 'Sin título')}
+NIVEL (Career Matrix): {candidate_seniority if candidate_seniority else 'No especificado - inferir del título actual y experiencia'}
+INDUSTRIA: {candidate.get('industry', 'No especificada')}
+
+EXPERIENCIA LABORAL (Cronológica):
+{candidate_resume}
+"""
+
@@ -0,0 +1,63 @@
+"""
+Huella de inputs de un match.
+
+Cada match guarda en match_detail.input_fingerprint el updated_at del job y del
+candidato, un hash del contenido de sus experiencias y la versión del prompt.
+match_planner compara esas huellas con el estado actual para decidir qué pares
+re-evaluar, y resume_store usa el mismo hash de experiencias para versionar los
+resumes pre-renderizados.
+
+candidate_experience se reemplaza completa al re-enriquecer un candidato (delete
++ insert), así que su huella es un hash del contenido en lugar de un updated_at.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Iterable
+
+
+# Campos de candidate_experience que entran en el resume enviado al LLM
+EXPERIENCE_CONTENT_FIELDS = ("role_title", "company_name", "description", "start_date", "end_date")
+
+
+def experience_fingerprint(experiences: Iterable[Dict[str, Any]]) -> str:
+    """
+    Calcula un hash estable del contenido de las experiencias de un candidato.
+
+    Args:
+        experiences: Filas de candidate_experience (en cualquier orden)
+
+    Returns:
+        sha256 hexadecimal (recortado a 16 caracteres)
+    """
+    normalized = sorted(
+        json.dumps([exp.get(field) for field in EXPERIENCE_CONTENT_FIELDS], default=str, ensure_ascii=False)
+        for exp in experiences
+    )
+    return hashlib.sha256("\n".join(normalized).encode("utf-8")).hexdigest()[:16]
+
+
+def compute_input_fingerprint(
+    job: Dict[str, Any],
+    candidate: Dict[str, Any],
+    experiences: Iterable[Dict[str, Any]],
+    prompt_version: str
+) -> Dict[str, str]:
+    """
+    Construye la huella de inputs que se guarda en match_detail.input_fingerprint.
+
+    Args:
+        job: Fila de jobs (se usa updated_at)
+        candidate: Fila de candidates (se usa updated_at)
+        experiences: Filas de candidate_experience del candidato
+        prompt_version: Hash del prompt/modelo/pesos usados
+
+    Returns:
+        Dict serializable a JSON
+    """
+    return {
+        "job_updated_at": str(job.get("updated_at") or ""),
+        "candidate_updated_at": str(candidate.get("updated_at") or ""),
+        "experience_hash": experience_fingerprint(experiences),
+        "prompt_version": prompt_version
+    }
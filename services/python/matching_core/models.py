@@ -0,0 +1,96 @@
+"""
+Modelos Pydantic del análisis de match (Structured Outputs).
+
+Son el response_format de las llamadas al modelo y el tipo que devuelven el
+pre-filtro por reglas y el cache de análisis.
+"""
+
+from typing import Any, Dict, List
+
+from pydantic import BaseModel, Field
+
+
+class SeniorityMatch(BaseModel):
+    """Evaluación de match de seniority usando Career Matrix"""
+    job_level: str = Field(..., description="Nivel del job en Career Matrix (ej: PM3, SE2)")
+    candidate_level: str = Field(..., description="Nivel del candidato en Career Matrix (ej: PM3, SE2)")
+    score: float = Field(..., ge=0.0, le=100.0, description="Score de 0.0 a 100.0")
+    reason: str = Field(..., description="Razón del score, especialmente si levels no coinciden")
+
+
+class RoleFit(BaseModel):
+    """Evaluación de fit del rol"""
+    job_role: str = Field(..., description="Rol requerido en el job")
+    candidate_role: str = Field(..., description="Rol actual del candidato")
+    score: float = Field(..., ge=0.0, le=100.0, description="Score de 0.0 a 100.0")
+    reason: str = Field(..., description="Razón del score, especialmente si hay mismatch")
+
+
+class Industry(BaseModel):
+    """Evaluación de industria"""
+    job_industries: List[str] = Field(..., description="Industrias requeridas por el job")
+    candidate_industries: List[str] = Field(..., description="Industrias donde ha trabajado el candidato")
+    score: float = Field(..., ge=0.0, le=100.0, description="Score de 0.0 a 100.0")
+    reason: str = Field(..., description="Razón del score basada en alineación de industrias")
+
+
+class Stability(BaseModel):
+    """Evaluación de estabilidad laboral"""
+    score: float = Field(..., ge=0.0, le=100.0, description="Score de 0.0 a 100.0")
+    reason: str = Field(..., description="Razón del score basada en historial de empleo")
+
+
+class MatchAnalysis(BaseModel):
+    """Análisis completo de match entre job y candidato"""
+    seniority_match: SeniorityMatch = Field(..., description="Evaluación de match de seniority (40%)")
+    role_fit: RoleFit = Field(..., description="Evaluación de fit del rol (20%)")
+    industry: Industry = Field(..., description="Evaluación de industria (30%)")
+    stability: Stability = Field(..., description="Evaluación de estabilidad laboral (10%)")
+
+
+class CandidateMatchAnalysis(MatchAnalysis):
+    """MatchAnalysis de un candidato dentro de un prompt multi-candidato"""
+    candidate_id: str = Field(..., description="Referencia del candidato tal como aparece en el prompt (ej: C1)")
+
+
+class MultiMatchAnalysis(BaseModel):
+    """Análisis de K candidatos contra un mismo job en una sola llamada"""
+    matches: List[CandidateMatchAnalysis] = Field(..., description="Un análisis por cada candidato del prompt")
+
+
+def _strict(schema: Any, defs: Dict[str, Any]) -> Any:
+    """
+    Cada objeto del schema con additionalProperties: false y todas sus
+    propiedades requeridas; un $ref con claves al lado (ej: description) se
+    reemplaza por su definición, porque el modo estricto no acepta hermanos de $ref.
+    """
+    if isinstance(schema, list):
+        return [_strict(item, defs) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    if "$ref" in schema and len(schema) > 1:
+        target = defs[schema["$ref"].rsplit("/", 1)[-1]]
+        schema = {**target, **{key: value for key, value in schema.items() if key != "$ref"}}
+    schema = {key: _strict(value, defs) for key, value in schema.items()}
+    if schema.get("type") == "object" and "properties" in schema:
+        schema["additionalProperties"] = False
+        schema["required"] = list(schema["properties"])
+    return schema
+
+
+def response_format_param(model: type) -> Dict[str, Any]:
+    """
+    response_format de Structured Outputs (json_schema estricto) para un modelo,
+    armado desde model_json_schema(): es el body que el SDK envía para
+    response_format=Modelo, para los requests que no pasan por el SDK (Batch
+    API, backend http-stub).
+    """
+    schema = model.model_json_schema()
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model.__name__,
+            "schema": _strict(schema, schema.get("$defs", {})),
+            "strict": True
+        }
+    }
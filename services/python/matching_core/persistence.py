@@ -0,0 +1,41 @@
+"""
+Filas de job_candidate_matches.
+
+Convierte los resultados de scoring.build_match_result en filas para el upsert
+(ON CONFLICT (job_id, candidate_id)). La escritura, con batches y reintentos,
+está en match_writer.py: este módulo no recibe ni crea clientes.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+
+def build_match_row(
+    job_id: str,
+    candidate_id: str,
+    final_score: float,
+    match_detail: Dict[str, Any],
+    match_source: str,
+    updated_at: Optional[str] = None
+) -> Dict[str, Any]:
+    """Construye la fila de job_candidate_matches (created_at lo pone el default de la tabla)"""
+    return {
+        "job_id": job_id,
+        "candidate_id": candidate_id,
+        "match_score": float(final_score),
+        "match_detail": match_detail,
+        "match_source": match_source,
+        "updated_at": updated_at or datetime.now().isoformat()
+    }
+
+
+def match_row(result: Dict[str, Any], now: Optional[str] = None) -> Dict[str, Any]:
+    """Fila de job_candidate_matches para un resultado exitoso de build_match_result"""
+    return build_match_row(
+        result["job_id"],
+        result["candidate_id"],
+        result["match_score"],
+        result["match_detail"],
+        result["match_source"],
+        now
+    )
@@ -0,0 +1,265 @@
+"""
+Pre-filtro determinístico previo a la llamada al LLM.
+
+El SYSTEM_PROMPT define ceros duros: si el job y el candidato son de tracks
+distintos (PM vs SE) el seniority es 0, y una lista cerrada de mismatches de
+rol (PM vs Engineer, Marketing vs Engineering, Sales vs Product, Data
+Scientist vs Frontend) deja role fit en 0. Este módulo infiere track y nivel de
+Career Matrix (PM1–PM6, SE1–SE6) a partir de current_job_title, seniority y los
+títulos de experiencia, y solo para esos pares construye el análisis
+localmente sin llamar a OpenAI.
+
+Es conservador: cualquier otro par (fits parciales o adyacentes como Designer
+o Data Analyst → PM, que el prompt puntúa 30–60), un título sin familia
+reconocible o con varias familias a la vez, o experiencia previa en el track
+del job devuelve None y el par se evalúa con el LLM.
+"""
+
+import re
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+
+TRACK_PM = "PM"
+TRACK_SE = "SE"
+
+FAMILY_FRONTEND = "frontend"
+
+# Familias de rol reconocidas. PM y SE son los tracks de la Career Matrix; el
+# resto sirve para detectar los mismatches duros y los títulos ambiguos.
+ROLE_FAMILY_KEYWORDS: Dict[str, tuple] = {
+    TRACK_PM: (
+        "product manager", "product owner", "pm", "head of product", "director of product",
+        "vp of product", "vp product", "chief product", "cpo", "product lead", "group product",
+        "gerente de producto", "jefe de producto", "líder de producto", "lider de producto",
+    ),
+    TRACK_SE: (
+        "engineer", "developer", "software", "ingeniero", "desarrollador", "programador",
+        "devops", "sre", "cto", "tech lead", "head of engineering", "engineering manager",
+        "frontend", "backend", "full stack", "fullstack",
+    ),
+    "marketing": ("marketing", "growth marketer", "brand manager", "mercadeo"),
+    "sales": ("sales", "ventas", "account executive", "business development", "comercial"),
+    "data_science": ("data scientist", "científico de datos"),
+    "data_analysis": ("data analyst", "analista de datos"),
+    "design": ("designer", "diseñador", "ux", "ui"),
+}
+
+# Jobs SE de frontend (para el mismatch duro Data Scientist vs Frontend)
+FRONTEND_KEYWORDS = ("frontend", "front end", "front-end")
+
+# Mismatches duros del SYSTEM_PROMPT: (familia del job, familia del candidato).
+# Cualquier otro par, aunque sea de otra familia, lo evalúa el LLM.
+HARD_MISMATCHES = frozenset({
+    (TRACK_PM, TRACK_SE),                   # PM vs Engineer
+    (TRACK_SE, TRACK_PM),                   # Engineer vs Product
+    (TRACK_SE, "marketing"),                # Marketing vs Engineering
+    (TRACK_PM, "sales"),                    # Sales vs Product
+    (FAMILY_FRONTEND, "data_science"),      # Data Scientist vs Frontend
+})
+
+# Palabras clave de nivel → número en la Career Matrix (se evalúan de mayor a menor)
+LEVEL_KEYWORDS = (
+    (6, ("director", "head of", "vp", "vice president", "chief", "cto", "cpo")),
+    (5, ("principal",)),
+    (4, ("lead", "staff", "líder", "lider")),
+    (3, ("senior", "sr")),
+    (1, ("junior", "jr", "associate", "trainee", "intern", "pasante")),
+)
+DEFAULT_LEVEL = 2  # "Product Manager" / "Software Engineer" sin calificador
+
+_EXPLICIT_LEVEL = re.compile(r"\b(PM|SE)\s*([1-6])\b", re.IGNORECASE)
+
+
+def _keyword_pattern(keywords: tuple) -> "re.Pattern":
+    # Palabras completas: "cto" no debe matchear dentro de "director"
+    return re.compile("|".join(rf"(?<!\w){re.escape(keyword)}(?!\w)" for keyword in keywords))
+
+
+_FAMILY_PATTERNS = {family: _keyword_pattern(keywords) for family, keywords in ROLE_FAMILY_KEYWORDS.items()}
+_FRONTEND_PATTERN = _keyword_pattern(FRONTEND_KEYWORDS)
+_LEVEL_PATTERNS = tuple((level, _keyword_pattern(keywords)) for level, keywords in LEVEL_KEYWORDS)
+
+
+def _normalize(text: Any) -> str:
+    return str(text or "").lower().strip()
+
+
+def infer_role_family(title: Any) -> Optional[str]:
+    """
+    Infiere la familia de rol (PM, SE, marketing, sales, data_science, ...) de un título.
+
+    Returns:
+        La familia, o None si no hay ninguna o hay más de una (ambiguo)
+    """
+    normalized = _normalize(title)
+    families = {family for family, pattern in _FAMILY_PATTERNS.items() if pattern.search(normalized)}
+    # "Data Engineer", "Product Designer"... → ambiguo, que decida el LLM
+    return families.pop() if len(families) == 1 else None
+
+
+def infer_level(title: Any, seniority: Any = None) -> int:
+    """
+    Infiere el número de nivel (1–6) de la Career Matrix.
+
+    Usa primero un nivel explícito (ej: "PM3" en seniority/job_level), luego
+    las palabras clave del seniority y del título.
+    """
+    for text in (seniority, title):
+        match = _EXPLICIT_LEVEL.search(str(text or ""))
+        if match:
+            return int(match.group(2))
+
+    for text in (seniority, title):
+        normalized = _normalize(text)
+        for level, pattern in _LEVEL_PATTERNS:
+            if pattern.search(normalized):
+                return level
+
+    return DEFAULT_LEVEL
+
+
+def _job_track(job: Dict[str, Any], job_level: Any) -> Optional[str]:
+    """Track del job: nivel explícito (PMx/SEx) o familia del título"""
+    match = _EXPLICIT_LEVEL.search(str(job_level or ""))
+    if match:
+        return match.group(1).upper()
+
+    family = infer_role_family(job.get("job_title"))
+    return family if family in (TRACK_PM, TRACK_SE) else None
+
+
+def _parse_date(value: Any) -> Optional[date]:
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except (TypeError, ValueError):
+        return None
+
+
+def _stability(experiences: List[Dict[str, Any]]) -> tuple:
+    """Score de estabilidad según la permanencia promedio (regla del SYSTEM_PROMPT)"""
+    tenures = []
+    for exp in experiences:
+        start = _parse_date(exp.get("start_date"))
+        if start is None:
+            continue
+        end = _parse_date(exp.get("end_date")) or date.today()
+        tenures.append(max(0, (end.year - start.year) * 12 + end.month - start.month))
+
+    if not tenures:
+        return 50.0, "Sin fechas de experiencia suficientes; estabilidad neutral (pre-filtro determinístico)."
+
+    average = sum(tenures) / len(tenures)
+    if average >= 24:
+        score = 80.0
+    elif average >= 12:
+        score = 60.0
+    else:
+        score = 30.0
+    return score, f"Permanencia promedio de {average:.1f} meses en {len(tenures)} roles (pre-filtro determinístico)."
+
+
+def _industry(job_industries: List[str], candidate_industry: Any) -> tuple:
+    """Score de industria por coincidencia de texto entre industrias del job y del candidato"""
+    candidate_industries = [str(candidate_industry)] if candidate_industry else []
+
+    if not job_industries or not candidate_industries:
+        score, reason = 40.0, "Información de industria insuficiente para evaluar alineación"
+    elif any(
+        job_industry.lower() in candidate.lower() or candidate.lower() in job_industry.lower()
+        for job_industry in job_industries for candidate in candidate_industries
+    ):
+        score, reason = 70.0, "La industria del candidato coincide con las del job"
+    else:
+        score, reason = 10.0, "Sin alineación entre la industria del candidato y las del job"
+
+    return candidate_industries, score, f"{reason} (pre-filtro determinístico)"
+
+
+def _is_hard_mismatch(job: Dict[str, Any], job_track: str, candidate_family: Optional[str]) -> bool:
+    """True si (job, familia del candidato) es uno de los HARD_MISMATCHES"""
+    if candidate_family is None:
+        return False
+    if (job_track, candidate_family) in HARD_MISMATCHES:
+        return True
+    is_frontend = job_track == TRACK_SE and _FRONTEND_PATTERN.search(_normalize(job.get("job_title")))
+    return bool(is_frontend) and (FAMILY_FRONTEND, candidate_family) in HARD_MISMATCHES
+
+
+def prefilter_match(
+    job: Dict[str, Any],
+    candidate: Dict[str, Any],
+    experiences: List[Dict[str, Any]],
+    job_level: Any = None,
+    job_industries: Optional[List[str]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Evalúa si el par es uno de los mismatches duros de track/rol del SYSTEM_PROMPT.
+
+    Args:
+        job: Fila de jobs
+        candidate: Fila de candidates
+        experiences: Filas de candidate_experience del candidato
+        job_level: Nivel del job (job_level o requirements_json.seniority)
+        job_industries: Industrias del job
+
+    Returns:
+        Dict con la forma de MatchAnalysis si es un mismatch duro, o None si
+        el par debe evaluarse con el LLM
+    """
+    job_track = _job_track(job, job_level)
+    if job_track is None:
+        return None
+
+    candidate_title = candidate.get("current_job_title")
+    candidate_family = infer_role_family(candidate_title)
+    if not _is_hard_mismatch(job, job_track, candidate_family):
+        return None
+
+    # Si alguna vez tuvo un rol del track del job, no es un mismatch obvio
+    if any(infer_role_family(exp.get("role_title")) == job_track for exp in experiences):
+        return None
+
+    job_level_number = infer_level(job.get("job_title"), job_level)
+    if candidate_family in (TRACK_PM, TRACK_SE):
+        candidate_level = f"{candidate_family}{infer_level(candidate_title, candidate.get('seniority'))}"
+    else:
+        candidate_level = f"N/A ({candidate_family})"
+
+    candidate_industries, industry_score, industry_reason = _industry(
+        job_industries or [], candidate.get("industry")
+    )
+    stability_score, stability_reason = _stability(experiences)
+
+    return {
+        "seniority_match": {
+            "job_level": f"{job_track}{job_level_number}",
+            "candidate_level": candidate_level,
+            "score": 0.0,
+            "reason": (
+                f"Tracks distintos: el job es {job_track} y el candidato es {candidate_family}. "
+                "Regla de Career Matrix: score 0 (pre-filtro determinístico)."
+            )
+        },
+        "role_fit": {
+            "job_role": str(job.get("job_title") or ""),
+            "candidate_role": str(candidate_title or ""),
+            "score": 0.0,
+            "reason": (
+                f"Mismatch duro de rol ({candidate_family} vs {job_track}) sin experiencia previa "
+                "en el track del job (pre-filtro determinístico)."
+            )
+        },
+        "industry": {
+            "job_industries": list(job_industries or []),
+            "candidate_industries": candidate_industries,
+            "score": industry_score,
+            "reason": industry_reason
+        },
+        "stability": {
+            "score": stability_score,
+            "reason": stability_reason
+        }
+    }
@@ -0,0 +1,216 @@
+"""
+Prompt del matching: system prompt, mensajes y versión del prompt.
+
+Los mensajes se arman con un prefijo estable por job (system prompt + contexto
+del job) para aprovechar el prompt caching de OpenAI entre candidatos.
+"""
+
+import hashlib
+from typing import List, Dict
+
+
+OPENAI_MODEL = "gpt-4o-2024-08-06"
+OPENAI_TEMPERATURE = 0.3  # Más determinístico para evaluaciones
+
+
+SYSTEM_PROMPT = """You are an expert matching engine for job–candidate fit.
+
+Your task: read a job object and a candidate object (with candidate_experience) and compute a match_score (0–100) plus a detailed JSON breakdown following the exact rules below.
+
+==========================
+MATCHING RULES (STRICT)
+==========================
+
+DIMENSIONS & WEIGHTS:
+1. Seniority Match – 40%
+2. Role Fit – 20%
+3. Industria – 30%
+4. Estabilidad – 10%
+
+-----------------------------------
+1. SENIORITY MATCH (40%) — CRITICAL
+-----------------------------------
+
+Use the Career Matrix for PM and Software Engineering.
+
+CAREER MATRIX:
+
+PRODUCT MANAGEMENT:
+- PM1: Associate / Junior PM — 0–1 años
+- PM2: Product Manager — 1–3 años
+- PM3: Senior PM — 3–6 años
+- PM4: Lead/Staff PM — 6–8 años
+- PM5: Principal PM — 8–10+ años
+- PM6: Director/Head of Product — 10+ años
+
+SOFTWARE ENGINEERING:
+- SE1: Junior Engineer — 0–1 años
+- SE2: Mid-Level Engineer — 1–3 años
+- SE3: Senior Engineer — 3–6 años
+- SE4: Staff Engineer — 6–8 años
+- SE5: Principal Engineer — 8–10+ años
+- SE6: Director/Head of Engineering — 10+ años
+
+SCORING RULES (BASED ON LEVEL DISTANCE):
+- Perfect match (same level): Score = 100%
+- Calculate distance between job_level and candidate_level in the Career Matrix
+- Distance = |job_level_number - candidate_level_number|
+  - Example: PM3 (job) vs PM2 (candidate) = distance of 1
+  - Example: PM3 (job) vs PM5 (candidate) = distance of 2
+  - Example: PM3 (job) vs PM1 (candidate) = distance of 2
+
+SCORE CALCULATION:
+- Distance 0 (perfect match): 100%
+- Distance 1: 60-80% (closer to job level)
+- Distance 2: 30-50% (moderate distance)
+- Distance 3: 10-30% (far from job level)
+- Distance 4+: 0-10% (very far from job level)
+
+CRITICAL RULES:
+- If job and candidate belong to different tracks (PM vs SE): Score = 0
+- Score decreases proportionally as distance increases
+- Closer to job level = higher score, farther = lower score
+- Use decimals for precision (e.g., 75.5, 42.3, 18.7)
+
+You MUST determine the candidate's level from their current_job_title and experience history. Infer from:
+- Job titles (Junior, Mid, Senior, Lead, Principal, Director, Head)
+- Years of experience
+- Company type and progression
+
+-----------------------------------
+2. ROLE FIT (20%) — CRITICAL
+-----------------------------------
+
+Compare job.title vs candidate.current_job_title.
+
+Hard mismatches → score MUST be 0:
+- PM vs Engineer
+- Engineer vs Product
+- Marketing vs Engineering
+- Sales vs Product
+- Data Scientist vs Frontend
+
+Partial matches → 30–60
+Exact/near match → 80–100
+
+If the candidate had the exact role in past experience → +10 points bonus (but don't exceed range).
+
+-----------------------------------
+3. INDUSTRIA (30%)
+-----------------------------------
+
+Score based on:
+- Industry alignment (fintech, mobility, logistics, supply chain)
+- Company relevance (Big Tech, YC companies, unicorns, startups tier A)
+
+Strong industry alignment → high score (70-100)
+Partial alignment → medium score (40-69)
+No alignment → low score (0-39)
+
+Focus on:
+- Direct industry match between job_industries and candidate_industries
+- Company type and relevance (Big Tech, unicorns, tier A startups)
+- Industry experience depth and recency
+
+-----------------------------------
+4. STABILITY (10%)
+-----------------------------------
+
+Analyze employment history:
+- Roles < 1 year without justification → penalize
+- Roles > 2 years → reward
+- Many jumps → low score
+- Consistent tenure → high score
+
+-----------------------------------
+OUTPUT FORMAT
+-----------------------------------
+
+Return structured data with:
+- seniority_match: {job_level, candidate_level, score, reason}
+- role_fit: {job_role, candidate_role, score, reason}
+- industry: {job_industries, candidate_industries, score, reason}
+- stability: {score, reason}
+
+-----------------------------------
+IMPORTANT
+-----------------------------------
+
+- NEVER inflate scores.
+- CRITICAL mismatches must drop dimensions to 0.
+- Be extremely strict with seniority and role fit.
+- Use decimals for precision (e.g., 72.5, 68.3, 85.7).
+- Be precise and varied in your evaluations."""
+
+
+MATCH_INSTRUCTIONS = """Evaluate all dimensions following the Career Matrix rules:
+1. Determine the seniority level for both job and candidate (PM1-PM6 or SE1-SE6)
+   - Calculate distance between levels and assign score based on proximity (perfect match = 100%, farther = lower)
+2. Compare role fit (job title vs candidate current title)
+3. Evaluate industry alignment (job industries vs candidate industries, company relevance)
+4. Analyze stability (employment history)
+
+Provide a structured analysis with scores and detailed reasoning."""
+
+
+def build_job_prefix_messages(job_context: str) -> List[Dict[str, str]]:
+    """
+    Prefijo compartido por todos los candidatos de un job: system prompt y un
+    mensaje con el job y las instrucciones. Es idéntico byte a byte entre
+    requests del mismo job, así el prompt caching de OpenAI lo reutiliza.
+    """
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": f"""Analyze the match between this job and the candidate(s) in the next message.
+
+=== JOB ===
+{job_context}
+
+{MATCH_INSTRUCTIONS}"""
+        }
+    ]
+
+
+def build_match_messages(job_context: str, candidate_context: str) -> List[Dict[str, str]]:
+    """
+    Construye los mensajes que se envían al LLM para un par: el prefijo estable
+    del job (build_job_prefix_messages) y el candidato al final.
+    """
+    return build_job_prefix_messages(job_context) + [
+        {"role": "user", "content": f"=== CANDIDATE ===\n{candidate_context}"}
+    ]
+
+
+def candidate_reference(index: int) -> str:
+    """Referencia corta del candidato en un prompt multi-candidato (C1, C2, ...)"""
+    return f"C{index + 1}"
+
+
+def build_multi_match_messages(job_context: str, candidate_contexts: List[str]) -> List[Dict[str, str]]:
+    """
+    Mensajes para evaluar K candidatos contra un job en una sola llamada: el
+    mismo prefijo estable del job y un último mensaje con los K candidatos,
+    cada uno bajo su referencia (ver candidate_reference).
+    """
+    blocks = "\n\n".join(
+        f"=== CANDIDATE {candidate_reference(index)} ===\n{context}"
+        for index, context in enumerate(candidate_contexts)
+    )
+    references = ", ".join(candidate_reference(index) for index in range(len(candidate_contexts)))
+    return build_job_prefix_messages(job_context) + [
+        {
+            "role": "user",
+            "content": f"""Evaluate each of the following {len(candidate_contexts)} candidates against the job independently.
+Return exactly one analysis per candidate in "matches", with candidate_id set to its reference ({references}).
+
+{blocks}"""
+        }
+    ]
+
+
+def prompt_cache_key(job_context: str) -> str:
+    """Clave de enrutamiento del prompt caching: los requests de un mismo job comparten prefijo"""
+    return "match-job-" + hashlib.sha256(job_context.encode("utf-8")).hexdigest()[:16]
+
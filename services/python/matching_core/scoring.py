@@ -0,0 +1,181 @@
+"""
+Scoring: pre-filtro por reglas, score final ponderado y match_detail.
+
+El modelo (o el pre-filtro) evalúa cada dimensión; el score final se pondera
+acá, en Python, con MATCH_WEIGHTS. PROMPT_VERSION versiona todo lo que se
+envía al modelo (mensajes, esquema de respuesta, modelo y temperatura) y los
+pesos: los matches guardados con otra versión quedan desactualizados (ver
+match_planner.plan_stale_pairs).
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+from .context import get_job_level_and_industries
+from .fingerprint import compute_input_fingerprint
+from .models import MatchAnalysis, MultiMatchAnalysis, response_format_param
+from .prefilter import prefilter_match
+from .prompts import OPENAI_MODEL, OPENAI_TEMPERATURE, build_match_messages, build_multi_match_messages
+
+
+MATCH_SOURCE = "openai-gpt4o"
+RULE_BASED_MATCH_SOURCE = "rule-based-prefilter"
+
+# Pre-filtro determinístico de mismatches obvios (ver prefilter.py)
+PREFILTER_ENABLED = os.getenv("MATCH_PREFILTER_ENABLED", "true").lower() not in ("0", "false", "no")
+
+# Pesos según nueva especificación
+MATCH_WEIGHTS = {
+    "seniority_match": 0.40,
+    "role_fit": 0.20,
+    "industry": 0.30,
+    "stability": 0.10
+}
+
+def _prompt_fingerprint() -> str:
+    """
+    Todo lo que llega al modelo salvo los contextos: los mensajes se renderizan
+    con placeholders, así cualquier cambio de SYSTEM_PROMPT, MATCH_INSTRUCTIONS o
+    de las plantillas de mensajes (par y multi-candidato) cambia la versión.
+    """
+    return json.dumps({
+        "model": OPENAI_MODEL,
+        "temperature": OPENAI_TEMPERATURE,
+        "messages": build_match_messages("{job_context}", "{candidate_context}"),
+        "multi_messages": build_multi_match_messages("{job_context}", ["{candidate_context}", "{candidate_context}"]),
+        "response_formats": [response_format_param(MatchAnalysis), response_format_param(MultiMatchAnalysis)],
+        "weights": MATCH_WEIGHTS
+    }, sort_keys=True, ensure_ascii=False)
+
+
+# Versión del prompt/modelo/pesos: si cambia, todos los matches quedan desactualizados
+PROMPT_VERSION = hashlib.sha256(_prompt_fingerprint().encode("utf-8")).hexdigest()[:16]
+
+
+def run_prefilter(
+    job: Dict[str, Any],
+    candidate: Dict[str, Any],
+    experiences: List[Dict[str, Any]]
+) -> Optional[MatchAnalysis]:
+    """
+    Evalúa el par con el pre-filtro determinístico (sin LLM).
+    
+    Returns:
+        MatchAnalysis calculado por reglas si es un mismatch obvio de track/rol,
+        o None si hay que llamar a OpenAI
+    """
+    if not PREFILTER_ENABLED:
+        return None
+    
+    _, job_seniority, job_industries = get_job_level_and_industries(job)
+    analysis = prefilter_match(job, candidate, experiences, job_seniority, job_industries)
+    return MatchAnalysis.model_validate(analysis) if analysis else None
+
+
+def compute_final_score(match_analysis: MatchAnalysis) -> float:
+    """Calcula el score final ponderado (en Python, no en el LLM), redondeado a 2 decimales"""
+    final_score = (
+        match_analysis.seniority_match.score * MATCH_WEIGHTS["seniority_match"] +
+        match_analysis.role_fit.score * MATCH_WEIGHTS["role_fit"] +
+        match_analysis.industry.score * MATCH_WEIGHTS["industry"] +
+        match_analysis.stability.score * MATCH_WEIGHTS["stability"]
+    )
+    return round(final_score, 2)
+
+
+def build_match_detail(
+    match_analysis: MatchAnalysis,
+    final_score: float,
+    input_fingerprint: Optional[Dict[str, str]] = None,
+    usage: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Construye el JSON completo que se guarda en match_detail.
+    
+    input_fingerprint (ver fingerprint.compute_input_fingerprint) permite al
+    planificador incremental saber si el par quedó desactualizado. usage es el
+    uso de tokens de la llamada (None si vino del cache o del pre-filtro).
+    """
+    return {
+        "seniority_match": {
+            "job_level": match_analysis.seniority_match.job_level,
+            "candidate_level": match_analysis.seniority_match.candidate_level,
+            "score": match_analysis.seniority_match.score,
+            "reason": match_analysis.seniority_match.reason
+        },
+        "role_fit": {
+            "job_role": match_analysis.role_fit.job_role,
+            "candidate_role": match_analysis.role_fit.candidate_role,
+            "score": match_analysis.role_fit.score,
+            "reason": match_analysis.role_fit.reason
+        },
+        "industry": {
+            "job_industries": match_analysis.industry.job_industries,
+            "candidate_industries": match_analysis.industry.candidate_industries,
+            "score": match_analysis.industry.score,
+            "reason": match_analysis.industry.reason
+        },
+        "stability": {
+            "score": match_analysis.stability.score,
+            "reason": match_analysis.stability.reason
+        },
+        "final_score": final_score,
+        "weights": MATCH_WEIGHTS,
+        "input_fingerprint": input_fingerprint,
+        "usage": usage,
+        "calculated_at": datetime.now().isoformat()
+    }
+
+
+def match_result(
+    job_id: str,
+    candidate_id: str,
+    match_analysis: MatchAnalysis,
+    match_source: str = MATCH_SOURCE,
+    input_fingerprint: Optional[Dict[str, str]] = None,
+    usage: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Resultado de un par con la huella de inputs ya calculada (ej: guardada al
+    preparar un batch). Ver build_match_result.
+    """
+    final_score = compute_final_score(match_analysis)
+    return {
+        "status": "success",
+        "job_id": job_id,
+        "candidate_id": candidate_id,
+        "match_score": final_score,
+        "match_detail": build_match_detail(match_analysis, final_score, input_fingerprint, usage),
+        "match_source": match_source
+    }
+
+
+def build_match_result(
+    job: Dict[str, Any],
+    candidate: Dict[str, Any],
+    experiences: List[Dict[str, Any]],
+    match_analysis: MatchAnalysis,
+    match_source: str = MATCH_SOURCE,
+    usage: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Resultado de un par a partir de su análisis: score final, match_detail (con
+    el fingerprint de los inputs) y origen. Es lo que devuelven el flujo
+    individual, el batch y el motor asíncrono, y lo que se persiste.
+    
+    Args:
+        job: Fila de la tabla jobs
+        candidate: Fila de la tabla candidates
+        experiences: Experiencias del candidato
+        match_analysis: Análisis del modelo, del cache o del pre-filtro
+        match_source: Origen del análisis (OpenAI o pre-filtro por reglas)
+        usage: Uso de tokens de la llamada (None si no hubo llamada)
+    
+    Returns:
+        Dict con status, job_id, candidate_id, match_score, match_detail y match_source
+    """
+    input_fingerprint = compute_input_fingerprint(job, candidate, experiences, PROMPT_VERSION)
+    return match_result(job["id"], candidate["id"], match_analysis, match_source, input_fingerprint, usage)
@@ -0,0 +1,229 @@
+"""
+Servidor HTTP concurrente del matching (para self-hosting).
+
+Alternativa a la función serverless de api/ai-match.py: un ThreadingHTTPServer
+que atiende cada request en su propio hilo, con los clientes de OpenAI y
+Supabase (y sus pools de conexiones) compartidos durante toda la vida del proceso.
+
+Rutas:
+    POST /match   {"job_id", "candidate_id"} o {"job_id", "candidate_ids": [...]}
+                  → JSON con el resultado (igual que /api/ai-match)
+    POST /batch   {"job_id", "candidate_ids": [...]}
+                  o {"pairs": [{"job_id", "candidate_id"}, ...]} (o [[job_id, candidate_id], ...])
+                  → NDJSON en streaming (chunked): una línea por match apenas se
+                    calcula y una línea final de resumen
+    GET  /health  → {"ok": true}
+    GET  /metrics → métricas del proceso en formato de texto de Prometheus
+                    (duración por etapa, tokens, costo, reintentos; ver metrics.py)
+
+Líneas de /batch:
+    {"type": "result", "status": "success", "job_id", "candidate_id", "match_score", "match_detail", "match_source"}
+    {"type": "result", "status": "error", "job_id", "candidate_id", "error"}
+    {"type": "stage", "stage", "job_id", "duration_ms", ...}   (progreso por etapa)
+    {"type": "error", "job_id", "error"}       (job no encontrado o falla al guardar)
+    {"type": "summary", "status", "processed", "errors", "duration_ms"}
+
+Uso:
+    python matching_server.py [--host 0.0.0.0] [--port 8080]
+"""
+
+import json
+import os
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+import matching_service as ms
+from match_planner import group_pairs_by_job
+from metrics import PROMETHEUS_CONTENT_TYPE, registry
+
+
+MATCHING_SERVER_HOST = os.getenv("MATCHING_SERVER_HOST", "127.0.0.1")
+MATCHING_SERVER_PORT = int(os.getenv("MATCHING_SERVER_PORT", "8080"))
+
+# Pares máximos por request de /batch
+MATCHING_SERVER_MAX_PAIRS = int(os.getenv("MATCHING_SERVER_MAX_PAIRS", "5000"))
+
+
+def parse_batch_request(data: Dict[str, Any]) -> Dict[str, List[str]]:
+    """
+    Normaliza el body de /batch a {job_id: [candidate_id, ...]} (sin duplicados,
+    preservando el orden).
+
+    Raises:
+        ValueError: Si el body no tiene uno de los formatos aceptados
+    """
+    pairs: List[tuple] = []
+
+    if "pairs" in data:
+        if not isinstance(data["pairs"], list):
+            raise ValueError("pairs debe ser una lista")
+        for pair in data["pairs"]:
+            if isinstance(pair, dict):
+                job_id, candidate_id = pair.get("job_id"), pair.get("candidate_id")
+            elif isinstance(pair, (list, tuple)) and len(pair) == 2:
+                job_id, candidate_id = pair
+            else:
+                raise ValueError(f"Par inválido: {pair}")
+            if not job_id or not candidate_id:
+                raise ValueError(f"Par sin job_id o candidate_id: {pair}")
+            pairs.append((job_id, candidate_id))
+    else:
+        job_id, candidate_ids = data.get("job_id"), data.get("candidate_ids")
+        if not job_id or not isinstance(candidate_ids, list) or not candidate_ids:
+            raise ValueError("job_id y candidate_ids (lista) o pairs son requeridos")
+        pairs = [(job_id, candidate_id) for candidate_id in candidate_ids]
+
+    grouped = group_pairs_by_job(pairs)
+    total = sum(len(candidate_ids) for candidate_ids in grouped.values())
+    if total > MATCHING_SERVER_MAX_PAIRS:
+        raise ValueError(f"Demasiados pares ({total}); máximo {MATCHING_SERVER_MAX_PAIRS} por request")
+    return grouped
+
+
+class MatchingRequestHandler(BaseHTTPRequestHandler):
+    """Handler HTTP/1.1 (keep-alive y chunked encoding para el streaming de /batch)"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        sys.stderr.write(f"[matching-server] {self.address_string()} {format % args}\n")
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error_json(self, status: int, message: str) -> None:
+        self._send_json(status, {"error": message})
+
+    def _read_json(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            raise ValueError("No se recibieron datos")
+        try:
+            return json.loads(self.rfile.read(length).decode("utf-8"))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Error parseando JSON: {e}")
+
+    # ------------------------------------------------------------------
+    # Rutas
+    # ------------------------------------------------------------------
+
+    def do_GET(self) -> None:
+        route = self.path.split("?")[0]
+        if route == "/health":
+            self._send_json(200, {"ok": True})
+        elif route == "/metrics":
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_error_json(404, f"Ruta no encontrada: {self.path}")
+
+    def do_POST(self) -> None:
+        route = self.path.split("?")[0].rstrip("/")
+        if route not in ("/match", "/batch"):
+            self._send_error_json(404, f"Ruta no encontrada: {self.path}")
+            return
+
+        try:
+            data = self._read_json()
+            if not isinstance(data, dict):
+                raise ValueError("El body debe ser un objeto JSON")
+            batch = parse_batch_request(data) if route == "/batch" else None
+        except ValueError as e:
+            self._send_error_json(400, str(e))
+            return
+
+        if route == "/match":
+            self._handle_match(data)
+        else:
+            self._handle_batch(batch)
+
+    def do_OPTIONS(self) -> None:
+        self.send_response(200)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _handle_match(self, data: Dict[str, Any]) -> None:
+        """Un par o un job contra N candidatos, respuesta JSON al terminar"""
+        try:
+            response = ms._handle_worker_request({**data, "type": "match"})
+        except Exception as e:
+            print(f"Error en /match: {e}")
+            self._send_error_json(500, f"Error interno: {e}")
+            return
+
+        if response["ok"]:
+            self._send_json(200, response["result"])
+        else:
+            self._send_error_json(400, response["error"])
+
+    def _handle_batch(self, batch: Dict[str, List[str]]) -> None:
+        """Streaming NDJSON: una línea por match a medida que se completan"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+
+        client_gone = False
+
+        def _emit(line: Dict[str, Any]) -> None:
+            nonlocal client_gone
+            if client_gone:
+                return
+            chunk = (json.dumps(line, ensure_ascii=False) + "\n").encode("utf-8")
+            try:
+                self.wfile.write(f"{len(chunk):X}\r\n".encode("ascii") + chunk + b"\r\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # Los matches se siguen calculando y guardando aunque el cliente se vaya
+                client_gone = True
+                print("   ⚠️  El cliente cerró la conexión; el batch continúa sin streaming")
+
+        summary = ms.match_pairs_streaming(
+            batch,
+            on_result=lambda result: _emit({"type": "result", **result}),
+            on_event=_emit
+        )
+        _emit({"type": "summary", **summary})
+        if not client_gone:
+            try:
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+
+def make_server(host: str = MATCHING_SERVER_HOST, port: int = MATCHING_SERVER_PORT) -> ThreadingHTTPServer:
+    """Crea el servidor (port=0 elige un puerto libre; ver server.server_address)"""
+    server = ThreadingHTTPServer((host, port), MatchingRequestHandler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    host = args[args.index("--host") + 1] if "--host" in args else MATCHING_SERVER_HOST
+    port = int(args[args.index("--port") + 1]) if "--port" in args else MATCHING_SERVER_PORT
+
+    ms.warm_up_clients()
+    server = make_server(host, port)
+    print(f"✅ Matching server escuchando en http://{host}:{server.server_address[1]} (/match, /batch, /health, /metrics)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
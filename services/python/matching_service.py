@@ -2,459 +2,441 @@
 AI Matching Agent Service
 Evalúa la compatibilidad entre una vacante (Job) y un candidato usando OpenAI GPT-4o
 con análisis estructurado en 4 dimensiones ponderadas.
+
+La lógica pura (contextos, prompt, scoring, persistencia) está en matching_core;
+este módulo tiene los clientes, la orquestación (individual, batch, streaming),
+el CLI y el worker.
 """
 
 import os
 import json
 import sys
-from datetime import datetime, date
-from typing import Optional, List, Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Callable, Tuple
 from decimal import Decimal
 from pathlib import Path
 
-# Intentar cargar .env desde varios lugares posibles
-try:
-    from dotenv import load_dotenv
-    # Buscar .env en varios lugares:
-    # 1. En el directorio actual (services/python/.env)
-    # 2. En la raíz del proyecto (.env)
-    # 3. En la raíz del proyecto (.env.local) - usado por Next.js
-    current_dir = Path(__file__).parent
-    project_root = current_dir.parent.parent
-    
-    env_files = [
-        current_dir / ".env",
-        project_root / ".env",
-        project_root / ".env.local",
-        current_dir / ".env.local",
-        project_root / "docs" / ".env"  # También buscar en docs/.env
-    ]
-    
-    loaded = False
-    for env_file in env_files:
-        if env_file.exists():
-            load_dotenv(env_file)
-            print(f"✅ Cargado .env desde: {env_file}")
-            loaded = True
-            break
-    
-    if not loaded:
-        # Intentar cargar desde variables de entorno del sistema
-        load_dotenv()
-        print("ℹ️  No se encontró archivo .env, usando variables de entorno del sistema")
-except ImportError:
-    # Si no hay python-dotenv, solo usar variables de entorno del sistema
-    print("ℹ️  python-dotenv no instalado, usando variables de entorno del sistema")
-
-# Dependencias externas (instalar con pip)
+# Dependencias externas (instalar con pip). openai y supabase (~1s de import
+# entre ambos) se importan recién al construir los clientes, ver http_clients.py
 try:
-    from openai import OpenAI
-    from pydantic import BaseModel, Field
-    from supabase import create_client, Client
+    import pydantic  # noqa: F401  (modelos de matching_core)
 except ImportError as e:
     print(f"❌ Error: Faltan dependencias. Instala con: pip install openai pydantic supabase")
     print(f"   Error específico: {e}")
     sys.exit(1)
 
+# Lógica pura compartida (contextos, prompt, scoring, persistencia): este módulo
+# solo orquesta. Los nombres se re-exportan para quien use ms.<nombre>
+from matching_core import (
+    MATCH_SOURCE,
+    MatchAnalysis,
+    MultiMatchAnalysis,
+    OPENAI_MODEL,
+    OPENAI_TEMPERATURE,
+    PROMPT_VERSION,
+    RULE_BASED_MATCH_SOURCE,
+    SYSTEM_PROMPT,
+    build_candidate_context,
+    build_job_context,
+    build_job_prefix_messages,
+    build_match_detail,
+    build_match_messages,
+    build_match_result,
+    build_match_row,
+    build_multi_match_messages,
+    candidate_reference,
+    compute_final_score,
+    compute_input_fingerprint,
+    match_row,
+    prompt_cache_key,
+    run_prefilter,
+)
+from analysis_cache import CACHE_MODE_MULTI, AnalysisCache, create_analysis_cache, make_cache_key
+from data_loader import MatchingSnapshot, load_snapshot
+from llm_usage import UsageStats, estimate_cost_usd, extract_usage, usage_delta
+from match_writer import MatchWriter, upsert_matches
+from metrics import record_llm_usage, record_pair, registry, span, start_metrics_server, usage_fields
+from llm_backends import LLMBackend, create_llm_backend, llm_backend_name, parsed_or_raise
+from match_planner import group_pairs_by_job, network_candidate_ids, plan_stale_pairs
+from rate_limiter import RateLimitScheduler, estimate_tokens
+from resume_store import ResumeStore, create_resume_store
+
 
 # ============================================================================
 # CONFIGURACIÓN Y VARIABLES DE ENTORNO
 # ============================================================================
 
 # IMPORTANTE: Configura estas variables de entorno antes de ejecutar:
-# - OPENAI_API_KEY: Tu API key de OpenAI
+# - OPENAI_API_KEY: Tu API key de OpenAI (no hace falta con MATCHING_LLM_BACKEND=http-stub o fake)
 # - SUPABASE_URL: URL de tu proyecto Supabase
 # - SUPABASE_SERVICE_ROLE_KEY: Service role key de Supabase (con permisos completos)
+#
+# Importar este módulo no lee el .env, no importa openai/supabase ni crea
+# clientes: todo eso ocurre en el primer uso (_ensure_clients_initialized), así
+# un cold start serverless solo paga lo que realmente usa. Las credenciales y
+# los clientes se exponen como atributos del módulo (ms.supabase,
+# ms.openai_client, ...) que se construyen al accederlos (ver __getattr__) y
+# se pueden reemplazar asignándolos antes del primer uso.
+
+# Buscar .env en varios lugares (se usa el primero que exista):
+# 1. En el directorio actual (services/python/.env)
+# 2. En la raíz del proyecto (.env)
+# 3. En la raíz del proyecto (.env.local) - usado por Next.js
+_CURRENT_DIR = Path(__file__).parent
+_PROJECT_ROOT = _CURRENT_DIR.parent.parent
+ENV_FILES = [
+    _CURRENT_DIR / ".env",
+    _PROJECT_ROOT / ".env",
+    _PROJECT_ROOT / ".env.local",
+    _CURRENT_DIR / ".env.local",
+    _PROJECT_ROOT / "docs" / ".env"  # También buscar en docs/.env
+]
+
+# Atributos del módulo que se resuelven en el primer uso
+_SETTINGS = ("OPENAI_API_KEY", "SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY")
+_CLIENTS = ("openai_client", "supabase", "llm_backend", "analysis_cache", "resume_store")
+
+OPENAI_API_KEY: Optional[str]
+SUPABASE_URL: Optional[str]
+SUPABASE_SERVICE_ROLE_KEY: Optional[str]
+openai_client: Any
+supabase: Any
+# Quién responde las llamadas al modelo (ver llm_backends.py, MATCHING_LLM_BACKEND)
+llm_backend: LLMBackend
+# Cache de análisis del LLM (ver analysis_cache.py, MATCH_CACHE_BACKEND)
+analysis_cache: Optional[AnalysisCache]
+# Contextos de candidato pre-renderizados (ver resume_store.py, RESUME_STORE_BACKEND)
+resume_store: Optional[ResumeStore]
+
+_init_lock = threading.RLock()
+_clients_initialized = False
+
+
+def _load_env() -> None:
+    """Carga el primer .env que exista (o solo las variables del sistema)"""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        # Si no hay python-dotenv, solo usar variables de entorno del sistema
+        print("ℹ️  python-dotenv no instalado, usando variables de entorno del sistema")
+        return
+    
+    for env_file in ENV_FILES:
+        if env_file.exists():
+            load_dotenv(env_file)
+            print(f"✅ Cargado .env desde: {env_file}")
+            return
+    
+    # Intentar cargar desde variables de entorno del sistema
+    load_dotenv()
+    print("ℹ️  No se encontró archivo .env, usando variables de entorno del sistema")
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-
-if not OPENAI_API_KEY:
-    raise ValueError("❌ OPENAI_API_KEY no está configurada. Configúrala en tu .env o variables de entorno")
-if not SUPABASE_URL:
-    raise ValueError("❌ SUPABASE_URL no está configurada")
-if not SUPABASE_SERVICE_ROLE_KEY:
-    raise ValueError("❌ SUPABASE_SERVICE_ROLE_KEY no está configurada")
 
-# Inicializar clientes
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+def _load_settings() -> None:
+    """Lee y valida las credenciales (una sola vez; las ya asignadas se respetan)"""
+    module_globals = globals()
+    if all(name in module_globals for name in _SETTINGS):
+        return
+    
+    with _init_lock:
+        if all(name in module_globals for name in _SETTINGS):
+            return
+        _load_env()
+        settings = {name: module_globals.get(name) or os.getenv(name) for name in _SETTINGS}
+        
+        if not settings["OPENAI_API_KEY"] and llm_backend_name() == "openai":
+            raise ValueError("❌ OPENAI_API_KEY no está configurada. Configúrala en tu .env o variables de entorno")
+        if not settings["SUPABASE_URL"]:
+            raise ValueError("❌ SUPABASE_URL no está configurada")
+        if not settings["SUPABASE_SERVICE_ROLE_KEY"]:
+            raise ValueError("❌ SUPABASE_SERVICE_ROLE_KEY no está configurada")
+        module_globals.update(settings)
 
 
-# ============================================================================
-# MODELOS PYDANTIC (Structured Outputs)
-# ============================================================================
+def _ensure_clients_initialized() -> None:
+    """
+    Inicializa en el primer uso los clientes (pools HTTP con keep-alive y
+    HTTP/2, ver http_clients.py), el cache de análisis y el store de resumes.
+    
+    Thread-safe e idempotente: después de la primera llamada es un chequeo de un
+    flag. Los atributos que ya se asignaron desde afuera (ej: ms.supabase en
+    tests o benchmarks) no se reemplazan.
+    
+    Raises:
+        ValueError: Si falta alguna variable de entorno requerida
+    """
+    global _clients_initialized
+    if _clients_initialized:
+        return
+    
+    with _init_lock:
+        if _clients_initialized:
+            return
+        module_globals = globals()
+        if "openai_client" not in module_globals or "supabase" not in module_globals:
+            _load_settings()
+            from http_clients import create_openai_client, create_supabase_client
+            if "openai_client" not in module_globals:
+                # Con un backend local no se importa openai ni se crea su cliente
+                uses_openai = llm_backend_name() == "openai"
+                module_globals["openai_client"] = create_openai_client(OPENAI_API_KEY) if uses_openai else None
+            if "supabase" not in module_globals:
+                module_globals["supabase"] = create_supabase_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+        if "llm_backend" not in module_globals:
+            module_globals["llm_backend"] = create_llm_backend(openai_client=openai_client)
+        if "analysis_cache" not in module_globals:
+            module_globals["analysis_cache"] = create_analysis_cache(supabase)
+        if "resume_store" not in module_globals:
+            module_globals["resume_store"] = create_resume_store(supabase)
+        _clients_initialized = True
+
+
+def __getattr__(name: str) -> Any:
+    """Resuelve credenciales y clientes en el primer acceso (ms.supabase, ms.OPENAI_API_KEY, ...)"""
+    if name in _SETTINGS:
+        _load_settings()
+        return globals()[name]
+    if name in _CLIENTS:
+        _ensure_clients_initialized()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def warm_up_clients() -> Dict[str, Any]:
+    """Inicializa los clientes y abre las conexiones a OpenAI y Supabase (ver http_clients.warm_up)"""
+    _ensure_clients_initialized()
+    from http_clients import warm_up
+    timings = warm_up(openai_client, supabase)
+    print(f"🔥 Conexiones precalentadas: {timings}")
+    return timings
+
+
+# Tokens (incluidos los cacheados por OpenAI) y latencia acumulados del proceso
+usage_stats = UsageStats()
+
+# Límites de requests/tokens por minuto, reintentos y backoff de las llamadas al
+# modelo, compartido por todos los hilos y el motor asíncrono (ver rate_limiter.py)
+llm_scheduler = RateLimitScheduler()
+
+
+def _scheduler_metrics() -> List[Tuple[str, Dict[str, Any], float]]:
+    """Contadores de llm_scheduler en el export de métricas (ver metrics.py)"""
+    stats = llm_scheduler.stats()
+    return [
+        ("matching_llm_retries_total", {}, stats["retries"]),
+        ("matching_llm_rate_limited_total", {}, stats["rate_limited"]),
+        ("matching_llm_failures_total", {}, stats["failures"]),
+        ("matching_llm_queue_depth", {}, stats["queue_depth"]),
+    ]
 
-class SeniorityMatch(BaseModel):
-    """Evaluación de match de seniority usando Career Matrix"""
-    job_level: str = Field(..., description="Nivel del job en Career Matrix (ej: PM3, SE2)")
-    candidate_level: str = Field(..., description="Nivel del candidato en Career Matrix (ej: PM3, SE2)")
-    score: float = Field(..., ge=0.0, le=100.0, description="Score de 0.0 a 100.0")
-    reason: str = Field(..., description="Razón del score, especialmente si levels no coinciden")
 
+registry.register_collector(_scheduler_metrics)
 
-class RoleFit(BaseModel):
-    """Evaluación de fit del rol"""
-    job_role: str = Field(..., description="Rol requerido en el job")
-    candidate_role: str = Field(..., description="Rol actual del candidato")
-    score: float = Field(..., ge=0.0, le=100.0, description="Score de 0.0 a 100.0")
-    reason: str = Field(..., description="Razón del score, especialmente si hay mismatch")
 
+# ============================================================================
+# PASOS DEL MATCHING (reutilizados por el flujo individual y el batch)
+# ============================================================================
 
-class Industry(BaseModel):
-    """Evaluación de industria"""
-    job_industries: List[str] = Field(..., description="Industrias requeridas por el job")
-    candidate_industries: List[str] = Field(..., description="Industrias donde ha trabajado el candidato")
-    score: float = Field(..., ge=0.0, le=100.0, description="Score de 0.0 a 100.0")
-    reason: str = Field(..., description="Razón del score basada en alineación de industrias")
+# Máximo de llamadas a OpenAI en paralelo dentro de un batch
+MAX_CONCURRENT_MATCHES = int(os.getenv("MATCHING_MAX_CONCURRENCY", "8"))
 
+# Candidatos evaluados por prompt en el batch (1 = un par por llamada)
+CANDIDATES_PER_PROMPT = max(1, int(os.getenv("MATCH_CANDIDATES_PER_PROMPT", "1")))
 
-class Stability(BaseModel):
-    """Evaluación de estabilidad laboral"""
-    score: float = Field(..., ge=0.0, le=100.0, description="Score de 0.0 a 100.0")
-    reason: str = Field(..., description="Razón del score basada en historial de empleo")
 
+def get_candidate_contexts(
+    candidates: Dict[str, Dict[str, Any]],
+    experiences_by_candidate: Dict[str, List[Dict[str, Any]]]
+) -> Dict[str, str]:
+    """
+    Contextos de varios candidatos: los lee ya renderizados del resume store y
+    renderiza (y guarda) solo los que falten o cuya versión cambió.
+    
+    Returns:
+        {candidate_id: contexto}
+    """
+    _ensure_clients_initialized()
+    
+    with span("resume_render", candidates=len(candidates)):
+        if resume_store is None:
+            return {
+                candidate_id: build_candidate_context(candidate, experiences_by_candidate.get(candidate_id, []))
+                for candidate_id, candidate in candidates.items()
+            }
+        return resume_store.get_or_render_many(candidates, experiences_by_candidate, build_candidate_context)
 
-class MatchAnalysis(BaseModel):
-    """Análisis completo de match entre job y candidato"""
-    seniority_match: SeniorityMatch = Field(..., description="Evaluación de match de seniority (40%)")
-    role_fit: RoleFit = Field(..., description="Evaluación de fit del rol (20%)")
-    industry: Industry = Field(..., description="Evaluación de industria (30%)")
-    stability: Stability = Field(..., description="Evaluación de estabilidad laboral (10%)")
 
+def get_candidate_context(candidate: Dict[str, Any], experiences: List[Dict[str, Any]]) -> str:
+    """Contexto de un candidato (ver get_candidate_contexts)"""
+    return get_candidate_contexts({candidate["id"]: candidate}, {candidate["id"]: experiences})[candidate["id"]]
 
-# ============================================================================
-# FUNCIONES AUXILIARES
-# ============================================================================
 
-def calculate_duration_months(start_date: date, end_date: Optional[date]) -> tuple[int, int]:
+def call_structured_output(
+    messages: List[Dict[str, str]],
+    response_format: type,
+    job_context: str
+) -> Tuple[Any, Optional[Dict[str, Any]]]:
     """
-    Calcula la duración entre dos fechas en años y meses.
+    Llamada con Structured Outputs al backend del modelo (ver llm_backends.py) a
+    través de llm_scheduler (límites de rate, reintentos con backoff y lectura
+    de los headers x-ratelimit-*).
     
     Args:
-        start_date: Fecha de inicio
-        end_date: Fecha de fin (None si es trabajo actual)
+        messages: Mensajes del prompt
+        response_format: Modelo Pydantic de la respuesta
+        job_context: Contexto del job (para prompt_cache_key)
     
     Returns:
-        Tuple (años, meses)
+        Tuple (StructuredResponse, usage); la latencia es la del intento exitoso
     """
-    if end_date is None:
-        end_date = date.today()
-    
-    # Calcular diferencia
-    years = end_date.year - start_date.year
-    months = end_date.month - start_date.month
+    _ensure_clients_initialized()
     
-    # Ajustar si el día de fin es anterior al día de inicio
-    if end_date.day < start_date.day:
-        months -= 1
+    latency: Dict[str, float] = {}
     
-    # Ajustar años y meses
-    if months < 0:
-        years -= 1
-        months += 12
-    
-    return years, months
-
-
-def format_duration(years: int, months: int) -> str:
-    """Formatea duración en texto legible"""
-    parts = []
-    if years > 0:
-        parts.append(f"{years} año{'s' if years > 1 else ''}")
-    if months > 0:
-        parts.append(f"{months} mes{'es' if months > 1 else ''}")
-    return ", ".join(parts) if parts else "Menos de 1 mes"
-
-
-def generate_candidate_resume(candidate_experiences: List[Dict[str, Any]]) -> str:
+    with span("llm_call", model=llm_backend.model, schema=response_format.__name__) as current:
+        def _request():
+            current.set(attempts=current.fields.get("attempts", 0) + 1)
+            started = time.perf_counter()
+            response = llm_backend.parse(messages, response_format, prompt_cache_key(job_context))
+            latency["ms"] = (time.perf_counter() - started) * 1000
+            return response
+        
+        response = llm_scheduler.call(_request, estimate_tokens(messages))
+        usage = extract_usage(response.usage, latency["ms"])
+        current.set(**usage_fields(usage))
+    usage_stats.record(usage)
+    record_llm_usage(llm_backend.model, usage)
+    return response, usage
+
+
+def analyze_match_with_usage(
+    job_context: str,
+    candidate_context: str
+) -> Tuple[MatchAnalysis, Optional[Dict[str, Any]]]:
     """
-    Genera un string de texto cronológico (Resume) a partir de las experiencias del candidato.
+    Llama a OpenAI con Structured Outputs y devuelve el análisis por dimensión
+    junto con el uso de tokens de la llamada (ver llm_usage.extract_usage).
+    
+    Si el mismo (PROMPT_VERSION, modelo, job_context, candidate_context) ya fue
+    evaluado, devuelve el análisis guardado en el cache sin llamar a OpenAI
+    (y usage None).
     
     Args:
-        candidate_experiences: Lista de experiencias del candidato
+        job_context: Contexto del job (ver build_job_context)
+        candidate_context: Contexto del candidato (ver build_candidate_context)
     
     Returns:
-        String formateado con el resume cronológico
+        Tuple (MatchAnalysis, usage)
     """
-    if not candidate_experiences:
-        return "Sin experiencia laboral registrada."
+    _ensure_clients_initialized()
     
-    # Función helper para parsear fecha de inicio de forma segura
-    def parse_start_date(exp: Dict[str, Any]) -> date:
-        """Parsea start_date de forma segura, retornando date.today() si es None"""
-        start_date_str = exp.get('start_date')
-        
-        if start_date_str is None:
-            return date.today()  # Fallback si no hay fecha
-        
-        if isinstance(start_date_str, str):
-            try:
-                return datetime.fromisoformat(start_date_str.replace('Z', '+00:00')).date()
-            except:
-                try:
-                    return datetime.strptime(start_date_str.split('T')[0], '%Y-%m-%d').date()
-                except:
-                    return date.today()  # Fallback si el parsing falla
-        elif isinstance(start_date_str, date):
-            return start_date_str
-        else:
-            return date.today()  # Fallback para cualquier otro caso
-    
-    # Ordenar por fecha de inicio (más reciente primero)
-    # Usar una fecha muy antigua como fallback para None, para que aparezcan al final
-    sorted_experiences = sorted(
-        candidate_experiences,
-        key=lambda x: parse_start_date(x),
-        reverse=True
+    cache_key = None
+    if analysis_cache is not None:
+        cache_key = make_cache_key(PROMPT_VERSION, llm_backend.model, job_context, candidate_context)
+        cached = analysis_cache.get(cache_key)
+        if cached is not None:
+            print("   ♻️  Análisis obtenido del cache (sin llamada a OpenAI)")
+            return MatchAnalysis.model_validate_json(cached), None
+    
+    response, usage = call_structured_output(
+        build_match_messages(job_context, candidate_context),
+        MatchAnalysis,
+        job_context
     )
     
-    resume_parts = []
+    # Un refusal no se cachea: la próxima llamada vuelve a intentar
+    match_analysis: MatchAnalysis = parsed_or_raise(response)
     
-    for exp in sorted_experiences:
-        # Parsear fechas
-        start_date_str = exp.get('start_date')
-        end_date_str = exp.get('end_date')
-        
-        # Convertir strings a date objects si es necesario
-        # Asegurar que start_date nunca sea None
-        if start_date_str is None:
-            start_date = date.today()  # Fallback si no hay fecha
-        elif isinstance(start_date_str, str):
-            try:
-                start_date = datetime.fromisoformat(start_date_str.replace('Z', '+00:00')).date()
-            except:
-                try:
-                    start_date = datetime.strptime(start_date_str.split('T')[0], '%Y-%m-%d').date()
-                except:
-                    start_date = date.today()  # Fallback si el parsing falla
-        elif isinstance(start_date_str, date):
-            start_date = start_date_str
-        else:
-            start_date = date.today()  # Fallback para cualquier otro caso
-        
-        # Parsear end_date (puede ser None)
-        end_date = None
-        if end_date_str:
-            if isinstance(end_date_str, str):
-                try:
-                    end_date = datetime.fromisoformat(end_date_str.replace('Z', '+00:00')).date()
-                except:
-                    try:
-                        end_date = datetime.strptime(end_date_str.split('T')[0], '%Y-%m-%d').date()
-                    except:
-                        end_date = None  # Si falla el parsing, dejar como None
-            elif isinstance(end_date_str, date):
-                end_date = end_date_str
-        
-        # Validar que start_date no sea None antes de calcular duración
-        if start_date is None:
-            start_date = date.today()  # Último fallback
-        
-        # Calcular duración
-        years, months = calculate_duration_months(start_date, end_date)
-        duration_str = format_duration(years, months)
-        
-        # Formatear período
-        start_str = start_date.strftime('%b %Y')
-        end_str = "Actualidad" if end_date is None else end_date.strftime('%b %Y')
-        period = f"{start_str} - {end_str} ({duration_str})"
-        
-        # Construir entrada del resume
-        role_title = exp.get('role_title', 'Sin título')
-        company_name = exp.get('company_name', 'Sin empresa')
-        description = exp.get('description', '')
-        
-        entry = f"• {role_title} en {company_name} ({period})"
-        if description:
-            entry += f"\n  {description}"
-        
-        resume_parts.append(entry)
+    if analysis_cache is not None:
+        analysis_cache.set(cache_key, match_analysis.model_dump_json())
     
-    return "\n\n".join(resume_parts)
+    return match_analysis, usage
 
 
-def parse_job_requirements(requirements_json_data: Any) -> Dict[str, Any]:
+def analyze_matches_multi(
+    job_context: str,
+    candidate_contexts: List[str]
+) -> Tuple[Dict[int, MatchAnalysis], Optional[Dict[str, Any]]]:
     """
-    Parsea el JSON de requirements_json y extrae la información relevante.
+    Evalúa K candidatos contra un job en una sola llamada (MultiMatchAnalysis).
+    
+    Los candidatos ya cacheados no se envían. El cache multi-candidato tiene su
+    propia clave (CACHE_MODE_MULTI): un score calculado junto a otros candidatos
+    no se sirve a analyze_match, ni al revés. Solo se devuelven los análisis
+    que volvieron con una referencia válida y sin duplicar; el caller evalúa
+    por separado los que falten.
     
     Args:
-        requirements_json_data: Puede ser un string JSON o un dict ya parseado
+        job_context: Contexto del job
+        candidate_contexts: Contextos de los K candidatos
     
     Returns:
-        Dict con non_negotiables_text, desired_trajectory_text, needs_technical_background
+        Tuple ({índice del candidato: MatchAnalysis}, usage de la llamada o None)
     """
-    if not requirements_json_data:
-        return {
-            "non_negotiables_text": "",
-            "desired_trajectory_text": "",
-            "needs_technical_background": False
-        }
-    
-    # Si ya es un dict, usarlo directamente
-    if isinstance(requirements_json_data, dict):
-        requirements = requirements_json_data
-    # Si es un string, parsearlo
-    elif isinstance(requirements_json_data, str):
-        try:
-            requirements = json.loads(requirements_json_data)
-        except json.JSONDecodeError as e:
-            print(f"⚠️  Error parseando requirements_json: {e}")
-            return {
-                "non_negotiables_text": "",
-                "desired_trajectory_text": "",
-                "needs_technical_background": False
-            }
-    else:
-        print(f"⚠️  requirements_json tiene tipo inesperado: {type(requirements_json_data)}")
-        return {
-            "non_negotiables_text": "",
-            "desired_trajectory_text": "",
-            "needs_technical_background": False
-        }
+    _ensure_clients_initialized()
     
-    return {
-        "non_negotiables_text": requirements.get("non_negotiables_text", ""),
-        "desired_trajectory_text": requirements.get("desired_trajectory_text", ""),
-        "needs_technical_background": requirements.get("needs_technical_background", False),
-        "seniority": requirements.get("seniority", ""),
-        "industries": requirements.get("industries", [])
-    }
+    results: Dict[int, MatchAnalysis] = {}
+    cache_keys: Dict[int, str] = {}
+    
+    if analysis_cache is not None:
+        for index, candidate_context in enumerate(candidate_contexts):
+            cache_keys[index] = make_cache_key(
+                PROMPT_VERSION, llm_backend.model, job_context, candidate_context, CACHE_MODE_MULTI
+            )
+            cached = analysis_cache.get(cache_keys[index])
+            if cached is not None:
+                results[index] = MatchAnalysis.model_validate_json(cached)
+    
+    to_send = [index for index in range(len(candidate_contexts)) if index not in results]
+    if not to_send:
+        return results, None
+    if len(to_send) == 1:
+        results[to_send[0]], usage = analyze_match_with_usage(job_context, candidate_contexts[to_send[0]])
+        return results, usage
+    
+    response, usage = call_structured_output(
+        build_multi_match_messages(job_context, [candidate_contexts[index] for index in to_send]),
+        MultiMatchAnalysis,
+        job_context
+    )
+    
+    parsed: MultiMatchAnalysis = parsed_or_raise(response)
+    
+    by_reference = {candidate_reference(position): index for position, index in enumerate(to_send)}
+    for entry in parsed.matches:
+        index = by_reference.get(entry.candidate_id.strip())
+        if index is None or index in results:
+            continue
+        match_analysis = MatchAnalysis.model_validate(entry.model_dump(exclude={"candidate_id"}))
+        results[index] = match_analysis
+        if analysis_cache is not None:
+            analysis_cache.set(cache_keys[index], match_analysis.model_dump_json())
+    
+    if usage is not None:
+        usage["candidates_in_prompt"] = len(to_send)
+    return results, usage
 
 
-# ============================================================================
-# SYSTEM PROMPT
-# ============================================================================
+def analyze_match(job_context: str, candidate_context: str) -> MatchAnalysis:
+    """Igual que analyze_match_with_usage, sin el uso de tokens"""
+    return analyze_match_with_usage(job_context, candidate_context)[0]
+
 
-SYSTEM_PROMPT = """You are an expert matching engine for job–candidate fit.
-
-Your task: read a job object and a candidate object (with candidate_experience) and compute a match_score (0–100) plus a detailed JSON breakdown following the exact rules below.
-
-==========================
-MATCHING RULES (STRICT)
-==========================
-
-DIMENSIONS & WEIGHTS:
-1. Seniority Match – 40%
-2. Role Fit – 20%
-3. Industria – 30%
-4. Estabilidad – 10%
-
------------------------------------
-1. SENIORITY MATCH (40%) — CRITICAL
------------------------------------
-
-Use the Career Matrix for PM and Software Engineering.
-
-CAREER MATRIX:
-
-PRODUCT MANAGEMENT:
-- PM1: Associate / Junior PM — 0–1 años
-- PM2: Product Manager — 1–3 años
-- PM3: Senior PM — 3–6 años
-- PM4: Lead/Staff PM — 6–8 años
-- PM5: Principal PM — 8–10+ años
-- PM6: Director/Head of Product — 10+ años
-
-SOFTWARE ENGINEERING:
-- SE1: Junior Engineer — 0–1 años
-- SE2: Mid-Level Engineer — 1–3 años
-- SE3: Senior Engineer — 3–6 años
-- SE4: Staff Engineer — 6–8 años
-- SE5: Principal Engineer — 8–10+ años
-- SE6: Director/Head of Engineering — 10+ años
-
-SCORING RULES (BASED ON LEVEL DISTANCE):
-- Perfect match (same level): Score = 100%
-- Calculate distance between job_level and candidate_level in the Career Matrix
-- Distance = |job_level_number - candidate_level_number|
-  - Example: PM3 (job) vs PM2 (candidate) = distance of 1
-  - Example: PM3 (job) vs PM5 (candidate) = distance of 2
-  - Example: PM3 (job) vs PM1 (candidate) = distance of 2
-
-SCORE CALCULATION:
-- Distance 0 (perfect match): 100%
-- Distance 1: 60-80% (closer to job level)
-- Distance 2: 30-50% (moderate distance)
-- Distance 3: 10-30% (far from job level)
-- Distance 4+: 0-10% (very far from job level)
-
-CRITICAL RULES:
-- If job and candidate belong to different tracks (PM vs SE): Score = 0
-- Score decreases proportionally as distance increases
-- Closer to job level = higher score, farther = lower score
-- Use decimals for precision (e.g., 75.5, 42.3, 18.7)
-
-You MUST determine the candidate's level from their current_job_title and experience history. Infer from:
-- Job titles (Junior, Mid, Senior, Lead, Principal, Director, Head)
-- Years of experience
-- Company type and progression
-
------------------------------------
-2. ROLE FIT (20%) — CRITICAL
------------------------------------
-
-Compare job.title vs candidate.current_job_title.
-
-Hard mismatches → score MUST be 0:
-- PM vs Engineer
-- Engineer vs Product
-- Marketing vs Engineering
-- Sales vs Product
-- Data Scientist vs Frontend
-
-Partial matches → 30–60
-Exact/near match → 80–100
-
-If the candidate had the exact role in past experience → +10 points bonus (but don't exceed range).
-
------------------------------------
-3. INDUSTRIA (30%)
------------------------------------
-
-Score based on:
-- Industry alignment (fintech, mobility, logistics, supply chain)
-- Company relevance (Big Tech, YC companies, unicorns, startups tier A)
-
-Strong industry alignment → high score (70-100)
-Partial alignment → medium score (40-69)
-No alignment → low score (0-39)
-
-Focus on:
-- Direct industry match between job_industries and candidate_industries
-- Company type and relevance (Big Tech, unicorns, tier A startups)
-- Industry experience depth and recency
-
------------------------------------
-4. STABILITY (10%)
------------------------------------
-
-Analyze employment history:
-- Roles < 1 year without justification → penalize
-- Roles > 2 years → reward
-- Many jumps → low score
-- Consistent tenure → high score
-
------------------------------------
-OUTPUT FORMAT
------------------------------------
-
-Return structured data with:
-- seniority_match: {job_level, candidate_level, score, reason}
-- role_fit: {job_role, candidate_role, score, reason}
-- industry: {job_industries, candidate_industries, score, reason}
-- stability: {score, reason}
-
------------------------------------
-IMPORTANT
------------------------------------
-
-- NEVER inflate scores.
-- CRITICAL mismatches must drop dimensions to 0.
-- Be extremely strict with seniority and role fit.
-- Use decimals for precision (e.g., 72.5, 68.3, 85.7).
-- Be precise and varied in your evaluations."""
+def save_match(
+    job_id: str,
+    candidate_id: str,
+    final_score: float,
+    match_detail: Dict[str, Any],
+    match_source: str = MATCH_SOURCE
+) -> None:
+    """Guarda un resultado con un único upsert (ver match_writer.py)"""
+    _ensure_clients_initialized()
+    
+    upsert_matches(supabase, [build_match_row(job_id, candidate_id, final_score, match_detail, match_source)])
+    print("   ✅ Match guardado exitosamente")
 
 
 # ============================================================================
@@ -472,149 +454,71 @@ def calculate_and_save_match(job_id: str, candidate_id: str) -> Dict[str, Any]:
     Returns:
         Dict con match_score, match_detail y status
     """
+    _ensure_clients_initialized()
+    
     print(f"\n🔍 [AI MATCHING] Iniciando matching para Job {job_id} ↔ Candidate {candidate_id}")
     
     # ========================================================================
-    # Paso 1: Obtener datos del Job
+    # Paso 1: Obtener job, candidato y experiencias (una query por tabla)
     # ========================================================================
-    print("📋 [AI MATCHING] Obteniendo datos del job...")
-    job_response = supabase.table("jobs").select("*").eq("id", job_id).execute()
+    print("📋 [AI MATCHING] Obteniendo datos del job y del candidato...")
+    snapshot = load_snapshot(supabase, [job_id], [candidate_id])
     
-    if not job_response.data or len(job_response.data) == 0:
+    job = snapshot.jobs.get(job_id)
+    if job is None:
         raise ValueError(f"❌ Job no encontrado: {job_id}")
-    
-    job = job_response.data[0]
     print(f"   ✅ Job encontrado: {job.get('job_title', 'Sin título')}")
     
-    # Parsear requirements_json
-    requirements = parse_job_requirements(job.get('requirements_json', ''))
-    
-    # Obtener seniority level del job (puede estar en job_level o requirements_json.seniority)
-    job_seniority = job.get('job_level') or requirements.get('seniority', '')
-    
-    # Obtener industrias del job (puede estar en requirements_json.industries)
-    job_industries = requirements.get('industries', [])
-    if isinstance(job_industries, str):
-        job_industries = [job_industries] if job_industries else []
-    elif not isinstance(job_industries, list):
-        job_industries = []
-    
     # Construir contexto del job
-    job_context = f"""
-TÍTULO DE LA VACANTE: {job.get('job_title', 'Sin título')}
-NIVEL REQUERIDO (Career Matrix): {job_seniority if job_seniority else 'No especificado - inferir del título y descripción'}
-INDUSTRIAS: {', '.join(job_industries) if job_industries else 'No especificadas'}
-
-DESCRIPCIÓN:
-{job.get('description', 'Sin descripción')}
-
-REQUISITOS NO NEGOCIABLES:
-{requirements.get('non_negotiables_text', 'No especificados')}
-
-TRAYECTORIA DESEADA:
-{requirements.get('desired_trajectory_text', 'No especificada')}
-
-REQUIERE BACKGROUND TÉCNICO: {'Sí' if requirements.get('needs_technical_background') else 'No'}
-"""
+    job_context = build_job_context(job)
     
     # ========================================================================
-    # Paso 2: Obtener datos del Candidato
+    # Paso 2: Datos del Candidato
     # ========================================================================
-    print("👤 [AI MATCHING] Obteniendo datos del candidato...")
-    candidate_response = supabase.table("candidates").select("*").eq("id", candidate_id).execute()
-    
-    if not candidate_response.data or len(candidate_response.data) == 0:
+    candidate = snapshot.candidates.get(candidate_id)
+    if candidate is None:
         raise ValueError(f"❌ Candidato no encontrado: {candidate_id}")
+    print(f"👤 [AI MATCHING] Candidato encontrado: {candidate.get('full_name', 'Sin nombre')}")
     
-    candidate = candidate_response.data[0]
-    print(f"   ✅ Candidato encontrado: {candidate.get('full_name', 'Sin nombre')}")
-    
-    # Obtener experiencias del candidato
-    experiences_response = supabase.table("candidate_experience").select("*").eq("candidate_id", candidate_id).execute()
-    experiences = experiences_response.data if experiences_response.data else []
+    experiences = snapshot.experiences_for(candidate_id)
     print(f"   ✅ Experiencias encontradas: {len(experiences)}")
     
-    # Generar resume del candidato
-    candidate_resume = generate_candidate_resume(experiences)
-    
-    # Obtener seniority del candidato
-    candidate_seniority = candidate.get('seniority', '')
-    
-    # Construir contexto del candidato
-    candidate_context = f"""
-NOMBRE: {candidate.get('full_name', 'Sin nombre')}
-TÍTULO ACTUAL: {candidate.get('current_job_title', 'Sin título')}
-NIVEL (Career Matrix): {candidate_seniority if candidate_seniority else 'No especificado - inferir del título actual y experiencia'}
-INDUSTRIA: {candidate.get('industry', 'No especificada')}
-
-EXPERIENCIA LABORAL (Cronológica):
-{candidate_resume}
-"""
-    
     # ========================================================================
-    # Paso 3: Llamada a OpenAI con Structured Outputs
+    # Paso 3: Pre-filtro determinístico o llamada a OpenAI con Structured Outputs
     # ========================================================================
-    print("🤖 [AI MATCHING] Enviando análisis a OpenAI GPT-4o...")
+    match_source = llm_backend.match_source
+    usage = None
+    match_analysis = run_prefilter(job, candidate, experiences)
     
-    try:
-        response = openai_client.beta.chat.completions.parse(
-            model="gpt-4o-2024-08-06",
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {
-                    "role": "user",
-                    "content": f"""Analyze the match between this job and this candidate:
-
-=== JOB ===
-{job_context}
-
-=== CANDIDATE ===
-{candidate_context}
-
-Evaluate all dimensions following the Career Matrix rules:
-1. Determine the seniority level for both job and candidate (PM1-PM6 or SE1-SE6)
-   - Calculate distance between levels and assign score based on proximity (perfect match = 100%, farther = lower)
-2. Compare role fit (job title vs candidate current title)
-3. Evaluate industry alignment (job industries vs candidate industries, company relevance)
-4. Analyze stability (employment history)
-
-Provide a structured analysis with scores and detailed reasoning."""
-                }
-            ],
-            response_format=MatchAnalysis,
-            temperature=0.3  # Más determinístico para evaluaciones
-        )
+    if match_analysis is not None:
+        match_source = RULE_BASED_MATCH_SOURCE
+        print("⚡ [AI MATCHING] Mismatch obvio de track/rol: análisis por reglas (sin OpenAI)")
+    else:
+        # Construir contexto del candidato
+        candidate_context = get_candidate_context(candidate, experiences)
         
-        match_analysis: MatchAnalysis = response.choices[0].message.parsed
-        print("   ✅ Análisis recibido de OpenAI")
+        print("🤖 [AI MATCHING] Enviando análisis a OpenAI GPT-4o...")
         
-    except Exception as e:
-        print(f"   ❌ Error en llamada a OpenAI: {e}")
-        raise
+        try:
+            match_analysis, usage = analyze_match_with_usage(job_context, candidate_context)
+            print("   ✅ Análisis recibido de OpenAI")
+            if usage is not None:
+                print(f"      Tokens: {usage['prompt_tokens']} de prompt ({usage['cached_tokens']} cacheados), "
+                      f"{usage['completion_tokens']} de respuesta")
+            
+        except Exception as e:
+            print(f"   ❌ Error en llamada a OpenAI: {e}")
+            record_pair(None, "error")
+            raise
     
     # ========================================================================
-    # Paso 4: Calcular Score Final (Ponderado en Python)
+    # Paso 4: Score final (ponderado en Python) y match_detail
     # ========================================================================
     print("📊 [AI MATCHING] Calculando score final ponderado...")
     
-    # Pesos según nueva especificación
-    weights = {
-        "seniority_match": 0.40,
-        "role_fit": 0.20,
-        "industry": 0.30,
-        "stability": 0.10
-    }
-    
-    # Calcular score final ponderado
-    final_score = (
-        match_analysis.seniority_match.score * weights["seniority_match"] +
-        match_analysis.role_fit.score * weights["role_fit"] +
-        match_analysis.industry.score * weights["industry"] +
-        match_analysis.stability.score * weights["stability"]
-    )
-    
-    # Redondear a 2 decimales
-    final_score = round(final_score, 2)
+    with span("score", job_id=job_id, candidate_id=candidate_id):
+        result = build_match_result(job, candidate, experiences, match_analysis, match_source, usage)
+    final_score = result["match_score"]
     
     print(f"   ✅ Score final calculado: {final_score}")
     print(f"      - Seniority Match: {match_analysis.seniority_match.score} (40%)")
@@ -623,85 +527,705 @@ Provide a structured analysis with scores and detailed reasoning."""
     print(f"      - Estabilidad: {match_analysis.stability.score} (10%)")
     
     # ========================================================================
-    # Paso 5: Preparar match_detail (JSON completo)
-    # ========================================================================
-    match_detail = {
-        "seniority_match": {
-            "job_level": match_analysis.seniority_match.job_level,
-            "candidate_level": match_analysis.seniority_match.candidate_level,
-            "score": match_analysis.seniority_match.score,
-            "reason": match_analysis.seniority_match.reason
-        },
-        "role_fit": {
-            "job_role": match_analysis.role_fit.job_role,
-            "candidate_role": match_analysis.role_fit.candidate_role,
-            "score": match_analysis.role_fit.score,
-            "reason": match_analysis.role_fit.reason
-        },
-        "industry": {
-            "job_industries": match_analysis.industry.job_industries,
-            "candidate_industries": match_analysis.industry.candidate_industries,
-            "score": match_analysis.industry.score,
-            "reason": match_analysis.industry.reason
-        },
-        "stability": {
-            "score": match_analysis.stability.score,
-            "reason": match_analysis.stability.reason
-        },
-        "final_score": final_score,
-        "weights": weights,
-        "calculated_at": datetime.now().isoformat()
-    }
-    
-    # ========================================================================
-    # Paso 6: Guardar en job_candidate_matches (UPSERT)
+    # Paso 5: Guardar en job_candidate_matches (UPSERT)
     # ========================================================================
     print("💾 [AI MATCHING] Guardando resultado en base de datos...")
     
     try:
-        # Intentar actualizar primero
-        update_response = supabase.table("job_candidate_matches").update({
-            "match_score": float(final_score),
-            "match_detail": match_detail,
-            "match_source": "openai-gpt4o",
-            "updated_at": datetime.now().isoformat()
-        }).eq("job_id", job_id).eq("candidate_id", candidate_id).execute()
-        
-        # Si no se actualizó ninguna fila, insertar
-        if not update_response.data:
-            insert_response = supabase.table("job_candidate_matches").insert({
-                "job_id": job_id,
-                "candidate_id": candidate_id,
-                "match_score": float(final_score),
-                "match_detail": match_detail,
-                "match_source": "openai-gpt4o",
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }).execute()
-            
-            if insert_response.data:
-                print("   ✅ Match insertado exitosamente")
-            else:
-                raise Exception("No se pudo insertar el match")
-        else:
-            print("   ✅ Match actualizado exitosamente")
-        
+        save_match(job_id, candidate_id, final_score, result["match_detail"], match_source)
     except Exception as e:
         print(f"   ❌ Error guardando en base de datos: {e}")
+        record_pair(None, "error")
         raise
+    record_pair(match_source)
     
     print(f"\n✅ [AI MATCHING] Matching completado exitosamente!")
     print(f"   Score final: {final_score}")
     print(f"   Seniority: {match_analysis.seniority_match.job_level} vs {match_analysis.seniority_match.candidate_level}")
     print(f"   Role Fit: {match_analysis.role_fit.job_role} vs {match_analysis.role_fit.candidate_role}")
     
+    return result
+
+
+def calculate_and_save_matches(
+    job_id: str,
+    candidate_ids: List[str],
+    max_workers: Optional[int] = None,
+    snapshot: Optional[MatchingSnapshot] = None,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    on_event: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Calcula y guarda el match de un job contra N candidatos en una sola llamada.
+    
+    Job, candidatos y experiencias se cargan en bloque (ver data_loader), el
+    contexto del job se construye una sola vez, las llamadas a OpenAI corren en
+    paralelo y los resultados se guardan con upserts en bloque (MatchWriter).
+    
+    Args:
+        job_id: UUID del job
+        candidate_ids: UUIDs de los candidatos
+        max_workers: Llamadas a OpenAI en paralelo (default: MAX_CONCURRENT_MATCHES)
+        snapshot: Datos ya cargados con load_snapshot (opcional; si no se pasa,
+            se cargan aquí con 3 queries)
+        on_result: Callback opcional que recibe cada resultado apenas queda
+            guardado (en el hilo del caller): el dict de results o
+            {"status": "error", "job_id", "candidate_id", "error"}; si falla el
+            upsert de un batch, cada candidato del batch llega como error
+        on_event: Callback opcional de progreso: un evento
+            {"type": "stage", "stage", "job_id", "duration_ms", ...} al terminar
+            cada etapa (load, prefilter, contexts, llm, save)
+    
+    Returns:
+        Dict con status, results (un dict por candidato, igual que
+        calculate_and_save_match) y errors ({candidate_id, error})
+    """
+    _ensure_clients_initialized()
+    
+    # Eliminar duplicados preservando el orden
+    candidate_ids = list(dict.fromkeys(candidate_ids))
+    print(f"\n🔍 [AI MATCHING] Iniciando batch para Job {job_id} ↔ {len(candidate_ids)} candidatos")
+    stage_started = time.perf_counter()
+    
+    def _stage(stage: str, **fields: Any) -> None:
+        """Emite el evento de fin de etapa (con su duración) y arranca la siguiente"""
+        nonlocal stage_started
+        if on_event is not None:
+            duration_ms = round((time.perf_counter() - stage_started) * 1000, 1)
+            on_event({"type": "stage", "stage": stage, "job_id": job_id, "duration_ms": duration_ms, **fields})
+        stage_started = time.perf_counter()
+    
+    # ========================================================================
+    # Paso 1 y 2: Job, candidatos y experiencias en bloque
+    # ========================================================================
+    if snapshot is None:
+        snapshot = load_snapshot(supabase, [job_id], candidate_ids)
+        _stage("load", candidates=len(snapshot.candidates))
+    
+    job = snapshot.jobs.get(job_id)
+    if job is None:
+        raise ValueError(f"❌ Job no encontrado: {job_id}")
+    
+    job_context = build_job_context(job)
+    print(f"   ✅ Job encontrado: {job.get('job_title', 'Sin título')}")
+    
+    candidates = snapshot.candidates
+    experiences_by_candidate = snapshot.experiences_by_candidate
+    found = sum(1 for cid in candidate_ids if cid in candidates)
+    print(f"   ✅ Candidatos encontrados: {found}/{len(candidate_ids)}")
+    
+    errors: List[Dict[str, str]] = []
+    results_by_candidate: Dict[str, Dict[str, Any]] = {}
+    unsaved: Dict[str, Dict[str, Any]] = {}
+    now = datetime.now().isoformat()
+    
+    def _record_error(candidate_id: str, error: str) -> None:
+        errors.append({"candidate_id": candidate_id, "error": error})
+        record_pair(None, "error")
+        if on_result is not None:
+            on_result({"status": "error", "job_id": job_id, "candidate_id": candidate_id, "error": error})
+    
+    def _on_written(rows: List[Dict[str, Any]]) -> None:
+        """Un batch quedó guardado: recién ahora sus resultados cuentan como success"""
+        for row in rows:
+            result = unsaved.pop(row["candidate_id"])
+            results_by_candidate[row["candidate_id"]] = result
+            record_pair(result["match_source"])
+            if on_result is not None:
+                on_result(result)
+    
+    def _on_failed(rows: List[Dict[str, Any]], error: Exception) -> None:
+        """Un batch no se pudo guardar: cada candidato del batch pasa a error"""
+        print(f"   ❌ Error guardando en base de datos: {error}")
+        for row in rows:
+            unsaved.pop(row["candidate_id"], None)
+            _record_error(row["candidate_id"], str(error))
+    
+    writer = MatchWriter(supabase, on_written=_on_written, on_failed=_on_failed)
+    
+    def _record(
+        candidate_id: str,
+        match_analysis: MatchAnalysis,
+        match_source: str,
+        usage: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Score final, match_detail y fila para el upsert de un candidato (se entrega al guardarse)"""
+        with span("score", job_id=job_id, candidate_id=candidate_id):
+            result = build_match_result(
+                job,
+                candidates[candidate_id],
+                experiences_by_candidate.get(candidate_id, []),
+                match_analysis,
+                match_source,
+                usage
+            )
+        unsaved[candidate_id] = result
+        writer.add(match_row(result, now))
+    
+    for candidate_id in candidate_ids:
+        if candidate_id not in candidates:
+            _record_error(candidate_id, f"Candidato no encontrado: {candidate_id}")
+    
+    # ========================================================================
+    # Paso 3: Pre-filtro determinístico y llamadas a OpenAI en paralelo
+    # ========================================================================
+    candidate_contexts: Dict[str, str] = {}
+    
+    def _candidate_context(candidate_id: str) -> str:
+        return candidate_contexts[candidate_id]
+    
+    def _analyze_group(group: List[str]) -> Dict[str, Any]:
+        """
+        Analiza un grupo de candidatos: con más de uno, en un solo prompt
+        multi-candidato; los que falten o fallen se evalúan de a uno.
+        Devuelve {candidate_id: (análisis, usage) o Exception}.
+        """
+        outcomes: Dict[str, Any] = {}
+        if len(group) > 1:
+            try:
+                by_index, usage = analyze_matches_multi(job_context, [_candidate_context(cid) for cid in group])
+                outcomes = {group[index]: (analysis, usage) for index, analysis in by_index.items()}
+            except Exception as e:
+                print(f"   ⚠️  Falló el análisis multi-candidato ({len(group)} candidatos), evaluando de a uno: {e}")
+            missing = len(group) - len(outcomes)
+            if outcomes and missing:
+                print(f"   ⚠️  Faltaron {missing}/{len(group)} candidatos en la respuesta multi-candidato, evaluando de a uno")
+        
+        for candidate_id in group:
+            if candidate_id in outcomes:
+                continue
+            try:
+                outcomes[candidate_id] = analyze_match_with_usage(job_context, _candidate_context(candidate_id))
+            except Exception as e:
+                outcomes[candidate_id] = e
+        return outcomes
+    
+    pending = [cid for cid in candidate_ids if cid in candidates]
+    to_analyze: List[str] = []
+    
+    for candidate_id in pending:
+        prefiltered = run_prefilter(job, candidates[candidate_id], experiences_by_candidate.get(candidate_id, []))
+        if prefiltered is not None:
+            _record(candidate_id, prefiltered, RULE_BASED_MATCH_SOURCE)
+        else:
+            to_analyze.append(candidate_id)
+    
+    _stage("prefilter", rule_based=len(pending) - len(to_analyze))
+    
+    candidate_contexts.update(get_candidate_contexts(
+        {cid: candidates[cid] for cid in to_analyze},
+        experiences_by_candidate
+    ))
+    _stage("contexts", candidates=len(to_analyze))
+    groups = [to_analyze[i:i + CANDIDATES_PER_PROMPT] for i in range(0, len(to_analyze), CANDIDATES_PER_PROMPT)]
+    workers = max(1, min(max_workers or MAX_CONCURRENT_MATCHES, len(groups) or 1))
+    print(f"⚡ [AI MATCHING] {len(pending) - len(to_analyze)} mismatches obvios resueltos por reglas (sin OpenAI)")
+    print(
+        f"🤖 [AI MATCHING] Enviando {len(to_analyze)} análisis a OpenAI en {len(groups)} llamadas "
+        f"({CANDIDATES_PER_PROMPT} por prompt, {workers} en paralelo)..."
+    )
+    
+    def _collect(outcomes: Dict[str, Any]) -> None:
+        for candidate_id, outcome in outcomes.items():
+            if isinstance(outcome, Exception):
+                print(f"   ❌ Error en llamada a OpenAI para {candidate_id}: {outcome}")
+                _record_error(candidate_id, str(outcome))
+            else:
+                _record(candidate_id, outcome[0], llm_backend.match_source, outcome[1])
+    
+    # La primera llamada va sola: deja el prefijo del job (system + job) en el
+    # prompt cache de OpenAI antes del fan-out, así el resto lo lee cacheado
+    if len(groups) > 1 and workers > 1:
+        _collect(_analyze_group(groups.pop(0)))
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in as_completed([executor.submit(_analyze_group, group) for group in groups]):
+            _collect(future.result())
+    _stage("llm", analyzed=len(to_analyze), errors=len(errors))
+    
+    # ========================================================================
+    # Paso 4: Upsert del resto del buffer y resultados en el orden de candidate_ids
+    # ========================================================================
+    if unsaved:
+        print(f"💾 [AI MATCHING] Guardando {len(unsaved)} resultados en base de datos...")
+        writer.flush()
+    results = [results_by_candidate[cid] for cid in pending if cid in results_by_candidate]
+    _stage("save", written=writer.written, failed=writer.failed)
+    
+    print(f"\n✅ [AI MATCHING] Batch completado: {len(results)} matches, {len(errors)} errores")
+    
     return {
+        "status": "success" if not errors else "partial",
+        "job_id": job_id,
+        "processed": len(results),
+        "results": results,
+        "errors": errors
+    }
+
+
+def match_pairs_streaming(
+    pairs_by_job: Dict[str, List[str]],
+    on_result: Callable[[Dict[str, Any]], None],
+    on_event: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Evalúa pares de varios jobs entregando cada resultado apenas queda guardado.
+    
+    Carga un único snapshot para todos los pares y corre
+    calculate_and_save_matches por job, que entrega un success recién cuando
+    su fila se escribió. Si un job falla (no existe, error al cargar o al
+    calcular) se emite {"type": "error", "job_id", "error"} y un resultado con
+    error para cada par de ese job que no quedó guardado. El resumen se arma
+    con el estado final de cada par: processed son los pares guardados y
+    errors los que no.
+    
+    Args:
+        pairs_by_job: {job_id: [candidate_id, ...]} (ver group_pairs_by_job)
+        on_result: Recibe cada resultado (success o error) por candidato
+        on_event: Recibe los eventos de etapa y de error por job (opcional)
+    
+    Returns:
+        Dict con status (success, partial o error), processed, errors y duration_ms
+    """
+    _ensure_clients_initialized()
+    
+    started = time.perf_counter()
+    # Estado final de cada par: "success" solo si su fila está guardada
+    outcomes: Dict[Tuple[str, str], str] = {}
+    for job_id, candidate_ids in pairs_by_job.items():
+        for candidate_id in candidate_ids:
+            outcomes[(job_id, candidate_id)] = "pending"
+    
+    def _deliver(result: Dict[str, Any]) -> None:
+        outcomes[(result["job_id"], result["candidate_id"])] = result["status"]
+        on_result(result)
+    
+    def _emit(event: Dict[str, Any]) -> None:
+        if on_event is not None:
+            on_event(event)
+    
+    def _fail_job(job_id: str, candidate_ids: List[str], error: str) -> None:
+        _emit({"type": "error", "job_id": job_id, "error": error})
+        for candidate_id in dict.fromkeys(candidate_ids):
+            if outcomes[(job_id, candidate_id)] == "pending":
+                _deliver({"status": "error", "job_id": job_id, "candidate_id": candidate_id, "error": error})
+    
+    try:
+        snapshot = load_snapshot(
+            supabase,
+            list(pairs_by_job),
+            [candidate_id for candidate_ids in pairs_by_job.values() for candidate_id in candidate_ids]
+        )
+        _emit({
+            "type": "stage",
+            "stage": "load",
+            "jobs": len(snapshot.jobs),
+            "candidates": len(snapshot.candidates),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+        })
+    except Exception as e:
+        print(f"   ❌ Error cargando datos: {e}")
+        for job_id, candidate_ids in pairs_by_job.items():
+            _fail_job(job_id, candidate_ids, str(e))
+        snapshot = None
+    
+    if snapshot is not None:
+        for job_id, candidate_ids in pairs_by_job.items():
+            try:
+                calculate_and_save_matches(job_id, candidate_ids, snapshot=snapshot, on_result=_deliver, on_event=on_event)
+            except Exception as e:
+                print(f"   ❌ Error en el batch del job {job_id}: {e}")
+                _fail_job(job_id, candidate_ids, str(e))
+            # Un par que terminó sin resultado tampoco quedó guardado
+            missing = [cid for cid in candidate_ids if outcomes[(job_id, cid)] == "pending"]
+            if missing:
+                _fail_job(job_id, missing, f"❌ El match no se guardó para {len(missing)} candidatos")
+    
+    persisted = sum(1 for outcome in outcomes.values() if outcome == "success")
+    failed = len(outcomes) - persisted
+    if not failed:
+        status = "success"
+    elif persisted:
+        status = "partial"
+    else:
+        status = "error"
+    
+    return {
+        "status": status,
+        "processed": persisted,
+        "errors": failed,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
+
+
+def rematch_stale_pairs(
+    job_ids: Optional[List[str]] = None,
+    candidate_ids: Optional[List[str]] = None,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Re-matching incremental: evalúa solo los pares cuyo job, candidato,
+    experiencias o prompt cambiaron desde el último match (ver match_planner).
+    
+    Args:
+        job_ids: Limitar a estos jobs (default: todos los jobs activos)
+        candidate_ids: Limitar a estos candidatos (default: hyperconnector_candidates)
+        dry_run: Solo planificar, sin llamar a OpenAI ni guardar
+    
+    Returns:
+        Dict con el plan (pares por motivo) y, si no es dry_run, los resultados por job
+    """
+    _ensure_clients_initialized()
+    
+    print("\n🧭 [AI MATCHING] Planificando re-matching incremental...")
+    stale_pairs = plan_stale_pairs(supabase, PROMPT_VERSION, job_ids, candidate_ids)
+    
+    reasons: Dict[str, int] = {}
+    for pair in stale_pairs:
+        reasons[pair.reason] = reasons.get(pair.reason, 0) + 1
+    print(f"   ✅ Pares desactualizados: {len(stale_pairs)} {reasons}")
+    
+    summary: Dict[str, Any] = {
+        "status": "success",
+        "stale_pairs": len(stale_pairs),
+        "reasons": reasons,
+        "dry_run": dry_run,
+        "processed": 0,
+        "errors": []
+    }
+    if dry_run:
+        summary["pairs"] = [pair._asdict() for pair in stale_pairs]
+        return summary
+    
+    pairs_by_job = group_pairs_by_job(stale_pairs)
+    # Un solo snapshot para todos los jobs y candidatos del plan
+    snapshot = load_snapshot(supabase, pairs_by_job, [pair.candidate_id for pair in stale_pairs])
+    
+    for job_id, job_candidate_ids in pairs_by_job.items():
+        try:
+            result = calculate_and_save_matches(job_id, job_candidate_ids, snapshot=snapshot)
+            summary["processed"] += result["processed"]
+            summary["errors"].extend({"job_id": job_id, **error} for error in result["errors"])
+        except Exception as e:
+            print(f"   ❌ Error en re-matching del job {job_id}: {e}")
+            summary["errors"].append({"job_id": job_id, "error": str(e)})
+    
+    if summary["errors"]:
+        summary["status"] = "partial"
+    return summary
+
+
+def match_job(
+    job_id: str,
+    hyperconnector_ids: Optional[List[str]] = None,
+    candidate_ids: Optional[List[str]] = None,
+    force: bool = False,
+    dry_run: bool = False,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    on_event: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Evalúa un job contra todos los candidatos de la red de hyperconnectors en
+    una sola llamada (la operación más común: un job nuevo o actualizado).
+    
+    Los candidatos salen de hyperconnector_candidates, se omiten los pares cuyo
+    match está al día (ver match_planner) y el resto pasa por el pipeline batch
+    (snapshot en bloque, pre-filtro, llamadas concurrentes, upserts en bloque).
+    
+    Args:
+        job_id: UUID del job
+        hyperconnector_ids: Limitar a las redes de estos hyperconnectors (opcional)
+        candidate_ids: Usar estos candidatos en lugar de la red (opcional)
+        force: Re-evaluar también los matches que están al día
+        dry_run: Solo planificar, sin llamar a OpenAI ni guardar
+        on_result: Ver calculate_and_save_matches
+        on_event: Ver calculate_and_save_matches
+    
+    Returns:
+        Dict con el plan (network, fresh, to_match, reasons), processed,
+        errors, by_source, duration_ms, throughput (matches/s), usage y
+        cost_usd (estimado según llm_usage.MODEL_PRICING)
+    """
+    _ensure_clients_initialized()
+    
+    started = time.perf_counter()
+    print(f"\n🎯 [AI MATCHING] Matching del job {job_id} contra la red de hyperconnectors...")
+    
+    if candidate_ids is None:
+        candidate_ids = network_candidate_ids(supabase, hyperconnector_ids)
+    candidate_ids = list(dict.fromkeys(candidate_ids))
+    
+    reasons: Dict[str, int] = {}
+    if force:
+        to_match = candidate_ids
+        if to_match:
+            reasons["forced"] = len(to_match)
+    else:
+        stale_pairs = plan_stale_pairs(supabase, PROMPT_VERSION, [job_id], candidate_ids) if candidate_ids else []
+        to_match = [pair.candidate_id for pair in stale_pairs]
+        for pair in stale_pairs:
+            reasons[pair.reason] = reasons.get(pair.reason, 0) + 1
+    print(f"   ✅ Red: {len(candidate_ids)} candidatos, a evaluar: {len(to_match)} {reasons}")
+    
+    summary: Dict[str, Any] = {
         "status": "success",
         "job_id": job_id,
-        "candidate_id": candidate_id,
-        "match_score": final_score,
-        "match_detail": match_detail
+        "network": len(candidate_ids),
+        "fresh": len(candidate_ids) - len(to_match),
+        "to_match": len(to_match),
+        "reasons": reasons,
+        "dry_run": dry_run,
+        "processed": 0,
+        "errors": [],
+        "by_source": {}
     }
+    if dry_run or not to_match:
+        summary["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return summary
+    
+    usage_before = usage_stats.stats()
+    matching_started = time.perf_counter()
+    result = calculate_and_save_matches(job_id, to_match, on_result=on_result, on_event=on_event)
+    matching_seconds = time.perf_counter() - matching_started
+    usage = usage_delta(usage_before, usage_stats.stats())
+    
+    for match in result["results"]:
+        summary["by_source"][match["match_source"]] = summary["by_source"].get(match["match_source"], 0) + 1
+    summary.update({
+        "status": result["status"],
+        "processed": result["processed"],
+        "errors": result["errors"],
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "throughput": round(result["processed"] / matching_seconds, 2) if matching_seconds else None,
+        "usage": usage,
+        "cost_usd": estimate_cost_usd(usage, OPENAI_MODEL)
+    })
+    
+    print(f"\n📊 [AI MATCHING] Job {job_id}: {summary['processed']} matches, {len(summary['errors'])} errores, "
+          f"{summary['throughput']} matches/s, {usage['requests']} llamadas, "
+          f"{usage['prompt_tokens']} tokens de prompt ({usage['cached_tokens']} cacheados), "
+          f"{usage['completion_tokens']} de output, costo ≈ ${summary['cost_usd']}")
+    return summary
+
+
+# ============================================================================
+# MODO WORKER (proceso residente, NDJSON por stdin/stdout)
+# ============================================================================
+
+def _handle_worker_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Ejecuta un request del worker y devuelve el payload de respuesta (sin el id)"""
+    request_type = request.get("type", "match")
+    
+    if request_type == "ping":
+        return {"ok": True, "result": "pong"}
+    
+    if request_type == "metrics":
+        # Formato de texto de Prometheus y los mismos valores como JSON (ver metrics.py)
+        return {"ok": True, "result": {"prometheus": registry.render_prometheus(), **registry.snapshot()}}
+    
+    _ensure_clients_initialized()
+    
+    if request_type == "cache_stats":
+        return {"ok": True, "result": analysis_cache.stats() if analysis_cache else None}
+    
+    if request_type == "match_job":
+        if not request.get("job_id"):
+            return {"ok": False, "error": "job_id es requerido"}
+        return {"ok": True, "result": match_job(
+            request["job_id"],
+            hyperconnector_ids=request.get("hyperconnector_ids"),
+            candidate_ids=request.get("candidate_ids"),
+            force=bool(request.get("force")),
+            dry_run=bool(request.get("dry_run"))
+        )}
+    
+    if request_type == "usage_stats":
+        return {"ok": True, "result": usage_stats.stats()}
+    
+    if request_type == "resume_stats":
+        return {"ok": True, "result": resume_store.stats() if resume_store else None}
+    
+    if request_type == "rate_limit_stats":
+        return {"ok": True, "result": llm_scheduler.stats()}
+    
+    if request_type != "match":
+        return {"ok": False, "error": f"Tipo de request desconocido: {request_type}"}
+    
+    job_id = request.get("job_id")
+    candidate_id = request.get("candidate_id")
+    candidate_ids = request.get("candidate_ids")
+    
+    if not job_id or not (candidate_id or candidate_ids):
+        return {"ok": False, "error": "job_id y candidate_id (o candidate_ids) son requeridos"}
+    
+    if candidate_ids:
+        result = calculate_and_save_matches(job_id, candidate_ids)
+    else:
+        result = calculate_and_save_match(job_id, candidate_id)
+    return {"ok": True, "result": result}
+
+
+def run_worker(input_stream=None, output_stream=None, max_workers: Optional[int] = None) -> None:
+    """
+    Worker residente: mantiene los clientes de OpenAI/Supabase calientes y procesa
+    muchos matches durante su vida, sin pagar el arranque del intérprete por par.
+    
+    Protocolo (una línea JSON por mensaje):
+      Request:  {"id": "1", "job_id": "...", "candidate_id": "..."}
+                {"id": "2", "job_id": "...", "candidate_ids": ["...", "..."]}
+                {"id": "3", "type": "ping"}
+                {"id": "4", "type": "cache_stats"}
+                {"id": "5", "type": "usage_stats"}
+                {"id": "6", "type": "resume_stats"}
+                {"id": "7", "type": "rate_limit_stats"}
+                {"id": "8", "type": "match_job", "job_id": "...", "hyperconnector_ids": [...], "force": false}
+                {"id": "9", "type": "metrics"}
+      Response: {"id": "1", "ok": true, "result": {...}}
+                {"id": "1", "ok": false, "error": "..."}
+    
+    Al arrancar abre las conexiones a OpenAI y Supabase y emite {"type": "ready"}.
+    Con MATCHING_METRICS_PORT también sirve GET /metrics (Prometheus) por HTTP.
+    Los requests se procesan en paralelo, por lo que las respuestas pueden llegar
+    en otro orden (usar "id" para correlacionar).
+    Los logs de matching se redirigen a stderr. Termina al cerrar stdin.
+    
+    Args:
+        input_stream: Stream de entrada (default: sys.stdin)
+        output_stream: Stream de salida del protocolo (default: sys.stdout)
+        max_workers: Requests en paralelo (default: MAX_CONCURRENT_MATCHES)
+    """
+    input_stream = input_stream or sys.stdin
+    protocol_out = output_stream or sys.stdout
+    write_lock = threading.Lock()
+    
+    def _write(message: Dict[str, Any]) -> None:
+        line = json.dumps(message, ensure_ascii=False)
+        with write_lock:
+            protocol_out.write(line + "\n")
+            protocol_out.flush()
+    
+    def _process(request_id: Any, request: Dict[str, Any]) -> None:
+        try:
+            response = _handle_worker_request(request)
+        except Exception as e:
+            response = {"ok": False, "error": str(e)}
+        _write({"id": request_id, **response})
+    
+    # Todo lo que se imprima con print() va a stderr; stdout queda solo para el protocolo
+    original_stdout = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        # El primer request no paga los handshakes TLS
+        warm_up_clients()
+        if os.getenv("MATCHING_METRICS_PORT"):
+            metrics_server = start_metrics_server(int(os.getenv("MATCHING_METRICS_PORT")))
+            print(f"📈 Métricas en http://0.0.0.0:{metrics_server.server_address[1]}/metrics")
+        _write({"type": "ready", "pid": os.getpid()})
+        
+        with ThreadPoolExecutor(max_workers=max_workers or MAX_CONCURRENT_MATCHES) as executor:
+            for raw_line in input_stream:
+                raw_line = raw_line.strip()
+                if not raw_line:
+                    continue
+                
+                try:
+                    request = json.loads(raw_line)
+                except json.JSONDecodeError as e:
+                    _write({"id": None, "ok": False, "error": f"Error parseando JSON: {e}"})
+                    continue
+                
+                if not isinstance(request, dict):
+                    _write({"id": None, "ok": False, "error": "El request debe ser un objeto JSON"})
+                    continue
+                
+                executor.submit(_process, request.get("id"), request)
+    finally:
+        sys.stdout = original_stdout
+
+
+def parse_pair_lines(lines) -> List[Tuple[str, str]]:
+    """
+    Lee pares (job_id, candidate_id) desde líneas de texto (ej: stdin).
+    
+    Formatos aceptados por línea:
+      {"job_id": "...", "candidate_id": "..."}
+      {"job_id": "...", "candidate_ids": ["...", "..."]}
+      <job_id> <candidate_id>   (separados por espacio, tab o coma)
+    
+    Raises:
+        ValueError: Si una línea no tiene uno de los formatos aceptados
+    """
+    pairs = []
+    for line_number, raw_line in enumerate(lines, start=1):
+        raw_line = raw_line.strip()
+        if not raw_line:
+            continue
+        
+        if raw_line.startswith("{"):
+            try:
+                data = json.loads(raw_line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"❌ Línea {line_number}: error parseando JSON: {e}")
+            job_id = data.get("job_id")
+            candidate_ids = data.get("candidate_ids") or [data.get("candidate_id")]
+        else:
+            parts = raw_line.replace(",", " ").split()
+            job_id, candidate_ids = (parts[0], parts[1:]) if len(parts) == 2 else (None, [])
+        
+        if not job_id or not candidate_ids or not all(candidate_ids):
+            raise ValueError(f"❌ Línea {line_number}: se esperaba un par job_id/candidate_id: {raw_line}")
+        pairs.extend((job_id, candidate_id) for candidate_id in candidate_ids)
+    return pairs
+
+
+def run_ndjson(pairs_by_job: Dict[str, List[str]], output_stream=None) -> Dict[str, Any]:
+    """
+    Modo CLI con progreso en streaming: un evento NDJSON por línea en stdout.
+    
+    Eventos (en orden):
+      {"type": "start", "jobs", "pairs"}
+      {"type": "stage", "stage", "job_id", "duration_ms", ...}   (load, prefilter, contexts, llm, save)
+      {"type": "result", "status": "success", "job_id", "candidate_id", "match_score", "match_detail", "match_source"}
+      {"type": "result", "status": "error", "job_id", "candidate_id", "error"}
+      {"type": "error", "job_id", "error"}
+      {"type": "summary", "status", "processed", "errors", "duration_ms"}
+    
+    Los logs legibles (print) se redirigen a stderr, así stdout queda solo para
+    los eventos y el consumidor no necesita buscar el JSON entre los logs.
+    
+    Args:
+        pairs_by_job: {job_id: [candidate_id, ...]} (ver group_pairs_by_job)
+        output_stream: Stream de salida de los eventos (default: sys.stdout)
+    
+    Returns:
+        El evento summary
+    """
+    events_out = output_stream or sys.stdout
+    write_lock = threading.Lock()
+    
+    def _write(event: Dict[str, Any]) -> None:
+        line = json.dumps(event, ensure_ascii=False)
+        with write_lock:
+            events_out.write(line + "\n")
+            events_out.flush()
+    
+    original_stdout = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        _write({
+            "type": "start",
+            "jobs": len(pairs_by_job),
+            "pairs": sum(len(candidate_ids) for candidate_ids in pairs_by_job.values())
+        })
+        summary = {"type": "summary", **match_pairs_streaming(
+            pairs_by_job,
+            on_result=lambda result: _write({"type": "result", **result}),
+            on_event=_write
+        )}
+        _write(summary)
+    finally:
+        sys.stdout = original_stdout
+    return summary
 
 
 # ============================================================================
@@ -712,18 +1236,54 @@ if __name__ == "__main__":
     """
     Ejemplo de uso:
     
-    python matching_service.py <job_id> <candidate_id>
+    python matching_service.py <job_id> <candidate_id> [<candidate_id> ...]
+    python matching_service.py --worker
+    python matching_service.py --ndjson <job_id> <candidate_id> [<candidate_id> ...]
+    python matching_service.py --ndjson --stdin < pares.txt
+    python matching_service.py --stale [--dry-run]
+    python matching_service.py --job <job_id> [--hyperconnector <id> ...] [--force] [--dry-run]
     
     O configurar directamente en el código:
     """
     import sys
     
-    if len(sys.argv) >= 3:
+    if len(sys.argv) >= 2 and sys.argv[1] == "--worker":
+        run_worker()
+    elif len(sys.argv) >= 2 and sys.argv[1] == "--ndjson":
+        try:
+            if "--stdin" in sys.argv[2:]:
+                pairs = parse_pair_lines(sys.stdin)
+            else:
+                pairs = [(sys.argv[2], candidate_id) for candidate_id in sys.argv[3:]] if len(sys.argv) >= 4 else []
+            if not pairs:
+                raise ValueError("❌ No se recibieron pares job_id/candidate_id")
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            sys.exit(2)
+        summary = run_ndjson(group_pairs_by_job(pairs))
+        sys.exit(0 if summary["processed"] or not summary["errors"] else 1)
+    elif len(sys.argv) >= 3 and sys.argv[1] == "--job":
+        options = sys.argv[3:]
+        hyperconnector_ids = [options[i + 1] for i, option in enumerate(options[:-1]) if option == "--hyperconnector"]
+        result = match_job(
+            sys.argv[2],
+            hyperconnector_ids=hyperconnector_ids or None,
+            force="--force" in options,
+            dry_run="--dry-run" in options
+        )
+        print(json.dumps(result, ensure_ascii=False))
+    elif len(sys.argv) >= 2 and sys.argv[1] == "--stale":
+        result = rematch_stale_pairs(dry_run="--dry-run" in sys.argv[2:])
+        print(json.dumps(result, ensure_ascii=False))
+    elif len(sys.argv) >= 3:
         job_id = sys.argv[1]
-        candidate_id = sys.argv[2]
+        candidate_ids = sys.argv[2:]
         
         try:
-            result = calculate_and_save_match(job_id, candidate_id)
+            if len(candidate_ids) == 1:
+                result = calculate_and_save_match(job_id, candidate_ids[0])
+            else:
+                result = calculate_and_save_matches(job_id, candidate_ids)
             # Imprimir JSON en una sola línea al final para facilitar el parsing
             # Usar un marcador especial para identificar el JSON
             print("\n" + "="*60)
@@ -737,13 +1297,35 @@ if __name__ == "__main__":
             sys.exit(1)
     else:
         print("""
-Uso: python matching_service.py <job_id> <candidate_id>
+Uso: python matching_service.py <job_id> <candidate_id> [<candidate_id> ...]
+     python matching_service.py --worker
+     python matching_service.py --ndjson <job_id> <candidate_id> [<candidate_id> ...]
+     python matching_service.py --ndjson --stdin < pares.txt
+     python matching_service.py --stale [--dry-run]
+     python matching_service.py --job <job_id> [--hyperconnector <id> ...] [--force] [--dry-run]
 
 Ejemplo:
   python matching_service.py 123e4567-e89b-12d3-a456-426614174000 987fcdeb-51a2-43d7-8f9e-123456789abc
 
+Con varios candidatos se usa el modo batch (un solo fetch del job, queries in_(),
+llamadas a OpenAI en paralelo y un único upsert).
+
+Con --worker el proceso queda residente y recibe requests NDJSON por stdin
+(ver run_worker).
+
+Con --ndjson stdout emite un evento JSON por línea (start, stage, result por
+match apenas se calcula, summary) y los logs van a stderr. Con --stdin los pares
+se leen de stdin, uno por línea ("<job_id> <candidate_id>" o JSON).
+
+Con --stale solo se re-evalúan los pares cuyo job, candidato, experiencias o
+prompt cambiaron desde el último match (--dry-run muestra el plan sin ejecutarlo).
+
+Con --job se evalúa el job contra toda la red de hyperconnector_candidates (o
+las redes de --hyperconnector), omitiendo los matches al día salvo con --force,
+y se reporta throughput, tokens, costo estimado y errores.
+
 O importa la función en tu código:
-  from matching_service import calculate_and_save_match
+  from matching_service import calculate_and_save_match, calculate_and_save_matches
   result = calculate_and_save_match(job_id, candidate_id)
+  batch = calculate_and_save_matches(job_id, [candidate_id_1, candidate_id_2])
         """)
-
@@ -0,0 +1,361 @@
+"""
+Métricas del matching: spans por etapa, contadores y export.
+
+Cada etapa del pipeline corre dentro de un span (ver STAGES) que registra su
+duración en un histograma del proceso y, si MATCHING_METRICS_LOG está
+configurado, emite una línea JSON por span con sus campos (filas, tokens,
+intentos, ...). Los contadores de tokens, costo y pares evaluados se acumulan
+en el mismo registry, que se exporta en el formato de texto de Prometheus:
+
+- matching_server.py: GET /metrics
+- worker (matching_service.py --worker): request {"type": "metrics"} y, con
+  MATCHING_METRICS_PORT, un endpoint HTTP /metrics en un hilo aparte
+
+Uso:
+    with span("job_fetch") as current:
+        rows = ...
+        current.set(rows=len(rows))
+    print(registry.render_prometheus())
+
+Variables de entorno:
+    - MATCHING_METRICS_LOG: "" (default, sin logs) | stderr | ruta de un archivo (JSON lines)
+    - MATCHING_METRICS_PORT: puerto del endpoint /metrics del worker (sin definir = no se abre)
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from llm_usage import estimate_cost_usd
+
+
+# Etapas instrumentadas, en el orden del pipeline
+STAGES = (
+    "job_fetch",
+    "candidate_fetch",
+    "experience_fetch",
+    "resume_render",
+    "llm_call",
+    "score",
+    "db_write",
+)
+
+# Buckets (segundos) de los histogramas de duración: de 1 ms (render, score) a 1 min (OpenAI con reintentos)
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Tipo y descripción de cada métrica (# TYPE / # HELP del export)
+METRICS: Dict[str, Tuple[str, str]] = {
+    "matching_stage_duration_seconds": ("histogram", "Duración de cada etapa del pipeline de matching"),
+    "matching_pairs_total": ("counter", "Pares job-candidato evaluados, por origen del análisis y estado"),
+    "matching_llm_requests_total": ("counter", "Llamadas al modelo con respuesta, por modelo"),
+    "matching_llm_tokens_total": ("counter", "Tokens de las llamadas al modelo (prompt, cached, completion)"),
+    "matching_llm_cost_usd_total": ("counter", "Costo estimado de las llamadas al modelo (USD, ver llm_usage.MODEL_PRICING)"),
+    "matching_llm_retries_total": ("counter", "Reintentos de llamadas al modelo (rate_limiter)"),
+    "matching_llm_rate_limited_total": ("counter", "Respuestas 429 del modelo (rate_limiter)"),
+    "matching_llm_failures_total": ("counter", "Llamadas al modelo que fallaron después de los reintentos"),
+    "matching_llm_queue_depth": ("gauge", "Llamadas esperando capacidad en el scheduler"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Histogram:
+    """Buckets acumulativos, suma y cantidad de observaciones (sin lock: lo toma el registry)"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """[(le, observaciones <= le), ...] terminando en +Inf"""
+        total, result = 0, []
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((bound, total))
+        result.append((float("inf"), self.count))
+        return result
+
+
+class MetricsRegistry:
+    """
+    Contadores, gauges e histogramas del proceso, thread-safe.
+
+    Los collectors son funciones que se llaman en cada export y devuelven
+    muestras [(nombre, labels, valor)] de estado que ya vive en otro objeto
+    (ej: los contadores de rate_limiter.RateLimitScheduler).
+    """
+
+    def __init__(self):
+        self._values: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._collectors: List[Callable[[], List[Tuple[str, Dict[str, Any], float]]]] = []
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        """Suma `value` al contador `name` con esos labels"""
+        key = (name, _labels(labels))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels: Any) -> None:
+        """Fija el valor de un gauge"""
+        with self._lock:
+            self._values[(name, _labels(labels))] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Agrega una observación al histograma `name`"""
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def register_collector(self, collector: Callable[[], List[Tuple[str, Dict[str, Any], float]]]) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def reset(self) -> None:
+        """Borra contadores e histogramas (los collectors quedan registrados)"""
+        with self._lock:
+            self._values.clear()
+            self._histograms.clear()
+
+    def _collected(self) -> Dict[Tuple[str, Labels], float]:
+        samples: Dict[Tuple[str, Labels], float] = {}
+        for collector in list(self._collectors):
+            for name, labels, value in collector():
+                samples[(name, _labels(labels))] = value
+        return samples
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Valores actuales como dict (para el worker y los logs).
+
+        Returns:
+            {"counters": {nombre: [{labels, value}]}, "histograms": {nombre: [{labels, count, sum}]}}
+        """
+        collected = self._collected()
+        with self._lock:
+            values = {**self._values, **collected}
+            histograms = {key: (h.count, h.sum) for key, h in self._histograms.items()}
+
+        counters: Dict[str, List[Dict[str, Any]]] = {}
+        for (name, labels), value in sorted(values.items()):
+            counters.setdefault(name, []).append({"labels": dict(labels), "value": value})
+        summaries: Dict[str, List[Dict[str, Any]]] = {}
+        for (name, labels), (count, total) in sorted(histograms.items()):
+            summaries.setdefault(name, []).append({"labels": dict(labels), "count": count, "sum": round(total, 6)})
+        return {"counters": counters, "histograms": summaries}
+
+    def render_prometheus(self) -> str:
+        """Export en el formato de texto de Prometheus (0.0.4)"""
+        collected = self._collected()
+        with self._lock:
+            values = {**self._values, **collected}
+            histograms = {key: (h.cumulative(), h.sum, h.count) for key, h in self._histograms.items()}
+
+        families: Dict[str, List[str]] = {}
+        for (name, labels), value in sorted(values.items()):
+            families.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), (buckets, total, count) in sorted(histograms.items()):
+            lines = families.setdefault(name, [])
+            for bound, cumulative in buckets:
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(round(total, 6))}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        output: List[str] = []
+        for name in sorted(families):
+            metric_type, description = METRICS.get(name, ("untyped", name))
+            output.append(f"# HELP {name} {description}")
+            output.append(f"# TYPE {name} {metric_type}")
+            output.extend(families[name])
+        return "\n".join(output) + "\n"
+
+
+# Registry del proceso (lo comparten los hilos del batch, el motor asíncrono y los endpoints)
+registry = MetricsRegistry()
+
+
+# ============================================================================
+# LOGS ESTRUCTURADOS (JSON lines)
+# ============================================================================
+
+_log_lock = threading.Lock()
+_log_stream: Any = None
+_log_target: Optional[str] = None
+
+
+def _stream() -> Any:
+    """
+    Destino de los logs según MATCHING_METRICS_LOG (se resuelve en el primer uso
+    y cuando cambia la variable). Se llama con _log_lock tomado: el chequeo, el
+    cierre del destino anterior y la escritura van bajo el mismo lock, así otro
+    hilo no escribe en un archivo ya cerrado.
+    """
+    global _log_stream, _log_target
+    target = os.getenv("MATCHING_METRICS_LOG", "").strip()
+    if target != _log_target:
+        if _log_stream is not None and _log_stream not in (sys.stderr, sys.__stderr__):
+            _log_stream.close()
+        if target.lower() in ("", "none", "off", "false"):
+            _log_stream = None
+        elif target.lower() == "stderr":
+            _log_stream = sys.stderr
+        else:
+            _log_stream = open(target, "a", encoding="utf-8", buffering=1)
+        _log_target = target
+    return _log_stream
+
+
+def log_event(event: str, **fields: Any) -> None:
+    """Emite una línea JSON {"ts", "event", ...} si MATCHING_METRICS_LOG está configurado"""
+    with _log_lock:
+        stream = _stream()
+        if stream is None:
+            return
+        stream.write(json.dumps(
+            {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), "event": event, **fields},
+            ensure_ascii=False,
+            default=str
+        ) + "\n")
+
+
+# ============================================================================
+# SPANS Y CONTADORES DEL PIPELINE
+# ============================================================================
+
+class Span:
+    """Span en curso: set() agrega campos al log (filas, tokens, intentos, ...)"""
+
+    __slots__ = ("stage", "fields")
+
+    def __init__(self, stage: str, fields: Dict[str, Any]):
+        self.stage = stage
+        self.fields = fields
+
+    def set(self, **fields: Any) -> None:
+        self.fields.update(fields)
+
+
+@contextmanager
+def span(stage: str, **fields: Any) -> Iterator[Span]:
+    """
+    Mide una etapa: observa la duración en matching_stage_duration_seconds
+    {stage, status} y emite el evento "span" (con status "error" y el tipo de
+    excepción si el bloque falla; la excepción se propaga).
+
+    Args:
+        stage: Nombre de la etapa (ver STAGES)
+        fields: Campos extra del log (ej: job_id)
+    """
+    current = Span(stage, fields)
+    status = "ok"
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        status = "error"
+        current.set(error=type(e).__name__)
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        registry.observe("matching_stage_duration_seconds", duration, stage=stage, status=status)
+        log_event("span", stage=stage, status=status, duration_ms=round(duration * 1000, 3), **current.fields)
+
+
+def record_llm_usage(model: str, usage: Optional[Dict[str, Any]]) -> None:
+    """Suma una llamada con respuesta: tokens (ver llm_usage.extract_usage) y costo estimado"""
+    registry.inc("matching_llm_requests_total", model=model)
+    if usage is None:
+        return
+    registry.inc("matching_llm_tokens_total", usage["prompt_tokens"], model=model, kind="prompt")
+    registry.inc("matching_llm_tokens_total", usage["cached_tokens"], model=model, kind="cached")
+    registry.inc("matching_llm_tokens_total", usage["completion_tokens"], model=model, kind="completion")
+    cost = estimate_cost_usd(usage, model)
+    if cost is not None:
+        registry.inc("matching_llm_cost_usd_total", cost, model=model)
+
+
+def record_pair(match_source: Optional[str], status: str = "success") -> None:
+    """Cuenta un par evaluado (match_source None para los errores)"""
+    registry.inc("matching_pairs_total", source=match_source or "none", status=status)
+
+
+def usage_fields(usage: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Campos de tokens para el log de un span llm_call"""
+    if usage is None:
+        return {}
+    return {name: usage[name] for name in ("prompt_tokens", "cached_tokens", "completion_tokens")}
+
+
+# ============================================================================
+# ENDPOINT HTTP (worker)
+# ============================================================================
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> Any:
+    """
+    Sirve GET /metrics en un hilo daemon (port=0 elige un puerto libre; ver
+    server.server_address). Para procesos sin servidor HTTP propio (el worker).
+    """
+    # Import diferido: http.server no hace falta salvo que se abra el endpoint
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
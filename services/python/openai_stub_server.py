@@ -0,0 +1,392 @@
+"""
+Servidor local que imita los endpoints de chat completions, archivos y batches de OpenAI.
+
+Permite probar batch_mode.py de punta a punta sin costo ni API key: guarda los
+archivos en memoria, avanza cada batch validating → in_progress → completed a
+medida que se consulta, y genera para cada línea una respuesta de chat
+completion que cumple el json_schema del request (valores determinísticos
+derivados del custom_id).
+
+/v1/chat/completions responde en línea (backend http-stub de llm_backends.py,
+o el SDK con OPENAI_BASE_URL) con latencia y errores inyectados: cada request
+espera --latency-ms ± --jitter-ms y con probabilidad --error-rate responde
+--error-status (con retry-after-ms) en lugar del análisis, para medir
+throughput, colas y reintentos sin depender de OpenAI.
+
+Endpoints:
+    POST /v1/chat/completions
+    POST /v1/files                 (multipart, purpose=batch)
+    GET  /v1/files/{id}
+    GET  /v1/files/{id}/content
+    POST /v1/batches
+    GET  /v1/batches/{id}
+    POST /v1/batches/{id}/cancel
+
+Uso:
+    python openai_stub_server.py [--port 8787] [--polls-to-complete 2]
+                                 [--latency-ms 0] [--jitter-ms 0]
+                                 [--error-rate 0] [--error-status 429] [--seed N]
+    OPENAI_BASE_URL=http://127.0.0.1:8787/v1 OPENAI_API_KEY=stub python batch_mode.py ...
+    MATCHING_LLM_BACKEND=http-stub python matching_service.py <job_id> <candidate_ids...>
+"""
+
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+from llm_backends import fake_analysis_payload
+
+
+DEFAULT_PORT = 8787
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}-{uuid.uuid4().hex[:24]}"
+
+
+def _seed(custom_id: str, path: str) -> int:
+    return int(hashlib.sha256(f"{custom_id}/{path}".encode("utf-8")).hexdigest()[:8], 16)
+
+
+def fake_from_schema(schema: Dict[str, Any], defs: Dict[str, Any], custom_id: str, path: str = "") -> Any:
+    """Genera un valor que cumple `schema` (subset de JSON Schema usado por Structured Outputs)"""
+    if "$ref" in schema:
+        return fake_from_schema(defs[schema["$ref"].split("/")[-1]], defs, custom_id, path)
+    if "anyOf" in schema:
+        return fake_from_schema(schema["anyOf"][0], defs, custom_id, path)
+    if "enum" in schema:
+        return schema["enum"][_seed(custom_id, path) % len(schema["enum"])]
+
+    schema_type = schema.get("type")
+    if schema_type == "object":
+        return {
+            name: fake_from_schema(prop, defs, custom_id, f"{path}.{name}")
+            for name, prop in schema.get("properties", {}).items()
+        }
+    if schema_type == "array":
+        return [fake_from_schema(schema.get("items", {}), defs, custom_id, f"{path}[0]")]
+    if schema_type in ("number", "integer"):
+        # Scores 0-100 en pasos de 10
+        value = (_seed(custom_id, path) % 11) * 10
+        return value if schema_type == "integer" else float(value)
+    if schema_type == "boolean":
+        return bool(_seed(custom_id, path) % 2)
+    return f"stub {path.lstrip('.') or 'value'}"
+
+
+def fake_chat_completion(custom_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Respuesta de /v1/chat/completions (una línea del batch o un request en línea).
+
+    Los schemas del matching (MatchAnalysis, MultiMatchAnalysis) se responden
+    con el mismo análisis determinístico del backend fake; el resto, con
+    valores genéricos que cumplen el schema.
+    """
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        schema_name = response_format["json_schema"].get("name")
+        schema = response_format["json_schema"]["schema"]
+        if schema_name in ("MatchAnalysis", "MultiMatchAnalysis"):
+            payload = fake_analysis_payload(body.get("messages", []), multi=schema_name == "MultiMatchAnalysis")
+        else:
+            payload = fake_from_schema(schema, schema.get("$defs", {}), custom_id)
+        content = json.dumps(payload)
+    else:
+        content = "stub response"
+
+    prompt_chars = sum(len(str(message.get("content", ""))) for message in body.get("messages", []))
+    prompt_tokens = prompt_chars // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": _new_id("chatcmpl"),
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content, "refusal": None},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+
+class StubState:
+    """Archivos y batches en memoria, y la latencia/errores inyectados en chat completions"""
+
+    def __init__(
+        self,
+        polls_to_complete: int = 2,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 429,
+        seed: Optional[int] = None
+    ):
+        self.polls_to_complete = polls_to_complete
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.polls: Dict[str, int] = {}
+        self.counts = {"completions": 0, "errors": 0}
+        self.lock = threading.RLock()  # _complete llama a add_file con el lock tomado
+
+    def plan_completion(self) -> Tuple[float, bool]:
+        """Latencia (s) y si el request falla, para un request de chat completions"""
+        with self.lock:
+            delay = max(0.0, self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            failed = self.random.random() < self.error_rate
+            self.counts["errors" if failed else "completions"] += 1
+        return delay, failed
+
+    def add_file(self, filename: str, purpose: str, content: bytes) -> Dict[str, Any]:
+        file_object = {
+            "id": _new_id("file"),
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed"
+        }
+        with self.lock:
+            self.files[file_object["id"]] = {"object": file_object, "content": content}
+        return file_object
+
+    def create_batch(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        input_file = self.files.get(payload.get("input_file_id"))
+        if input_file is None:
+            raise KeyError(f"input_file_id {payload.get('input_file_id')} no existe")
+
+        lines = [line for line in input_file["content"].decode("utf-8").splitlines() if line.strip()]
+        batch = {
+            "id": _new_id("batch"),
+            "object": "batch",
+            "endpoint": payload.get("endpoint"),
+            "errors": None,
+            "input_file_id": payload["input_file_id"],
+            "completion_window": payload.get("completion_window", "24h"),
+            "status": "validating",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "request_counts": {"total": len(lines), "completed": 0, "failed": 0},
+            "metadata": payload.get("metadata")
+        }
+        with self.lock:
+            self.batches[batch["id"]] = batch
+            self.polls[batch["id"]] = 0
+        return batch
+
+    def _complete(self, batch: Dict[str, Any]) -> None:
+        """Procesa las líneas de entrada y genera los archivos de salida y errores"""
+        content = self.files[batch["input_file_id"]]["content"].decode("utf-8")
+        outputs, errors = [], []
+        for raw in content.splitlines():
+            if not raw.strip():
+                continue
+            line = json.loads(raw)
+            if line.get("url") != batch["endpoint"] or "body" not in line:
+                errors.append({
+                    "id": _new_id("batch_req"),
+                    "custom_id": line.get("custom_id"),
+                    "response": None,
+                    "error": {"code": "invalid_request", "message": "url o body inválidos"}
+                })
+                continue
+            outputs.append({
+                "id": _new_id("batch_req"),
+                "custom_id": line["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "request_id": _new_id("req"),
+                    "body": fake_chat_completion(line["custom_id"], line["body"])
+                },
+                "error": None
+            })
+
+        def _jsonl(rows: list) -> bytes:
+            return "".join(json.dumps(row) + "\n" for row in rows).encode("utf-8")
+
+        if outputs:
+            batch["output_file_id"] = self.add_file(f"{batch['id']}_output.jsonl", "batch_output", _jsonl(outputs))["id"]
+        if errors:
+            batch["error_file_id"] = self.add_file(f"{batch['id']}_errors.jsonl", "batch_output", _jsonl(errors))["id"]
+        batch["request_counts"] = {"total": len(outputs) + len(errors), "completed": len(outputs), "failed": len(errors)}
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+
+    def retrieve_batch(self, batch_id: str) -> Dict[str, Any]:
+        with self.lock:
+            batch = self.batches[batch_id]
+            if batch["status"] in ("validating", "in_progress"):
+                self.polls[batch_id] += 1
+                if self.polls[batch_id] >= self.polls_to_complete:
+                    self._complete(batch)
+                else:
+                    batch["status"] = "in_progress"
+            return batch
+
+    def cancel_batch(self, batch_id: str) -> Dict[str, Any]:
+        with self.lock:
+            batch = self.batches[batch_id]
+            if batch["status"] not in ("completed", "failed", "expired"):
+                batch["status"] = "cancelled"
+            return batch
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Handler HTTP; el estado compartido está en self.server.state"""
+
+    # Keep-alive: en una prueba de carga no medir un handshake TCP por request.
+    # Sin Nagle: headers y body salen en writes separados (delayed ACK de ~40 ms)
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args: Any) -> None:
+        sys.stderr.write(f"[openai-stub] {format % args}\n")
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self) -> None:
+        self._send_json(404, {"error": {"message": f"Ruta no encontrada: {self.path}", "type": "invalid_request_error"}})
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _parse_multipart(self, body: bytes) -> Tuple[Optional[str], Dict[str, str], Optional[bytes]]:
+        header = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8")
+        message = BytesParser(policy=HTTP).parsebytes(header + body)
+        fields: Dict[str, str] = {}
+        filename, content = None, None
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if part.get_filename():
+                filename, content = part.get_filename(), part.get_payload(decode=True)
+            elif name:
+                fields[name] = part.get_payload(decode=True).decode("utf-8")
+        return filename, fields, content
+
+    def do_POST(self) -> None:
+        state: StubState = self.server.state
+        parts = self.path.split("?")[0].strip("/").split("/")
+        body = self._read_body()
+
+        if parts == ["v1", "chat", "completions"]:
+            self._chat_completion(body)
+        elif parts == ["v1", "files"]:
+            filename, fields, content = self._parse_multipart(body)
+            if content is None:
+                self._send_json(400, {"error": {"message": "Falta el archivo", "type": "invalid_request_error"}})
+                return
+            self._send_json(200, state.add_file(filename or "upload.jsonl", fields.get("purpose", "batch"), content))
+        elif parts == ["v1", "batches"]:
+            try:
+                self._send_json(200, state.create_batch(json.loads(body or b"{}")))
+            except KeyError as e:
+                self._send_json(400, {"error": {"message": str(e), "type": "invalid_request_error"}})
+        elif len(parts) == 4 and parts[:2] == ["v1", "batches"] and parts[3] == "cancel" and parts[2] in state.batches:
+            self._send_json(200, state.cancel_batch(parts[2]))
+        else:
+            self._not_found()
+
+    def _chat_completion(self, body: bytes) -> None:
+        """Chat completion en línea, después de la latencia inyectada (o el error inyectado)"""
+        state: StubState = self.server.state
+        try:
+            request = json.loads(body or b"{}")
+        except json.JSONDecodeError as e:
+            self._send_json(400, {"error": {"message": f"JSON inválido: {e}", "type": "invalid_request_error"}})
+            return
+
+        delay, failed = state.plan_completion()
+        time.sleep(delay)
+        if failed:
+            payload = json.dumps({"error": {"message": "Error inyectado por el stub", "type": "stub_error"}}).encode("utf-8")
+            self.send_response(state.error_status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header("retry-after-ms", "50")
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        seed = hashlib.sha256(json.dumps(request.get("messages", []), sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        self._send_json(200, fake_chat_completion(seed, request))
+
+    def do_GET(self) -> None:
+        state: StubState = self.server.state
+        parts = self.path.split("?")[0].strip("/").split("/")
+
+        if len(parts) == 3 and parts[:2] == ["v1", "files"] and parts[2] in state.files:
+            self._send_json(200, state.files[parts[2]]["object"])
+        elif len(parts) == 4 and parts[:2] == ["v1", "files"] and parts[3] == "content" and parts[2] in state.files:
+            content = state.files[parts[2]]["content"]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/jsonl")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        elif len(parts) == 3 and parts[:2] == ["v1", "batches"] and parts[2] in state.batches:
+            self._send_json(200, state.retrieve_batch(parts[2]))
+        else:
+            self._not_found()
+
+
+def make_server(host: str = "127.0.0.1", port: int = DEFAULT_PORT, polls_to_complete: int = 2, **injection: Any) -> ThreadingHTTPServer:
+    """
+    Crea el servidor (port=0 elige un puerto libre; ver server.server_address).
+
+    Args:
+        injection: latency_ms, jitter_ms, error_rate, error_status y seed (ver StubState)
+    """
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.state = StubState(polls_to_complete, **injection)
+    return server
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    port = int(args[args.index("--port") + 1]) if "--port" in args else DEFAULT_PORT
+    polls = int(args[args.index("--polls-to-complete") + 1]) if "--polls-to-complete" in args else 2
+
+    def _option(name: str, cast: Any, default: Any) -> Any:
+        return cast(args[args.index(name) + 1]) if name in args else default
+
+    stub = make_server(
+        port=port,
+        polls_to_complete=polls,
+        latency_ms=_option("--latency-ms", float, 0.0),
+        jitter_ms=_option("--jitter-ms", float, 0.0),
+        error_rate=_option("--error-rate", float, 0.0),
+        error_status=_option("--error-status", int, 429),
+        seed=_option("--seed", int, None)
+    )
+    print(f"✅ Stub de OpenAI escuchando en http://127.0.0.1:{stub.server_address[1]}/v1", file=sys.stderr)
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        stub.server_close()
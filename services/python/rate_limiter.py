@@ -0,0 +1,355 @@
+"""
+Scheduler de llamadas al modelo con límites de rate, reintentos y backoff.
+
+Un solo scheduler por proceso (matching_service.llm_scheduler) lo comparten el
+camino síncrono (hilos del batch) y el motor asíncrono:
+
+- Ventana deslizante de 60s de requests y tokens estimados por llamada contra
+  OPENAI_RPM_LIMIT / OPENAI_TPM_LIMIT. Si no están configurados se usan los
+  límites que informa OpenAI en los headers x-ratelimit-limit-*, divididos por
+  OPENAI_RATE_LIMIT_SHARE (procesos que comparten la cuenta, ej. backfill.py).
+- Lee x-ratelimit-remaining-* / x-ratelimit-reset-* de cada respuesta: si
+  OpenAI dice que no queda capacidad, las llamadas siguientes esperan al reset.
+- Reintenta 408/409/429/5xx y errores de conexión con backoff exponencial con
+  jitter (respetando retry-after). Un 429 pausa a todo el scheduler, no solo a
+  la llamada que lo recibió. insufficient_quota no se reintenta.
+- stats(): requests, reintentos, 429s, profundidad de la cola y tiempos de espera.
+
+Las llamadas se hacen con max_retries=0 en el cliente de OpenAI para que los
+reintentos los maneje solo el scheduler.
+"""
+
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+# Límites del proveedor (0 = usar los que informan los headers)
+OPENAI_RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", "0"))
+OPENAI_TPM_LIMIT = int(os.getenv("OPENAI_TPM_LIMIT", "0"))
+
+# Procesos que comparten la cuota de la cuenta: los headers informan el límite
+# de toda la cuenta, cada proceso usa su parte
+OPENAI_RATE_LIMIT_SHARE = max(1, int(os.getenv("OPENAI_RATE_LIMIT_SHARE", "1")))
+
+# Reintentos por llamada y backoff exponencial (segundos)
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "6"))
+OPENAI_BACKOFF_BASE_SECONDS = float(os.getenv("OPENAI_BACKOFF_BASE_SECONDS", "1.0"))
+OPENAI_BACKOFF_MAX_SECONDS = float(os.getenv("OPENAI_BACKOFF_MAX_SECONDS", "60.0"))
+
+# Tokens de salida esperados por análisis (para estimar el consumo antes de la llamada)
+ESTIMATED_COMPLETION_TOKENS = 600
+
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def estimate_tokens(messages: List[Dict[str, str]]) -> int:
+    """Estimación barata de tokens (~4 caracteres por token) de prompt + respuesta"""
+    prompt_chars = sum(len(message["content"]) for message in messages)
+    return prompt_chars // 4 + ESTIMATED_COMPLETION_TOKENS
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parsea la duración de los headers x-ratelimit-reset-* ("1s", "6m0s", "20ms", "59.5s").
+
+    Returns:
+        Segundos, o None si el valor no es una duración válida
+    """
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value.strip())
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_SECONDS[unit] for amount, unit in parts)
+
+
+def _header_int(headers: Mapping[str, str], name: str) -> Optional[int]:
+    try:
+        return int(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def retry_after_seconds(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Espera indicada por retry-after-ms / retry-after (None si no viene)"""
+    if not headers:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    if headers.get("retry-after"):
+        try:
+            return float(headers["retry-after"])
+        except ValueError:
+            return None
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """True para timeouts, errores de conexión, 408/409/429 y 5xx (salvo cuota agotada)"""
+    from llm_backends import LLMBackendError
+
+    if isinstance(error, LLMBackendError):
+        # Backends locales (ver llm_backends.py): status_code None es un error de conexión
+        return error.status_code is None or error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+
+    # Import diferido: importar openai cuesta ~0.6s y este módulo se carga en el arranque
+    from openai import APIConnectionError, APIStatusError
+
+    if isinstance(error, APIConnectionError):
+        return True
+    if isinstance(error, APIStatusError):
+        if getattr(error, "code", None) == "insufficient_quota":
+            return False
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+class RateLimitScheduler:
+    """
+    Reserva capacidad (requests y tokens por minuto) antes de cada llamada y la
+    reintenta con backoff. Es thread-safe y se puede usar desde hilos (call) y
+    desde asyncio (call_async) a la vez: el lock solo protege la contabilidad,
+    las esperas se hacen fuera de él.
+    """
+
+    WINDOW_SECONDS = 60.0
+
+    def __init__(
+        self,
+        requests_per_minute: int = OPENAI_RPM_LIMIT,
+        tokens_per_minute: int = OPENAI_TPM_LIMIT,
+        max_retries: int = OPENAI_MAX_RETRIES,
+        backoff_base: float = OPENAI_BACKOFF_BASE_SECONDS,
+        backoff_max: float = OPENAI_BACKOFF_MAX_SECONDS,
+        share: int = OPENAI_RATE_LIMIT_SHARE
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.share = max(1, share)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._events: "deque[tuple]" = deque()
+        self._tokens_in_window = 0
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+        self._waits = 0
+
+    # ------------------------------------------------------------------
+    # Contabilidad
+    # ------------------------------------------------------------------
+
+    def _reserve(self, tokens: int) -> float:
+        """Registra la llamada si cabe; si no, devuelve los segundos a esperar"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                return self._blocked_until - now
+
+            while self._events and now - self._events[0][0] >= self.WINDOW_SECONDS:
+                self._tokens_in_window -= self._events.popleft()[1]
+
+            full = (
+                (self.requests_per_minute and len(self._events) >= self.requests_per_minute)
+                or (self.tokens_per_minute and self._events and self._tokens_in_window + tokens > self.tokens_per_minute)
+            )
+            if full:
+                # Esperar a que expire el evento más antiguo de la ventana
+                return max(0.01, self.WINDOW_SECONDS - (now - self._events[0][0]))
+
+            self._events.append((now, tokens))
+            self._tokens_in_window += tokens
+            self.requests += 1
+            return 0.0
+
+    def _enter_queue(self) -> None:
+        with self._lock:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+    def _leave_queue(self, waited: float) -> None:
+        with self._lock:
+            self.queue_depth -= 1
+            self._waits += 1
+            self.wait_seconds_total += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def _block_for(self, seconds: float) -> None:
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def observe_headers(self, headers: Optional[Mapping[str, str]], tokens: int = 0) -> None:
+        """
+        Ajusta el scheduler con los headers x-ratelimit-* de una respuesta.
+
+        Args:
+            headers: Headers HTTP de la respuesta
+            tokens: Tokens estimados de la próxima llamada típica
+        """
+        if not headers:
+            return
+
+        limit_requests = _header_int(headers, "x-ratelimit-limit-requests")
+        limit_tokens = _header_int(headers, "x-ratelimit-limit-tokens")
+        with self._lock:
+            # Los límites configurados tienen prioridad sobre los informados, que
+            # son de toda la cuenta: cada proceso toma su parte
+            if not self.requests_per_minute and limit_requests:
+                self.requests_per_minute = max(1, limit_requests // self.share)
+            if not self.tokens_per_minute and limit_tokens:
+                self.tokens_per_minute = max(1, limit_tokens // self.share)
+
+        remaining_requests = _header_int(headers, "x-ratelimit-remaining-requests")
+        remaining_tokens = _header_int(headers, "x-ratelimit-remaining-tokens")
+        if remaining_requests is not None and remaining_requests <= 0:
+            self._block_for(parse_reset_duration(headers.get("x-ratelimit-reset-requests")) or 1.0)
+        if remaining_tokens is not None and remaining_tokens < tokens:
+            self._block_for(parse_reset_duration(headers.get("x-ratelimit-reset-tokens")) or 1.0)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Full jitter sobre base * 2^attempt, con retry-after como mínimo"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        response = getattr(error, "response", None)
+        retry_after = retry_after_seconds(getattr(response, "headers", None))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _on_error(self, attempt: int, error: Exception) -> Optional[float]:
+        """Devuelve la espera antes del próximo intento, o None si no hay que reintentar"""
+        if not is_retryable(error) or attempt >= self.max_retries:
+            with self._lock:
+                self.failures += 1
+            return None
+
+        delay = self._backoff(attempt, error)
+        with self._lock:
+            self.retries += 1
+            if getattr(error, "status_code", None) == 429:
+                self.rate_limited += 1
+        if getattr(error, "status_code", None) == 429:
+            # La cuota es de toda la cuenta: frenar también a las demás llamadas
+            self._block_for(delay)
+        print(f"   ⏳ Reintento {attempt + 1}/{self.max_retries} en {delay:.1f}s: {error}")
+        return delay
+
+    # ------------------------------------------------------------------
+    # Llamadas
+    # ------------------------------------------------------------------
+
+    def acquire(self, tokens: int) -> float:
+        """Espera (bloqueando el hilo) hasta que la llamada quepa; devuelve los segundos esperados"""
+        started = time.monotonic()
+        self._enter_queue()
+        try:
+            while True:
+                wait = self._reserve(tokens)
+                if wait <= 0:
+                    break
+                time.sleep(wait)
+        finally:
+            waited = time.monotonic() - started
+            self._leave_queue(waited)
+        return waited
+
+    async def acquire_async(self, tokens: int) -> float:
+        """Igual que acquire, sin bloquear el event loop"""
+        started = time.monotonic()
+        self._enter_queue()
+        try:
+            while True:
+                wait = self._reserve(tokens)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+        finally:
+            waited = time.monotonic() - started
+            self._leave_queue(waited)
+        return waited
+
+    def call(self, request: Callable[[], T], tokens: int) -> T:
+        """
+        Ejecuta `request` dentro de los límites, reintentando los errores transitorios.
+
+        Args:
+            request: Función que hace la llamada; si devuelve una respuesta con
+                .headers (with_raw_response) se leen los x-ratelimit-*
+            tokens: Tokens estimados de la llamada (ver estimate_tokens)
+
+        Returns:
+            Lo que devuelve `request`
+        """
+        attempt = 0
+        while True:
+            self.acquire(tokens)
+            try:
+                result = request()
+            except Exception as e:
+                delay = self._on_error(attempt, e)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.observe_headers(getattr(result, "headers", None), tokens)
+            return result
+
+    async def call_async(self, request: Callable[[], Awaitable[T]], tokens: int) -> T:
+        """Versión asíncrona de call (`request` devuelve un awaitable)"""
+        attempt = 0
+        while True:
+            await self.acquire_async(tokens)
+            try:
+                result = await request()
+            except Exception as e:
+                delay = self._on_error(attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.observe_headers(getattr(result, "headers", None), tokens)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Devuelve límites vigentes, requests, reintentos, 429s, cola y esperas"""
+        with self._lock:
+            return {
+                "requests_per_minute": self.requests_per_minute or None,
+                "tokens_per_minute": self.tokens_per_minute or None,
+                "requests": self.requests,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "failures": self.failures,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "avg_wait_ms": round(self.wait_seconds_total / self._waits * 1000, 1) if self._waits else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 1)
+            }
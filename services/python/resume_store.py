@@ -0,0 +1,274 @@
+"""
+Store de contextos de candidato pre-renderizados.
+
+build_candidate_context re-parsea fechas, ordena y formatea el resume de cada
+candidato en cada match: un candidato evaluado contra 50 jobs se renderiza 50
+veces. Este store guarda el texto ya renderizado por candidate_id junto con su
+versión:
+
+    versión = hash(formato + campos del candidato + huella de sus experiencias) + fecha de hoy
+
+La huella de experiencias es la misma del planificador (matching_core.fingerprint), así
+que cualquier cambio en candidate_experience invalida la entrada. La fecha va
+en la versión porque las duraciones de los roles actuales ("Actualidad") se
+calculan contra date.today(). El formato (matching_core.RESUME_FORMAT_VERSION)
+va para que un cambio del renderer no sirva resumes con el formato anterior.
+
+Backends disponibles (variable de entorno RESUME_STORE_BACKEND):
+- memory:   LRU en el proceso (default)
+- supabase: tabla candidate_resumes (ver sql/create_candidate_resumes_table.sql)
+- none:     sin store
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Protocol
+
+from data_loader import IN_QUERY_CHUNK_SIZE, REQUIRED_FIELDS
+from matching_core.context import RESUME_FORMAT_VERSION
+from matching_core.fingerprint import experience_fingerprint
+
+
+DEFAULT_MAX_ENTRIES = 50000
+SUPABASE_RESUMES_TABLE = "candidate_resumes"
+
+# Campos del candidato que entran en el contexto renderizado
+CANDIDATE_CONTEXT_FIELDS = tuple(field for field in REQUIRED_FIELDS["candidates"] if field not in ("id", "updated_at"))
+
+RenderFn = Callable[[Dict[str, Any], List[Dict[str, Any]]], str]
+
+
+def resume_version(candidate: Dict[str, Any], experiences: List[Dict[str, Any]], today: Optional[date] = None) -> str:
+    """
+    Versión del contexto renderizado de un candidato.
+
+    Args:
+        candidate: Fila de candidates
+        experiences: Filas de candidate_experience del candidato
+        today: Fecha de render (default: hoy)
+
+    Returns:
+        "<hash>:<YYYY-MM-DD>"
+    """
+    candidate_fields = json.dumps(
+        [candidate.get(field) for field in CANDIDATE_CONTEXT_FIELDS], default=str, ensure_ascii=False
+    )
+    digest = hashlib.sha256(
+        "\x00".join((RESUME_FORMAT_VERSION, candidate_fields, experience_fingerprint(experiences))).encode("utf-8")
+    ).hexdigest()[:16]
+    return f"{digest}:{(today or date.today()).isoformat()}"
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+class ResumeBackend(Protocol):
+    """Interfaz común de los backends del store"""
+
+    name: str
+
+    def get_many(self, versions: Dict[str, str]) -> Dict[str, str]:
+        """Devuelve {candidate_id: contexto} de los candidatos cuya versión guardada coincide"""
+        ...
+
+    def set_many(self, entries: Dict[str, tuple]) -> None:
+        """Guarda {candidate_id: (versión, contexto)}"""
+        ...
+
+    def invalidate(self, candidate_ids: List[str]) -> None:
+        ...
+
+
+class MemoryResumeBackend:
+    """LRU en memoria: una entrada por candidato (la versión nueva pisa la vieja)"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, versions: Dict[str, str]) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        with self._lock:
+            for candidate_id, version in versions.items():
+                entry = self._entries.get(candidate_id)
+                if entry is not None and entry[0] == version:
+                    self._entries.move_to_end(candidate_id)
+                    found[candidate_id] = entry[1]
+        return found
+
+    def set_many(self, entries: Dict[str, tuple]) -> None:
+        with self._lock:
+            for candidate_id, entry in entries.items():
+                self._entries[candidate_id] = entry
+                self._entries.move_to_end(candidate_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, candidate_ids: List[str]) -> None:
+        with self._lock:
+            for candidate_id in candidate_ids:
+                self._entries.pop(candidate_id, None)
+
+
+class SupabaseResumeBackend:
+    """
+    Tabla candidate_resumes de Supabase (una fila por candidato), compartida
+    entre procesos. Además de la versión, un trigger en candidate_experience
+    borra la fila del candidato cuando cambian sus experiencias.
+    """
+
+    name = "supabase"
+
+    def __init__(self, supabase_client: Any):
+        self.supabase = supabase_client
+
+    def get_many(self, versions: Dict[str, str]) -> Dict[str, str]:
+        candidate_ids = list(versions)
+        found: Dict[str, str] = {}
+        for i in range(0, len(candidate_ids), IN_QUERY_CHUNK_SIZE):
+            chunk = candidate_ids[i:i + IN_QUERY_CHUNK_SIZE]
+            response = self.supabase.table(SUPABASE_RESUMES_TABLE).select(
+                "candidate_id, version, context"
+            ).in_("candidate_id", chunk).execute()
+            for row in response.data or []:
+                if versions.get(row["candidate_id"]) == row["version"]:
+                    found[row["candidate_id"]] = row["context"]
+        return found
+
+    def set_many(self, entries: Dict[str, tuple]) -> None:
+        if not entries:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        self.supabase.table(SUPABASE_RESUMES_TABLE).upsert([
+            {"candidate_id": candidate_id, "version": version, "context": context, "rendered_at": now}
+            for candidate_id, (version, context) in entries.items()
+        ], on_conflict="candidate_id").execute()
+
+    def invalidate(self, candidate_ids: List[str]) -> None:
+        for i in range(0, len(candidate_ids), IN_QUERY_CHUNK_SIZE):
+            self.supabase.table(SUPABASE_RESUMES_TABLE).delete().in_(
+                "candidate_id", candidate_ids[i:i + IN_QUERY_CHUNK_SIZE]
+            ).execute()
+
+
+# ============================================================================
+# STORE CON CONTADORES
+# ============================================================================
+
+class ResumeStore:
+    """Envuelve un backend: devuelve contextos guardados o los renderiza y guarda"""
+
+    def __init__(self, backend: ResumeBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def get_or_render_many(
+        self,
+        candidates: Dict[str, Dict[str, Any]],
+        experiences_by_candidate: Dict[str, List[Dict[str, Any]]],
+        render: RenderFn
+    ) -> Dict[str, str]:
+        """
+        Contextos de varios candidatos: una lectura y una escritura al backend
+        por llamada.
+
+        Args:
+            candidates: {candidate_id: fila de candidates}
+            experiences_by_candidate: {candidate_id: filas de candidate_experience}
+            render: Función que renderiza el contexto (build_candidate_context)
+
+        Returns:
+            {candidate_id: contexto}
+        """
+        versions = {
+            candidate_id: resume_version(candidate, experiences_by_candidate.get(candidate_id, []))
+            for candidate_id, candidate in candidates.items()
+        }
+
+        try:
+            contexts = self.backend.get_many(versions)
+        except Exception as e:
+            # Un store caído no debe romper el matching: se renderiza todo
+            print(f"   ⚠️  Error leyendo resume store ({self.backend.name}): {e}")
+            contexts = {}
+            with self._lock:
+                self.errors += 1
+
+        rendered: Dict[str, tuple] = {}
+        for candidate_id, candidate in candidates.items():
+            if candidate_id not in contexts:
+                contexts[candidate_id] = render(candidate, experiences_by_candidate.get(candidate_id, []))
+                rendered[candidate_id] = (versions[candidate_id], contexts[candidate_id])
+
+        with self._lock:
+            self.hits += len(candidates) - len(rendered)
+            self.misses += len(rendered)
+
+        if rendered:
+            try:
+                self.backend.set_many(rendered)
+            except Exception as e:
+                print(f"   ⚠️  Error escribiendo resume store ({self.backend.name}): {e}")
+                with self._lock:
+                    self.errors += 1
+
+        return contexts
+
+    def get_or_render(self, candidate: Dict[str, Any], experiences: List[Dict[str, Any]], render: RenderFn) -> str:
+        """Contexto de un candidato (ver get_or_render_many)"""
+        return self.get_or_render_many({candidate["id"]: candidate}, {candidate["id"]: experiences}, render)[candidate["id"]]
+
+    def invalidate(self, candidate_ids: List[str]) -> None:
+        """Descarta los contextos guardados de estos candidatos"""
+        self.backend.invalidate(list(candidate_ids))
+
+    def stats(self) -> Dict[str, Any]:
+        """Devuelve backend, hits, misses, errores y hit rate"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.backend.name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+def create_resume_store(supabase_client: Any = None) -> Optional[ResumeStore]:
+    """
+    Crea el store según las variables de entorno:
+    - RESUME_STORE_BACKEND: memory (default) | supabase | none
+    - RESUME_STORE_MAX_ENTRIES: tamaño máximo del backend memory (default 50000)
+
+    Args:
+        supabase_client: Cliente de Supabase (requerido para el backend supabase)
+
+    Returns:
+        ResumeStore o None si el store está desactivado
+    """
+    backend_name = os.getenv("RESUME_STORE_BACKEND", "memory").strip().lower()
+
+    if backend_name in ("", "none", "off", "false"):
+        return None
+    if backend_name == "memory":
+        backend: ResumeBackend = MemoryResumeBackend(int(os.getenv("RESUME_STORE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)))
+    elif backend_name == "supabase":
+        if supabase_client is None:
+            raise ValueError("❌ RESUME_STORE_BACKEND=supabase requiere un cliente de Supabase")
+        backend = SupabaseResumeBackend(supabase_client)
+    else:
+        raise ValueError(f"❌ RESUME_STORE_BACKEND desconocido: {backend_name}")
+
+    return ResumeStore(backend)
@@ -1,10 +1,22 @@
 """
 Script de test para el AI Matching Service
 Busca un job real y ejecuta el matching con un candidato específico
+
+Con --vercel corre además el mismo par por la función serverless
+(api/ai-match.py) en un servidor HTTP local: es el test que vivía en
+api/matching_service/, ahora contra el código compartido de services/python.
+
+Uso:
+    python test_matching.py [--vercel]
 """
 
+import importlib.util
 import os
 import sys
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Cargar variables de entorno desde .env
@@ -19,6 +31,9 @@ import json
 # ID del candidato a testear
 CANDIDATE_ID = "d6331880-2c84-45a1-a0f3-86e2cde16cbc"
 
+# Función serverless de Vercel (importa este mismo matching_service)
+VERCEL_FUNCTION_PATH = Path(__file__).resolve().parents[2] / "api" / "ai-match.py"
+
 
 def list_available_jobs():
     """Lista los jobs disponibles en la base de datos"""
@@ -110,6 +125,64 @@ def test_matching(job_id: str, candidate_id: str):
         return None
 
 
+def test_vercel_function(job_id: str, candidate_id: str):
+    """Ejecuta el matching por el handler de api/ai-match.py (POST local, como en Vercel)"""
+    print("\n" + "="*60)
+    print("🚀 INICIANDO TEST DE LA FUNCIÓN DE VERCEL")
+    print("="*60)
+    print(f"Función: {VERCEL_FUNCTION_PATH}")
+    
+    try:
+        # El nombre del archivo tiene un guion: se carga por path
+        spec = importlib.util.spec_from_file_location("ai_match", VERCEL_FUNCTION_PATH)
+        ai_match = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(ai_match)
+        
+        server = ThreadingHTTPServer(("127.0.0.1", 0), ai_match.handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            request = urllib.request.Request(
+                f"http://127.0.0.1:{server.server_address[1]}/api/ai-match",
+                data=json.dumps({"job_id": job_id, "candidate_id": candidate_id}).encode("utf-8"),
+                headers={"Content-Type": "application/json"},
+                method="POST"
+            )
+            with urllib.request.urlopen(request, timeout=300) as response:
+                result = json.loads(response.read().decode("utf-8"))
+        finally:
+            server.shutdown()
+            server.server_close()
+        
+        print("\n" + "="*60)
+        print("✅ RESULTADO DE LA FUNCIÓN DE VERCEL")
+        print("="*60)
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        
+        return result
+    
+    except Exception as e:
+        print(f"\n❌ Error en la función de Vercel: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+
+def _print_result(title: str, result):
+    print("\n" + "="*60)
+    if result and result.get("status") == "success":
+        print(f"🎉 {title} COMPLETADO EXITOSAMENTE")
+        print("="*60)
+        print(f"Score final: {result['match_score']}")
+        detail = result["match_detail"]
+        for dimension in ("seniority_match", "role_fit", "industry", "stability"):
+            print(f"{dimension}: {detail[dimension]['score']} — {detail[dimension]['reason']}")
+    else:
+        print(f"❌ {title} FALLÓ")
+        print("="*60)
+        if result:
+            print(result.get("error"))
+
+
 def main():
     """Función principal"""
     print("\n" + "="*60)
@@ -163,17 +236,14 @@ def main():
     
     # Ejecutar matching
     result = test_matching(job['id'], CANDIDATE_ID)
+    _print_result("TEST", result)
     
-    if result:
-        print("\n" + "="*60)
-        print("🎉 TEST COMPLETADO EXITOSAMENTE")
-        print("="*60)
-        print(f"Score final: {result['match_score']}")
-        print(f"Key Gap: {result['match_detail']['key_gap']}")
-    else:
-        print("\n" + "="*60)
-        print("❌ TEST FALLÓ")
-        print("="*60)
+    # Mismo par por la función de Vercel: debe dar el mismo análisis
+    if "--vercel" in sys.argv[1:]:
+        vercel_result = test_vercel_function(job['id'], CANDIDATE_ID)
+        _print_result("TEST DE VERCEL", vercel_result)
+        if result and vercel_result and vercel_result.get("match_score") != result.get("match_score"):
+            print(f"⚠️  Scores distintos: servicio {result.get('match_score')} vs Vercel {vercel_result.get('match_score')}")
 
 
 if __name__ == "__main__":
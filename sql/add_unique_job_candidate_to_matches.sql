@@ -0,0 +1,30 @@
+-- SQL para garantizar un único match por par (job_id, candidate_id)
+-- Requerido por el upsert ON CONFLICT (job_id, candidate_id) de services/python/match_writer.py
+
+-- Eliminar duplicados previos: se conserva el de updated_at más reciente (a
+-- igual updated_at, el de mayor id). ctid es la posición física de la fila, no
+-- su antigüedad: un UPDATE o un VACUUM FULL la cambia
+DELETE FROM job_candidate_matches
+WHERE id IN (
+  SELECT id
+  FROM (
+    SELECT
+      id,
+      ROW_NUMBER() OVER (
+        PARTITION BY job_id, candidate_id
+        ORDER BY updated_at DESC NULLS LAST, id DESC
+      ) AS rn
+    FROM job_candidate_matches
+  ) ranked
+  WHERE rn > 1
+);
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_constraint WHERE conname = 'unique_job_candidate_match'
+  ) THEN
+    ALTER TABLE job_candidate_matches
+    ADD CONSTRAINT unique_job_candidate_match UNIQUE (job_id, candidate_id);
+  END IF;
+END $$;
@@ -0,0 +1,30 @@
+-- Migración: Crear tabla candidate_resumes para el store de contextos de candidato del AI Matching
+-- Solo es necesaria si se usa RESUME_STORE_BACKEND=supabase
+-- Ejecutar en Supabase SQL Editor
+
+CREATE TABLE IF NOT EXISTS candidate_resumes (
+  candidate_id UUID PRIMARY KEY REFERENCES candidates(id) ON DELETE CASCADE,
+  version TEXT NOT NULL,
+  context TEXT NOT NULL,
+  rendered_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Invalidar el contexto renderizado cuando cambian las experiencias del candidato
+CREATE OR REPLACE FUNCTION invalidate_candidate_resume()
+RETURNS TRIGGER AS $$
+BEGIN
+  DELETE FROM candidate_resumes
+  WHERE candidate_id = COALESCE(NEW.candidate_id, OLD.candidate_id);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_candidate_experience_invalidate_resume ON candidate_experience;
+CREATE TRIGGER trg_candidate_experience_invalidate_resume
+AFTER INSERT OR UPDATE OR DELETE ON candidate_experience
+FOR EACH ROW EXECUTE FUNCTION invalidate_candidate_resume();
+
+-- Comentarios
+COMMENT ON TABLE candidate_resumes IS 'Contexto de candidato pre-renderizado (resume cronológico) para el AI Matching';
+COMMENT ON COLUMN candidate_resumes.version IS 'hash(campos del candidato + huella de experiencias):fecha de render';
+COMMENT ON COLUMN candidate_resumes.context IS 'Texto de build_candidate_context listo para el prompt';
@@ -0,0 +1,17 @@
+-- Migración: Crear tabla match_analysis_cache para el cache de análisis del AI Matching
+-- Solo es necesaria si se usa MATCH_CACHE_BACKEND=supabase
+-- Ejecutar en Supabase SQL Editor
+
+CREATE TABLE IF NOT EXISTS match_analysis_cache (
+  cache_key TEXT PRIMARY KEY,
+  analysis TEXT NOT NULL,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Índice para expiración por TTL y recorte por tamaño
+CREATE INDEX IF NOT EXISTS idx_match_analysis_cache_created_at ON match_analysis_cache(created_at);
+
+-- Comentarios
+COMMENT ON TABLE match_analysis_cache IS 'Cache de MatchAnalysis del LLM, direccionado por contenido';
+COMMENT ON COLUMN match_analysis_cache.cache_key IS 'sha256 de (SYSTEM_PROMPT, modelo, job_context, candidate_context)';
+COMMENT ON COLUMN match_analysis_cache.analysis IS 'MatchAnalysis serializado como JSON';
@@ -3,11 +3,228 @@
  * Llama al script Python que usa OpenAI GPT-4o para calcular matches
  */
 
-import { exec } from 'child_process';
-import { promisify } from 'util';
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
+import { createInterface } from 'readline';
 import { resolve } from 'path';
 
-const execAsync = promisify(exec);
+// En local, usar el worker residente de Python salvo que se desactive explícitamente
+const useMatchingWorker = () => process.env.AI_MATCHING_WORKER !== 'false';
+
+interface PendingWorkerRequest {
+  resolve: (result: any) => void;
+  reject: (error: Error) => void;
+  timer: NodeJS.Timeout;
+}
+
+/**
+ * Cliente del worker residente de matching (`matching_service.py --worker`).
+ * Mantiene un solo proceso Python vivo (clientes de OpenAI/Supabase calientes)
+ * y le envía requests NDJSON por stdin, correlacionando respuestas por id.
+ */
+class PythonMatchingWorker {
+  private process: ChildProcessWithoutNullStreams | null = null;
+  private pending = new Map<string, PendingWorkerRequest>();
+  private nextId = 0;
+
+  private start(): ChildProcessWithoutNullStreams {
+    const projectRoot = resolve(process.cwd());
+    const pythonScript = resolve(projectRoot, 'services/python/matching_service.py');
+
+    console.log('🤖 [AI MATCHING] Iniciando worker residente de Python...');
+
+    const child = spawn('python3', [pythonScript, '--worker'], {
+      cwd: projectRoot,
+      env: {
+        ...process.env,
+        PATH: process.env.PATH || '',
+      },
+    });
+
+    const lines = createInterface({ input: child.stdout });
+    lines.on('line', (line) => {
+      let message: any;
+      try {
+        message = JSON.parse(line);
+      } catch {
+        // Líneas que no son del protocolo (logs de arranque)
+        return;
+      }
+
+      if (message.id === undefined || message.id === null) {
+        return;
+      }
+
+      const request = this.pending.get(String(message.id));
+      if (!request) {
+        return;
+      }
+
+      this.pending.delete(String(message.id));
+      clearTimeout(request.timer);
+
+      if (message.ok) {
+        request.resolve(message.result);
+      } else {
+        request.reject(new Error(message.error || 'Error desconocido en el worker'));
+      }
+    });
+
+    child.stderr.on('data', (chunk) => {
+      const text = chunk.toString();
+      if (text.includes('❌')) {
+        console.error('⚠️  [AI MATCHING WORKER]', text.trim());
+      }
+    });
+
+    child.on('exit', (code) => {
+      this.fail(child, new Error(`El worker de matching terminó (code ${code})`));
+    });
+
+    // Sin estos handlers, un spawn fallido (python3 no encontrado) o un EPIPE al
+    // escribir en un worker muerto es un 'error' sin listener y tira el proceso de Node
+    child.on('error', (error) => {
+      this.fail(child, new Error(`Error en el proceso del worker de matching: ${error.message}`));
+    });
+    child.stdin.on('error', (error) => {
+      this.fail(child, new Error(`Error escribiendo al worker de matching: ${error.message}`));
+    });
+
+    this.process = child;
+    return child;
+  }
+
+  /**
+   * Marca el worker como muerto y rechaza todos los requests pendientes;
+   * el próximo request arranca un proceso nuevo.
+   */
+  private fail(child: ChildProcessWithoutNullStreams, error: Error): void {
+    if (this.process !== child) {
+      return;
+    }
+    console.error(`⚠️  [AI MATCHING] ${error.message}`);
+    this.process = null;
+    for (const request of this.pending.values()) {
+      clearTimeout(request.timer);
+      request.reject(error);
+    }
+    this.pending.clear();
+    if (!child.killed && child.exitCode === null) {
+      child.kill();
+    }
+  }
+
+  request(payload: Record<string, any>, timeoutMs: number): Promise<any> {
+    const child = this.process ?? this.start();
+    const id = String(++this.nextId);
+
+    return new Promise((resolvePromise, rejectPromise) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        rejectPromise(new Error(`Timeout esperando al worker de matching (${timeoutMs}ms)`));
+      }, timeoutMs);
+
+      this.pending.set(id, { resolve: resolvePromise, reject: rejectPromise, timer });
+      child.stdin.write(JSON.stringify({ id, ...payload }) + '\n');
+    });
+  }
+}
+
+let matchingWorker: PythonMatchingWorker | null = null;
+
+function getMatchingWorker(): PythonMatchingWorker {
+  if (!matchingWorker) {
+    matchingWorker = new PythonMatchingWorker();
+  }
+  return matchingWorker;
+}
+
+interface NdjsonMatchRun {
+  results: any[];
+  errors: any[];
+  summary: any;
+}
+
+/**
+ * Ejecuta `matching_service.py --ndjson --stdin` para un conjunto de pares.
+ * Los pares se envían por stdin (uno por línea) y stdout trae un evento JSON
+ * por línea (start, stage, result, error, summary) a medida que se calculan;
+ * los logs del script llegan por stderr.
+ */
+function runMatchingNdjson(
+  pairs: Array<{ jobId: string; candidateId: string }>,
+  timeoutMs: number,
+  onEvent?: (event: any) => void
+): Promise<NdjsonMatchRun> {
+  const projectRoot = resolve(process.cwd());
+  const pythonScript = resolve(projectRoot, 'services/python/matching_service.py');
+
+  return new Promise((resolvePromise, rejectPromise) => {
+    const child = spawn('python3', [pythonScript, '--ndjson', '--stdin'], {
+      cwd: projectRoot,
+      env: {
+        ...process.env,
+        PATH: process.env.PATH || '',
+      },
+    });
+
+    const run: NdjsonMatchRun = { results: [], errors: [], summary: null };
+    const resultsByPair = new Map<string, any>();
+    let stderrTail = '';
+
+    const timer = setTimeout(() => {
+      child.kill();
+      rejectPromise(new Error(`Timeout ejecutando el matching (${timeoutMs}ms)`));
+    }, timeoutMs);
+
+    const lines = createInterface({ input: child.stdout });
+    lines.on('line', (line) => {
+      let event: any;
+      try {
+        event = JSON.parse(line);
+      } catch {
+        return;
+      }
+
+      if (event.type === 'result') {
+        // Un par cuenta como guardado solo si su última línea es success
+        resultsByPair.set(`${event.job_id}:${event.candidate_id}`, event);
+      } else if (event.type === 'summary') {
+        run.summary = event;
+      }
+      onEvent?.(event);
+    });
+
+    child.stderr.on('data', (chunk) => {
+      const text = chunk.toString();
+      stderrTail = (stderrTail + text).slice(-2000);
+      if (text.includes('❌')) {
+        console.error('⚠️  [AI MATCHING]', text.trim());
+      }
+    });
+
+    child.on('error', (error) => {
+      clearTimeout(timer);
+      rejectPromise(error);
+    });
+
+    child.on('close', (code) => {
+      clearTimeout(timer);
+      if (!run.summary) {
+        rejectPromise(new Error(`El script de matching terminó sin resumen (code ${code}). stderr: ${stderrTail.trim()}`));
+        return;
+      }
+      for (const event of resultsByPair.values()) {
+        (event.status === 'success' ? run.results : run.errors).push(event);
+      }
+      resolvePromise(run);
+    });
+
+    for (const pair of pairs) {
+      child.stdin.write(JSON.stringify({ job_id: pair.jobId, candidate_id: pair.candidateId }) + '\n');
+    }
+    child.stdin.end();
+  });
+}
 
 export interface AIMatchResult {
   score: number;
@@ -83,107 +300,39 @@ export async function calculateAIMatch(
       };
     }
     
-    // En desarrollo local, ejecutar el script Python directamente
-    const projectRoot = resolve(process.cwd());
-    const pythonScript = resolve(projectRoot, 'services/python/matching_service.py');
-    
-    console.log(`🤖 [AI MATCHING] Ejecutando matching localmente para Job ${jobId} ↔ Candidate ${candidateId}`);
-    
-    // Ejecutar el script Python
-    const { stdout, stderr } = await execAsync(
-      `python3 "${pythonScript}" "${jobId}" "${candidateId}"`,
-      {
-        cwd: projectRoot,
-        env: {
-          ...process.env,
-          // Asegurar que las variables de entorno estén disponibles
-          PATH: process.env.PATH || '',
-        },
-        maxBuffer: 10 * 1024 * 1024, // 10MB buffer para respuestas grandes
-        timeout: 60000, // 60 segundos timeout
-      }
-    );
+    // En desarrollo local, usar el worker residente de Python
+    if (useMatchingWorker()) {
+      console.log(`🤖 [AI MATCHING] Enviando matching al worker para Job ${jobId} ↔ Candidate ${candidateId}`);
 
-    if (stderr && !stderr.includes('✅')) {
-      console.error('⚠️  Warnings del script Python:', stderr);
-    }
+      const result = await getMatchingWorker().request(
+        { job_id: jobId, candidate_id: candidateId },
+        60000
+      );
 
-    // El script imprime JSON al final, buscar la línea que empieza con {
-    const lines = stdout.trim().split('\n');
-    let jsonLine: string | undefined;
-    
-    // Buscar la última línea que sea JSON válido (puede ser multilínea)
-    // Primero intentar encontrar una línea que empiece con { y termine con }
-    for (let i = lines.length - 1; i >= 0; i--) {
-      const line = lines[i].trim();
-      if (line.startsWith('{') && line.endsWith('}')) {
-        jsonLine = line;
-        break;
-      }
-    }
-    
-    // Si no encontramos una línea completa, intentar buscar desde "RESULTADO FINAL:"
-    // y concatenar todas las líneas desde ahí hasta el final
-    if (!jsonLine) {
-      const resultadoIndex = lines.findIndex(line => line.includes('RESULTADO FINAL:'));
-      if (resultadoIndex >= 0) {
-        // Buscar la primera línea con { después de "RESULTADO FINAL:"
-        for (let i = resultadoIndex + 1; i < lines.length; i++) {
-          const line = lines[i].trim();
-          if (line.startsWith('{')) {
-            // Intentar parsear desde esta línea hasta el final
-            const jsonCandidate = lines.slice(i).join('').trim();
-            try {
-              const parsed = JSON.parse(jsonCandidate);
-              if (parsed.match_score !== undefined) {
-                jsonLine = jsonCandidate;
-                break;
-              }
-            } catch (e) {
-              // Continuar buscando
-            }
-          }
-        }
+      if (result.match_score === undefined || result.match_score === null || !result.match_detail) {
+        throw new Error(`Resultado inválido del matching: ${JSON.stringify(result)}`);
       }
+
+      console.log(`✅ [AI MATCHING] Match calculado: ${result.match_score}`);
+
+      return {
+        score: result.match_score,
+        detail: result.match_detail,
+      };
     }
-    
-    if (!jsonLine) {
-      // Intentar parsear todo el stdout como JSON (por si acaso está todo en una línea)
-      try {
-        const parsed = JSON.parse(stdout.trim());
-        if (parsed.match_score !== undefined) {
-          return {
-            score: parsed.match_score,
-            detail: parsed.match_detail,
-          };
-        }
-      } catch (e) {
-        // Continuar con el error original
-      }
-      
-      // Si aún no funciona, buscar cualquier objeto JSON en el output
-      const jsonMatch = stdout.match(/\{[\s\S]*"match_score"[\s\S]*\}/);
-      if (jsonMatch) {
-        try {
-          const parsed = JSON.parse(jsonMatch[0]);
-          if (parsed.match_score !== undefined) {
-            return {
-              score: parsed.match_score,
-              detail: parsed.match_detail,
-            };
-          }
-        } catch (e) {
-          // Continuar con el error original
-        }
-      }
-      
-      throw new Error(`No se pudo parsear el resultado del matching. Output: ${stdout.substring(0, 500)}`);
+
+    // Sin worker (AI_MATCHING_WORKER=false), ejecutar el script Python directamente
+    console.log(`🤖 [AI MATCHING] Ejecutando matching localmente para Job ${jobId} ↔ Candidate ${candidateId}`);
+
+    const run = await runMatchingNdjson([{ jobId, candidateId }], 60000);
+    if (run.errors.length > 0) {
+      throw new Error(run.errors[0].error);
     }
 
-    const result = JSON.parse(jsonLine);
-    
+    const result = run.results[0];
+
     // Validar que tenga match_score (puede ser 0) y match_detail
-    if (result.match_score === undefined || result.match_score === null || !result.match_detail) {
+    if (!result || result.match_score === undefined || result.match_score === null || !result.match_detail) {
       throw new Error(`Resultado inválido del matching: ${JSON.stringify(result)}`);
     }
     
@@ -196,15 +345,143 @@ export async function calculateAIMatch(
   } catch (error: any) {
     console.error('❌ [AI MATCHING] Error ejecutando AI matching:', error);
     
-    // Si es un error de Python, intentar dar más contexto
-    if (error.stderr) {
-      console.error('   Python stderr:', error.stderr);
+    throw new Error(`Error en AI matching: ${error.message}`);
+  }
+}
+
+
+export interface AIBatchMatchResult {
+  results: Array<{ candidateId: string } & AIMatchResult>;
+  errors: Array<{ candidateId: string; error: string }>;
+}
+
+/**
+ * Calcula el match de un job contra varios candidatos en una sola llamada
+ * (el servicio Python obtiene el job una vez, paraleliza OpenAI y hace un único upsert)
+ * @param jobId - UUID del job
+ * @param candidateIds - UUIDs de los candidatos
+ * @returns Resultados exitosos y errores por candidato
+ */
+export async function calculateAIMatches(
+  jobId: string,
+  candidateIds: string[]
+): Promise<AIBatchMatchResult> {
+  if (candidateIds.length === 0) {
+    return { results: [], errors: [] };
+  }
+
+  try {
+    const isVercel = !!process.env.VERCEL;
+    const isProduction = process.env.NODE_ENV === 'production';
+    let result: any;
+
+    if (isVercel || isProduction) {
+      const apiUrl = process.env.VERCEL_URL && !isProduction
+        ? `https://${process.env.VERCEL_URL}`
+        : '';
+      const apiEndpoint = apiUrl ? `${apiUrl}/api/ai-match` : '/api/ai-match';
+
+      console.log(`🤖 [AI MATCHING] Llamando a API de Python (batch de ${candidateIds.length}) en: ${apiEndpoint}`);
+
+      const response = await fetch(apiEndpoint, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+          job_id: jobId,
+          candidate_ids: candidateIds,
+        }),
+      });
+
+      if (!response.ok) {
+        const errorData = await response.json().catch(() => ({ error: response.statusText }));
+        throw new Error(`Error en API de matching: ${errorData.error || response.statusText}`);
+      }
+
+      result = await response.json();
+    } else if (useMatchingWorker()) {
+      console.log(`🤖 [AI MATCHING] Enviando batch al worker para Job ${jobId} ↔ ${candidateIds.length} candidatos`);
+
+      result = await getMatchingWorker().request(
+        { job_id: jobId, candidate_ids: candidateIds },
+        60000 + candidateIds.length * 15000
+      );
+    } else {
+      console.log(`🤖 [AI MATCHING] Ejecutando batch localmente para Job ${jobId} ↔ ${candidateIds.length} candidatos`);
+
+      const run = await runMatchingNdjson(
+        candidateIds.map((candidateId) => ({ jobId, candidateId })),
+        60000 + candidateIds.length * 15000
+      );
+      result = { results: run.results, errors: run.errors };
     }
-    if (error.stdout) {
-      console.error('   Python stdout:', error.stdout);
+
+    if (result.error) {
+      throw new Error(result.error);
     }
-    
-    throw new Error(`Error en AI matching: ${error.message}`);
+
+    // Con un solo candidato el script responde con el formato individual
+    const rawResults: any[] = result.results ?? (result.match_score !== undefined ? [result] : []);
+
+    return {
+      results: rawResults.map((r: any) => ({
+        candidateId: r.candidate_id,
+        score: r.match_score,
+        detail: r.match_detail,
+      })),
+      errors: (result.errors || []).map((e: any) => ({
+        candidateId: e.candidate_id,
+        error: e.error,
+      })),
+    };
+  } catch (error: any) {
+    console.error('❌ [AI MATCHING] Error ejecutando AI matching en batch:', error);
+    throw new Error(`Error en AI matching (batch): ${error.message}`);
   }
 }
 
+
+export interface AIJobMatchSummary {
+  status: string;
+  network: number;
+  fresh: number;
+  to_match: number;
+  processed: number;
+  errors: Array<{ candidate_id: string; error: string }>;
+  throughput?: number | null;
+  cost_usd?: number | null;
+}
+
+/**
+ * Evalúa un job contra un conjunto de candidatos en una sola llamada al worker
+ * de Python (`match_job`): omite los matches al día y usa el pipeline batch.
+ * Sin candidateIds, el conjunto es la red de hyperconnectors.
+ * Devuelve null si no hay worker local (Vercel/producción o AI_MATCHING_WORKER=false).
+ * @param jobId - UUID del job
+ * @param options.candidateIds - Candidatos a evaluar (default: la red de hyperconnectors)
+ * @param options.force - Re-evaluar también los matches al día
+ */
+export async function calculateAIJobMatches(
+  jobId: string,
+  options?: { force?: boolean; hyperconnectorIds?: string[]; candidateIds?: string[] }
+): Promise<AIJobMatchSummary | null> {
+  const isVercel = !!process.env.VERCEL;
+  const isProduction = process.env.NODE_ENV === 'production';
+  if (isVercel || isProduction || !useMatchingWorker()) {
+    return null;
+  }
+
+  console.log(`🤖 [AI MATCHING] Enviando match_job al worker para Job ${jobId}`);
+
+  return getMatchingWorker().request(
+    {
+      type: 'match_job',
+      job_id: jobId,
+      force: options?.force ?? false,
+      hyperconnector_ids: options?.hyperconnectorIds,
+      candidate_ids: options?.candidateIds,
+    },
+    30 * 60 * 1000
+  );
+}
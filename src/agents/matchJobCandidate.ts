@@ -7,7 +7,7 @@ import { getCandidateById } from "../domain/candidates";
 import { getExperienceForCandidate } from "../domain/candidateExperience";
 import { createOrUpdateJobCandidateMatch } from "../domain/jobCandidateMatches";
 import { computeJobCandidateMatch, Job, Candidate, CandidateExperience } from "./computeJobCandidateMatch";
-import { calculateAIMatch } from "./aiMatchingAgent";
+import { calculateAIMatch, calculateAIJobMatches } from "./aiMatchingAgent";
 
 /**
  * Matches a job with a candidate and saves the result to job_candidate_matches
@@ -89,8 +89,15 @@ export async function matchJobCandidate(
 
 /**
  * Matches a job with all existing candidates
+ * Devuelve la cantidad de candidatos con un match guardado para el job.
+ * En local, los matches que ya están al día (mismos inputs y prompt) no se
+ * re-evalúan y cuentan como matcheados; con `force` se re-evalúan todos.
+ * En producción cada candidato se re-evalúa par por par.
  */
-export async function matchJobWithAllCandidates(jobId: string): Promise<number> {
+export async function matchJobWithAllCandidates(
+  jobId: string,
+  options?: { force?: boolean }
+): Promise<number> {
   const { supabase } = await import("../db/supabaseClient");
   
   // Get all candidates
@@ -107,6 +114,25 @@ export async function matchJobWithAllCandidates(jobId: string): Promise<number>
     return 0;
   }
 
+  // En local, una sola llamada al worker de Python evalúa todos los candidatos
+  // (omite matches al día salvo con force, batch concurrente)
+  try {
+    const summary = await calculateAIJobMatches(jobId, {
+      candidateIds: candidates.map((candidate) => candidate.id),
+      force: options?.force ?? false,
+    });
+    if (summary) {
+      console.log(`\n✅ [MATCHING] Matching completo para job ${jobId}:`);
+      console.log(`   - Total de candidatos: ${summary.network} (${summary.fresh} ya al día)`);
+      console.log(`   - Exitosos: ${summary.processed}`);
+      console.log(`   - Errores: ${summary.errors.length}`);
+      console.log(`   - Throughput: ${summary.throughput ?? "-"} matches/s, costo ≈ $${summary.cost_usd ?? 0}`);
+      return summary.fresh + summary.processed;
+    }
+  } catch (error: any) {
+    console.error(`⚠️  [MATCHING] Error en match_job, usando matching por par:`, error.message);
+  }
+
   console.log(`\n📋 [MATCHING] Iniciando matching para job ${jobId}`);
   console.log(`📋 [MATCHING] Total de candidatos a evaluar: ${candidates.length}`);
 